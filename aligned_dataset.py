@@ -0,0 +1,212 @@
+# filename: aligned_dataset.py
+# description: one wide, time-aligned table per spotter joining sea state, weather and per-node mooring data on a fixed grid
+
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from node_tables import SENSOR_PAIRS
+
+ALIGNED_INTERVAL = timedelta(minutes=30)
+
+# Wave data stream -> {API field: aligned column}
+WAVE_STREAM_FIELDS = {
+    "waves": {"significantWaveHeight": "hs", "peakPeriod": "peak_period", "meanDirection": "wave_direction"},
+    "wind": {"speed": "wind_speed", "direction": "wind_direction"},
+    "surfaceTemp": {"degrees": "sst"},
+    "barometerData": {"value": "pressure"},
+}
+# Suffix of the columns holding the time of each as-of joined reading, kept while combining chunk tables
+READING_TIME_SUFFIX = "_reading_time"
+
+
+def aligned_filename(directory, interval=ALIGNED_INTERVAL, file_format="csv"):
+    """Return the path of the aligned table for a grid interval, e.g. <directory>/aligned_30min.csv."""
+    return os.path.join(directory, f"aligned_{int(interval.total_seconds() // 60)}min.{file_format}")
+
+
+def stream_frame(entries, fields):
+    """Return a time-sorted frame of the numeric `fields` of one wave stream, renamed to aligned columns."""
+    df = pd.DataFrame.from_records(entries, columns=["timestamp"] + list(fields)).rename(columns=fields)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+    for column in fields.values():
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    return df.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+
+
+def time_grid(timestamps, interval=ALIGNED_INTERVAL):
+    """Return a frame with one 'timestamp' row per grid point spanning `timestamps` (a list of Series)."""
+    half = pd.Timedelta(interval) / 2
+    start = min(series.min() for series in timestamps)
+    end = max(series.max() for series in timestamps)
+    # Each grid point covers the half-open range [t - interval/2, t + interval/2)
+    grid = pd.date_range((start + half).floor(interval), (end + half).floor(interval), freq=interval)
+    return pd.DataFrame({"timestamp": grid})
+
+
+def build_aligned_table(wave_streams, node_tables, interval=ALIGNED_INTERVAL, reading_times=False):
+    """Join wave streams and node tables onto one grid of `interval`, indexed by UTC timestamp.
+
+    Sea state, wind, SST, pressure and each node's current speed/tilt take the nearest reading within
+    half an interval of each grid point (as-of join). Force is aggregated over the same half-interval
+    window (min of min, max of max, mean of mean, plus the number of readings) so peaks between grid
+    points are kept and partial windows can be merged later. Node columns are prefixed with the node ID.
+    With `reading_times`, the time of each joined reading is kept in a '..._reading_time' column per
+    stream and sensor, for `combine_aligned_tables` to pick the nearest reading across chunks.
+    """
+    tolerance = pd.Timedelta(interval) / 2
+    frames = {}
+    for stream, fields in WAVE_STREAM_FIELDS.items():
+        if wave_streams.get(stream):
+            frame = stream_frame(wave_streams[stream], fields)
+            if not frame.empty:
+                frames[stream] = frame
+    node_frames = {node_id: table.reset_index() for node_id, table in node_tables.items() if not table.empty}
+
+    timestamps = [frame["timestamp"] for frame in frames.values()] + \
+        [frame["timestamp"] for frame in node_frames.values()]
+    if not timestamps:
+        return pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC", name="timestamp"))
+    aligned = time_grid(timestamps, interval)
+
+    for stream, frame in frames.items():
+        if reading_times:
+            frame = frame.assign(**{f"{stream}{READING_TIME_SUFFIX}": frame["timestamp"]})
+        aligned = pd.merge_asof(aligned, frame, on="timestamp", direction="nearest", tolerance=tolerance)
+
+    for node_id, frame in sorted(node_frames.items()):
+        # Each sensor is joined on its own, as its readings need not share timestamps with the others
+        for name in SENSOR_PAIRS:
+            pair = frame[["timestamp", f"{name}_mean", f"{name}_std"]].dropna(subset=[f"{name}_mean"])
+            if not pair.empty:
+                pair = pair.rename(columns={column: f"{node_id}_{column}" for column in pair.columns[1:]})
+                if reading_times:
+                    pair[f"{node_id}_{name}{READING_TIME_SUFFIX}"] = pair["timestamp"]
+                aligned = pd.merge_asof(aligned, pair, on="timestamp", direction="nearest", tolerance=tolerance)
+
+        force = frame[["timestamp", "min_force", "max_force", "mean_force"]]
+        force = force.dropna(subset=["max_force", "mean_force"], how="all")
+        force = force.groupby((force["timestamp"] + tolerance).dt.floor(interval)).agg(
+            min_force=("min_force", "min"), max_force=("max_force", "max"), mean_force=("mean_force", "mean"),
+            force_count=("mean_force", "count"))
+        force.columns = [f"{node_id}_{column}" for column in force.columns]
+        aligned = aligned.merge(force, left_on="timestamp", right_index=True, how="left")
+
+    return integer_counts(aligned.set_index("timestamp"))
+
+
+def ordered_columns(columns):
+    """Return aligned columns with the wave stream columns first, then node columns sorted by node ID."""
+    wave_columns = [column for fields in WAVE_STREAM_FIELDS.values() for column in fields.values()]
+    return [column for column in wave_columns if column in columns] + \
+        sorted(column for column in columns if column not in wave_columns)
+
+
+def force_prefixes(columns):
+    """Return the '<node_id>_' prefixes of the nodes with force aggregates in `columns`."""
+    return [column[:-len("force_count")] for column in columns if column.endswith("_force_count")]
+
+
+def integer_counts(table):
+    """Return `table` with its force counts as nullable integers (missing where a node had no force reading)."""
+    for prefix in force_prefixes(table.columns):
+        table[f"{prefix}force_count"] = table[f"{prefix}force_count"].astype("float64").round().astype("Int64")
+    return table
+
+
+def reading_time_groups(columns):
+    """Yield (reading time column, value columns) for the as-of joined groups in `columns`."""
+    for column in columns:
+        if column.endswith(READING_TIME_SUFFIX):
+            prefix = column[:-len(READING_TIME_SUFFIX)]
+            if prefix in WAVE_STREAM_FIELDS:
+                yield column, list(WAVE_STREAM_FIELDS[prefix].values())
+            else:
+                yield column, [f"{prefix}_mean", f"{prefix}_std"]
+
+
+def combine_aligned_tables(tables):
+    """Combine aligned tables built from separate, non-overlapping chunks.
+
+    A grid point whose window spans a chunk boundary gets force aggregates merged from both chunks (min of
+    min, max of max, count-weighted mean). Its as-of joined columns take the reading nearest the grid
+    point if the tables were built with `reading_times`, otherwise the first value found.
+    """
+    tables = [table for table in tables if not table.empty]
+    if not tables:
+        return pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC", name="timestamp"))
+    stacked = pd.concat(tables)
+    grouped = stacked.groupby(level="timestamp", sort=True)
+    combined = grouped.first()
+    rows = stacked.reset_index()
+    for time_column, value_columns in reading_time_groups(stacked.columns):
+        distance = (rows[time_column] - rows["timestamp"]).abs().dropna()
+        nearest = rows.loc[distance.groupby(rows.loc[distance.index, "timestamp"]).idxmin()]
+        combined.loc[nearest["timestamp"], value_columns] = nearest[value_columns].to_numpy()
+        combined = combined.drop(columns=time_column)
+    for prefix in force_prefixes(stacked.columns):
+        count = stacked[f"{prefix}force_count"].astype("float64")
+        weighted_mean = (stacked[f"{prefix}mean_force"] * count).groupby(level="timestamp").sum(min_count=1)
+        total_count = count.groupby(level="timestamp").sum(min_count=1)
+        combined[f"{prefix}min_force"] = grouped[f"{prefix}min_force"].min()
+        combined[f"{prefix}max_force"] = grouped[f"{prefix}max_force"].max()
+        combined[f"{prefix}mean_force"] = weighted_mean / total_count
+        combined[f"{prefix}force_count"] = total_count
+    return integer_counts(combined[ordered_columns(combined.columns)])
+
+
+def merge_stored_table(table, stored):
+    """Merge a new aligned table into a stored one, new values taking precedence over stored ones.
+
+    Runs may overlap, so force aggregates are not added up: min and max are merged (a peak is never lost)
+    and the mean and count are taken from whichever side aggregated more readings, so a partial window at
+    the edge of a new run does not replace a complete stored one.
+    """
+    merged = table.combine_first(stored)
+    for prefix in force_prefixes(table.columns):
+        columns = [f"{prefix}{column}" for column in ("min_force", "max_force", "mean_force", "force_count")]
+        new = table.reindex(index=merged.index, columns=columns).astype("float64")
+        old = stored.reindex(index=merged.index, columns=columns).astype("float64")
+        min_column, max_column, mean_column, count_column = columns
+        merged[min_column] = np.fmin(new[min_column], old[min_column])
+        merged[max_column] = np.fmax(new[max_column], old[max_column])
+        keep_stored = old[count_column] > new[count_column].fillna(0)
+        merged[mean_column] = new[mean_column].where(~keep_stored, old[mean_column])
+        merged[count_column] = new[count_column].where(~keep_stored, old[count_column])
+    return integer_counts(merged)
+
+
+def load_aligned_table(filename):
+    """Load an aligned table written by `save_aligned_table`."""
+    if filename.endswith(".parquet"):
+        return integer_counts(pd.read_parquet(filename))
+    table = pd.read_csv(filename, index_col="timestamp")
+    table.index = pd.to_datetime(table.index, utc=True)
+    return integer_counts(table)
+
+
+def save_aligned_table(table, directory, interval=ALIGNED_INTERVAL, output_format="csv"):
+    """Merge `table` into the spotter's aligned file(s) (see `merge_stored_table`).
+
+    Writes aligned_<minutes>min.csv and/or .parquet in `directory` depending on `output_format`
+    ('csv', 'parquet' or 'both'). Returns the files written.
+    """
+    if table.empty:
+        return []
+    os.makedirs(directory, exist_ok=True)
+    file_formats = ("csv", "parquet") if output_format == "both" else (output_format,)
+    written_files = []
+    for file_format in file_formats:
+        filename = aligned_filename(directory, interval, file_format)
+        merged = table
+        if os.path.exists(filename):
+            merged = merge_stored_table(table, load_aligned_table(filename))
+        merged = merged[ordered_columns(merged.columns)]
+        if file_format == "parquet":
+            merged.to_parquet(filename)
+        else:
+            merged.to_csv(filename, date_format="%Y-%m-%dT%H:%M:%SZ")
+        written_files.append(filename)
+    return written_files
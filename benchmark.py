@@ -0,0 +1,374 @@
+# filename: benchmark.py
+# description: offline benchmark of fetch, decode, wave processing and plotting against a mock Sofar API transport
+
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+BENCHMARK_SPOTTER_ID = "SPOT-BENCH"
+BENCHMARK_START = datetime(2025, 1, 1)
+DEFAULT_DAYS = 30
+DEFAULT_NODES = 2
+DEFAULT_SENSOR_INTERVAL_MINUTES = 10
+DEFAULT_WAVE_INTERVAL_MINUTES = 30
+# The mock latest-data endpoint serves the wave records of this trailing window
+LATEST_DATA_WINDOW = timedelta(hours=2)
+RESULTS_FILE = os.path.join('parsed_data', 'benchmark_results.jsonl')
+
+# Importing the pipeline library must stay cheap: no pandas, matplotlib or pyarrow until they are needed
+IMPORT_TIME_BUDGET_SECONDS = 0.3
+IMPORT_TIME_MODULE = "sofar_pipeline"
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "pyarrow")
+
+API_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class MockResponse:
+    """Minimal stand-in for requests.Response."""
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {"Content-Type": "application/json"}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class MockSofarSession:
+    """Stand-in for a requests session that serves synthetic wave-data, sensor-data and latest-data pages offline.
+
+    All records between `start` and `end` are generated once up front and pre-serialized, so a request only
+    slices and joins them; like the real API, each page holds at most `limit` records. Sensor data has
+    Aanderaa speed/tilt mean and std readings plus hex-encoded load cell messages for each of `node_count`
+    nodes every `sensor_interval`. The latest-data endpoint serves the wave records of the
+    `LATEST_DATA_WINDOW` before `now` (default: `end`), which callers may advance to simulate live polling.
+    Every request waits `latency` seconds (plus up to `latency_jitter`).
+    """
+
+    def __init__(self, start, end, node_count=DEFAULT_NODES,
+                 sensor_interval=timedelta(minutes=DEFAULT_SENSOR_INTERVAL_MINUTES),
+                 wave_interval=timedelta(minutes=DEFAULT_WAVE_INTERVAL_MINUTES),
+                 latency=0.0, latency_jitter=0.0, seed=0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.requests = 0
+        self.bytes_served = 0
+        self.now = end
+        self._random = random.Random(seed)
+        self.node_ids = [f"{self._random.getrandbits(64):016x}" for _ in range(node_count)]
+        self._sensor_times, self._sensor_records = self._generate_sensor_records(start, end, sensor_interval)
+        self._wave_times, self._wave_records = self._generate_wave_records(start, end, wave_interval)
+
+    @staticmethod
+    def _timestamp(moment):
+        return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def _generate_sensor_records(self, start, end, interval):
+        times, records = [], []
+        moment = start
+        while moment < end:
+            hours = (moment - start).total_seconds() / 3600
+            # Tidal current with a 12.42 h period
+            tide = abs(math.sin(2 * math.pi * hours / 12.42))
+            for node_index, node_id in enumerate(self.node_ids):
+                latitude = 37.5 + node_index * 1e-4
+                longitude = -122.5
+                speed = 5 + 45 * tide + self._random.gauss(0, 2)
+                mean_force = 200 + 600 * tide + self._random.gauss(0, 20)
+                max_force = mean_force * self._random.uniform(1.2, 1.6)
+                if self._random.random() < 0.002:
+                    max_force *= 4  # occasional snap load
+                force_message = (f"min force: {mean_force * self._random.uniform(0.4, 0.8):.2f}, "
+                                 f"max force: {max_force:.2f}, mean force: {mean_force:.2f}")
+                entries = [
+                    # Seconds apart, as mean and std messages arrive separately
+                    (0, "aanderaa_abs_speed_mean_15bits", "float", f"{speed:.0f}"),
+                    (2, "aanderaa_abs_speed_std_15bits", "float", f"{abs(self._random.gauss(4, 1)):.0f}"),
+                    (1, "aanderaa_abs_tilt_mean_8bits", "float", f"{0.05 + 0.3 * tide:.3f}"),
+                    (3, "aanderaa_std_tilt_mean_8bits", "float", f"{abs(self._random.gauss(0.03, 0.01)):.3f}"),
+                    (5, "binary_hex_encoded", "binary", force_message.encode().hex()),
+                ]
+                for offset, data_type_name, unit_type, value in entries:
+                    record_time = moment + timedelta(seconds=offset)
+                    times.append(record_time)
+                    records.append(json.dumps({
+                        "bristlemouth_node_id": node_id, "sensor_position": node_index + 1,
+                        "unit_type": unit_type, "data_type_name": data_type_name, "value": value,
+                        "timestamp": self._timestamp(record_time), "latitude": latitude, "longitude": longitude,
+                    }).encode())
+            moment += interval
+        return times, records
+
+    def _generate_wave_records(self, start, end, interval):
+        times = []
+        records = {"waves": [], "wind": [], "surfaceTemp": [], "barometerData": []}
+        moment = start
+        while moment < end:
+            hours = (moment - start).total_seconds() / 3600
+            timestamp = self._timestamp(moment)
+            # Position wandering around the anchor inside a ~30 m watch circle
+            latitude = 37.5 + 2e-4 * math.sin(2 * math.pi * hours / 12.42) + self._random.gauss(0, 2e-5)
+            longitude = -122.5 + 2e-4 * math.cos(2 * math.pi * hours / 12.42) + self._random.gauss(0, 2e-5)
+            position = {"latitude": latitude, "longitude": longitude, "timestamp": timestamp}
+            times.append(moment)
+            records["waves"].append(json.dumps({
+                "significantWaveHeight": round(1.5 + math.sin(2 * math.pi * hours / 96) + self._random.gauss(0, 0.1), 2),
+                "peakPeriod": round(self._random.uniform(8, 14), 2), "meanPeriod": round(self._random.uniform(6, 10), 2),
+                "peakDirection": round(self._random.uniform(250, 300), 1), "peakDirectionalSpread": 25.0,
+                "meanDirection": round(self._random.uniform(250, 300), 1), "meanDirectionalSpread": 35.0,
+                "processing_source": "embedded", **position,
+            }).encode())
+            records["wind"].append(json.dumps({
+                "speed": round(abs(self._random.gauss(6, 2)), 2), "direction": round(self._random.uniform(0, 360), 1),
+                "seasurfaceId": 1, "processing_source": "embedded", **position,
+            }).encode())
+            records["surfaceTemp"].append(json.dumps({"degrees": round(13 + self._random.gauss(0, 0.2), 2),
+                                                      **position}).encode())
+            records["barometerData"].append(json.dumps({
+                "value": round(1013 + self._random.gauss(0, 3), 1), "units": "hPa", "unit_type": "pressure",
+                "data_type_description": "Barometric pressure", **position,
+            }).encode())
+            moment += interval
+        return times, records
+
+    @staticmethod
+    def _page_query(query):
+        """Return the (start, end, limit) of a paged wave-data or sensor-data query."""
+        return (datetime.strptime(query["startDate"][0], API_TIME_FORMAT),
+                datetime.strptime(query["endDate"][0], API_TIME_FORMAT), int(query["limit"][0]))
+
+    def _wave_content(self, first, last):
+        """Return a wave-data response body holding the wave records `first` to `last` of every stream."""
+        streams = b",".join(
+            b'"' + stream.encode() + b'":[' + b",".join(records[first:last]) + b"]"
+            for stream, records in self._wave_records.items()
+        )
+        return b'{"data":{"spotterId":"' + BENCHMARK_SPOTTER_ID.encode() + b'",' + streams + b"}}"
+
+    def get(self, url, timeout=None):
+        """Serve one page for a URL built by `build_api_url` or `build_latest_data_url`."""
+        query = parse_qs(urlparse(url).query)
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + self._random.uniform(0, self.latency_jitter))
+
+        if "/latest-data" in url:
+            first = bisect.bisect_left(self._wave_times, self.now - LATEST_DATA_WINDOW)
+            content = self._wave_content(first, bisect.bisect_right(self._wave_times, self.now))
+        elif "/wave-data" in url:
+            start, end, limit = self._page_query(query)
+            first = bisect.bisect_left(self._wave_times, start)
+            content = self._wave_content(first, min(bisect.bisect_left(self._wave_times, end), first + limit))
+        else:
+            start, end, limit = self._page_query(query)
+            first = bisect.bisect_left(self._sensor_times, start)
+            last = min(bisect.bisect_left(self._sensor_times, end), first + limit)
+            content = b'{"data":[' + b",".join(self._sensor_records[first:last]) + b"]}"
+
+        self.requests += 1
+        self.bytes_served += len(content)
+        return MockResponse(content)
+
+
+def peak_memory_mb():
+    """Return the peak resident memory of this process so far in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision():
+    """Return the current git commit of the repository, or None."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_import_time(module=IMPORT_TIME_MODULE, runs=5):
+    """Import `module` in `runs` fresh interpreters; return (median seconds, heavy modules loaded by the import)."""
+    code = (
+        "import sys, time, types\n"
+        "try:\n"
+        "    import config\n"
+        "except ImportError:\n"
+        "    sys.modules['config'] = types.ModuleType('config')\n"
+        "    sys.modules['config'].API_TOKEN = 'offline-benchmark'\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - started)\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    timings, heavy_modules = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+        timings.append(float(output[0]))
+        heavy_modules.update(name for name in output[1].split(",") if name)
+    return sorted(timings)[len(timings) // 2], sorted(heavy_modules)
+
+
+def run_benchmark(days=DEFAULT_DAYS, node_count=DEFAULT_NODES, sensor_interval_minutes=DEFAULT_SENSOR_INTERVAL_MINUTES,
+                  wave_interval_minutes=DEFAULT_WAVE_INTERVAL_MINUTES, latency=0.0, latency_jitter=0.0,
+                  max_request_rate=1000.0, output_format="csv", plot=True, seed=0, quiet=True):
+    """Run the pipeline once against a MockSofarSession and return per-stage timings and throughput.
+
+    Runs in a temporary directory, so no files are written to the working tree. The client-side rate
+    limiter is raised to `max_request_rate` requests per second so it does not dominate the timings.
+    """
+    import contextlib
+    import io
+
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as benchmark_directory:
+        os.chdir(benchmark_directory)
+        try:
+            # The API token is never used offline
+            if "config" not in sys.modules:
+                try:
+                    import config  # noqa: F401
+                except ImportError:
+                    sys.modules["config"] = types.ModuleType("config")
+                    sys.modules["config"].API_TOKEN = "offline-benchmark"
+
+            import sofar_pipeline
+            from instrumentation import metrics
+            from plotting import render_spotter_report
+            from request_retry import AdaptiveRateLimiter
+
+            end = BENCHMARK_START + timedelta(days=days)
+            session = MockSofarSession(BENCHMARK_START, end, node_count, timedelta(minutes=sensor_interval_minutes),
+                                       timedelta(minutes=wave_interval_minutes), latency, latency_jitter, seed)
+            sofar_pipeline._http_session = session
+            sofar_pipeline._rate_limiter = AdaptiveRateLimiter(max_rate=max_request_rate)
+            metrics.reset()
+
+            stages = []
+
+            def timed(stage, function, rows_of=None):
+                started = time.perf_counter()
+                output = io.StringIO() if quiet else None
+                with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+                    result = function()
+                seconds = time.perf_counter() - started
+                rows = rows_of(result) if rows_of else None
+                stages.append({
+                    "stage": stage, "seconds": round(seconds, 3), "rows": rows,
+                    "rows_per_second": round(rows / seconds, 1) if rows and seconds else None,
+                    "peak_memory_mb": peak_memory_mb(),
+                })
+                return result
+
+            wave_data = timed("fetch_wave", lambda: sofar_pipeline.fetch_data_in_chunks(
+                BENCHMARK_START, end, BENCHMARK_SPOTTER_ID, data_type="wave", use_cache=False),
+                lambda data: len(data["data"]["waves"]))
+            sensor_data = timed("fetch_sensor", lambda: sofar_pipeline.fetch_data_in_chunks(
+                BENCHMARK_START, end, BENCHMARK_SPOTTER_ID, data_type="sensor", use_cache=False),
+                lambda data: len(data["data"]))
+            def process_smart_mooring():
+                grouped_data, node_ids = sofar_pipeline.process_smart_mooring_data(BENCHMARK_SPOTTER_ID, sensor_data,
+                                                                                   output_format)
+                return node_ids, sofar_pipeline.process_node_tables(BENCHMARK_SPOTTER_ID, grouped_data, output_format)
+
+            unique_node_ids, node_tables = timed("process_smart_mooring", process_smart_mooring,
+                                                 lambda _: len(sensor_data["data"]))
+            timed("process_wave", lambda: sofar_pipeline.process_wave_data(
+                BENCHMARK_SPOTTER_ID, wave_data, output_format), lambda _: len(wave_data["data"]["waves"]))
+            if plot:
+                timed("plot", lambda: render_spotter_report(BENCHMARK_SPOTTER_ID, node_tables, unique_node_ids,
+                                                            wave_data["data"], "figures"),
+                      lambda _: len(sensor_data["data"]) + len(wave_data["data"]["waves"]))
+        finally:
+            os.chdir(working_directory)
+
+    return {
+        "time": datetime.utcnow().strftime(API_TIME_FORMAT),
+        "revision": git_revision(),
+        "config": {"days": days, "nodes": node_count, "sensor_interval_minutes": sensor_interval_minutes,
+                   "wave_interval_minutes": wave_interval_minutes, "latency": latency,
+                   "latency_jitter": latency_jitter, "output_format": output_format},
+        "requests": session.requests,
+        "megabytes_served": round(session.bytes_served / 1e6, 2),
+        "total_seconds": round(sum(stage["seconds"] for stage in stages), 3),
+        "stages": stages,
+        "metrics": metrics.summary(BENCHMARK_SPOTTER_ID).get(BENCHMARK_SPOTTER_ID, {}),
+    }
+
+
+def format_benchmark(result):
+    """Format a benchmark result as a plain-text table."""
+    config = result["config"]
+    lines = [
+        f"{config['days']} days, {config['nodes']} nodes, {result['requests']} requests, "
+        f"{result['megabytes_served']} MB served, revision {result['revision'] or 'unknown'}",
+        f"{'Stage':<24}{'Seconds':>9}{'Rows':>10}{'Rows/s':>11}{'Peak MB':>9}",
+    ]
+    for stage in result["stages"]:
+        lines.append(
+            f"{stage['stage']:<24}{stage['seconds']:>9.3f}{stage['rows'] or 0:>10}"
+            f"{stage['rows_per_second'] or 0:>11.0f}{stage['peak_memory_mb'] or 0:>9.1f}"
+        )
+    lines.append(f"{'total':<24}{result['total_seconds']:>9.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline against a mock Sofar API.")
+    parser.add_argument("--days", type=float, default=DEFAULT_DAYS, help="length of the fetched range in days")
+    parser.add_argument("--nodes", type=int, default=DEFAULT_NODES, help="number of smart mooring nodes")
+    parser.add_argument("--sensor-interval", type=float, default=DEFAULT_SENSOR_INTERVAL_MINUTES,
+                        help="minutes between sensor readings of each node")
+    parser.add_argument("--wave-interval", type=float, default=DEFAULT_WAVE_INTERVAL_MINUTES,
+                        help="minutes between wave records")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated latency per request")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="extra random latency per request")
+    parser.add_argument("--max-request-rate", type=float, default=1000.0,
+                        help="client-side request rate limit (requests per second)")
+    parser.add_argument("--output-format", choices=("csv", "parquet", "both"), default="csv")
+    parser.add_argument("--no-plot", action="store_true", help="skip rendering the plots")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results-file", default=RESULTS_FILE,
+                        help="append the result as a JSON line to this file to track changes over time")
+    parser.add_argument("--import-time", action="store_true",
+                        help=f"only check the import time of {IMPORT_TIME_MODULE} against its budget "
+                             f"({IMPORT_TIME_BUDGET_SECONDS} s); exits with status 1 when over budget")
+    args = parser.parse_args()
+
+    if args.import_time:
+        seconds, heavy_modules = measure_import_time()
+        print(f"import {IMPORT_TIME_MODULE}: {seconds:.3f} s (budget {IMPORT_TIME_BUDGET_SECONDS} s), "
+              f"heavy modules loaded: {', '.join(heavy_modules) or 'none'}")
+        sys.exit(0 if seconds <= IMPORT_TIME_BUDGET_SECONDS and not heavy_modules else 1)
+
+    result = run_benchmark(args.days, args.nodes, args.sensor_interval, args.wave_interval, args.latency,
+                           args.latency_jitter, args.max_request_rate, args.output_format, not args.no_plot,
+                           args.seed)
+    print(format_benchmark(result))
+
+    if args.results_file:
+        os.makedirs(os.path.dirname(args.results_file) or '.', exist_ok=True)
+        with open(args.results_file, mode='a', encoding='utf-8') as file:
+            file.write(json.dumps(result) + "\n")
+        print(f"Result appended to {args.results_file}")
+
+
+if __name__ == "__main__":
+    main()
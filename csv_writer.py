@@ -0,0 +1,244 @@
+# filename: csv_writer.py
+# description: buffered CSV writer that keeps one open handle per output file and writes rows in bulk
+
+import bisect
+import contextlib
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from response_cache import CACHE_SETTLE_TIME
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+RECENT_KEYS_MAX_AGE = timedelta(days=2)  # keys of unsettled rows older than this are dropped from the index
+LATEST_TIMESTAMP = "\U0010ffff"  # sorts after every timestamp string
+
+
+class CSVWriterPool:
+    """Buffer rows per CSV file and append them in bulk through one open handle per file.
+
+    The header is taken from `fieldnames` or the keys of the first row written to a file, and is only
+    written if the file did not exist yet.
+
+    When `key_fields` are given, writes are idempotent: rows already stored in the file are dropped,
+    normally without reading the CSV. A sidecar `<file>.index.json` records the time spans the file holds
+    completely once their data had settled when it was fetched (see `response_cache.CACHE_SETTLE_TIME`),
+    plus the keys of newer rows, for which late data may still arrive. Rows inside a settled span are skipped and other
+    rows are checked against the recent keys, so rerunning an overlapping range only appends what is
+    new. The stored keys are only loaded from the CSV for rows in a span whose keys were dropped from
+    the index after `RECENT_KEYS_MAX_AGE`, or if the index is missing or stale.
+
+    A pool may be kept open across many small batches (e.g. watch polls): `flush` folds the rows written
+    so far into the in-memory indexes, and the sidecars are only written on `close`. If the process dies
+    first, the sidecars no longer match their CSVs and are rebuilt from them on the next open.
+    """
+
+    def __init__(self, buffer_rows=5000):
+        self.buffer_rows = buffer_rows
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self, csv_filename, fieldnames):
+        """Open `csv_filename` for appending, creating its directory and header as needed."""
+        directory = os.path.dirname(csv_filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_header = not os.path.exists(csv_filename)
+        file = open(csv_filename, mode='a', newline='', encoding='utf-8')
+        writer = csv.DictWriter(file, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL, escapechar='\\',
+                                extrasaction='ignore')
+        if write_header:
+            writer.writeheader()
+        state = {
+            "file": file,
+            "writer": writer,
+            "rows": [],
+            "new_file": write_header,
+            "index": None,  # loaded on the first keyed write
+            "stored_keys": None,  # loaded from the CSV only for rows in an unindexed span
+            "new_keys": set(),
+            "batch_spans": [],
+            "unindexed_writes": False,
+        }
+        self._files[csv_filename] = state
+        return state
+
+    def write(self, csv_filename, row, key_fields=None, fieldnames=None, fetched_at=None):
+        """Queue a single row for `csv_filename`."""
+        self.write_rows(csv_filename, [row], key_fields=key_fields, fieldnames=fieldnames, fetched_at=fetched_at)
+
+    def write_rows(self, csv_filename, rows, key_fields=None, fieldnames=None, fetched_at=None):
+        """Queue several rows for `csv_filename`, flushing once the buffer is full.
+
+        `key_fields` is a tuple of column names identifying a row, starting with its ISO 8601 UTC
+        timestamp column. The rows of one call must be everything the source holds between their oldest
+        and newest timestamp (e.g. one fetched chunk), as the part of that span which had settled by
+        `fetched_at` (epoch seconds, default now) is marked complete. Pass the original fetch time for data
+        that was fetched earlier, e.g. resumed from a checkpoint. Rows whose key is already stored are
+        skipped. `fieldnames` restricts and orders the CSV columns (default: the keys of the first row).
+        Returns the number of rows queued.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        state = self._files.get(csv_filename) or self._open(csv_filename, fieldnames or list(rows[0].keys()))
+        if key_fields:
+            if state["index"] is None:
+                state["index"] = empty_index() if state["new_file"] else read_index(csv_filename)
+            keys = [row_key(row, key_fields) for row in rows]
+            timestamps = [key[0] for key in keys]
+            state["batch_spans"].append((min(timestamps), max(timestamps), fetched_at or time.time()))
+            rows = [row for row, key in zip(rows, keys) if self._is_new_key(csv_filename, state, key, key_fields)]
+        else:
+            state["unindexed_writes"] = True
+        state["rows"].extend(rows)
+        if len(state["rows"]) >= self.buffer_rows:
+            self._flush_file(state)
+        return len(rows)
+
+    def _is_new_key(self, csv_filename, state, key, key_fields):
+        """Return True if the row with `key` is not yet stored, recording it as stored."""
+        index = state["index"]
+        timestamp = key[0]
+        if in_spans(index["spans"], timestamp) or key in index["recent_keys"] or key in state["new_keys"]:
+            return False
+        # Stored keys dropped from the index are only known to the CSV itself
+        if in_spans(index["unindexed_spans"], timestamp):
+            if state["stored_keys"] is None:
+                state["stored_keys"] = read_stored_keys(csv_filename, key_fields)
+            if key in state["stored_keys"]:
+                return False
+        state["new_keys"].add(key)
+        return True
+
+    def _flush_file(self, state):
+        state["writer"].writerows(state["rows"])
+        state["rows"] = []
+
+    @staticmethod
+    def _fold_index(state):
+        """Fold the spans and keys written since the last fold into the file's in-memory index."""
+        if state["index"] is None:
+            return
+        state["index"] = updated_index(state["index"], state["batch_spans"], state["new_keys"], state["stored_keys"])
+        state["batch_spans"] = []
+        state["new_keys"] = set()
+        state["stored_keys"] = None
+
+    def flush(self):
+        """Write all buffered rows to disk and fold them into the in-memory indexes."""
+        for state in self._files.values():
+            self._flush_file(state)
+            state["file"].flush()
+            self._fold_index(state)
+
+    def close(self):
+        """Flush buffered rows, close every open file and update the indexes."""
+        for csv_filename, state in self._files.items():
+            self._flush_file(state)
+            state["file"].close()
+            # Rows written without keys leave the index to be rebuilt from the CSV on next open
+            if state["index"] is not None and not state["unindexed_writes"]:
+                self._fold_index(state)
+                write_index(csv_filename, state["index"])
+        self._files = {}
+
+
+def writer_pool(pool=None):
+    """Return a context manager yielding `pool`, or a new CSVWriterPool closed on exit if `pool` is None."""
+    return contextlib.nullcontext(pool) if pool is not None else CSVWriterPool()
+
+
+def row_key(row, key_fields):
+    """Return a row's key as a tuple of strings, the same way it reads back from the CSV."""
+    return tuple("" if row.get(field) is None else str(row.get(field)) for field in key_fields)
+
+
+def merge_spans(spans):
+    """Return sorted (start, end) spans with overlapping ones merged."""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def in_spans(spans, timestamp):
+    """Return True if `timestamp` lies inside one of the sorted, merged `spans`."""
+    position = bisect.bisect_right(spans, (timestamp, LATEST_TIMESTAMP)) - 1
+    return position >= 0 and spans[position][0] <= timestamp <= spans[position][1]
+
+
+def empty_index():
+    """Return the index of a CSV without rows."""
+    return {"spans": [], "recent_keys": set(), "unindexed_spans": []}
+
+
+def updated_index(index, batch_spans, new_keys, stored_keys=None):
+    """Return `index` updated for rows written in `batch_spans` (start, end, fetched_at) with `new_keys`.
+
+    The part of each batch span that had settled when the batch was fetched becomes a settled span. Keys outside the
+    settled spans are kept for up to `RECENT_KEYS_MAX_AGE`, after which the span they covered is marked
+    unindexed. `stored_keys`, if they were loaded from the CSV, make the index complete again.
+    """
+    keep_since = (datetime.now(timezone.utc) - RECENT_KEYS_MAX_AGE).strftime(TIME_FORMAT)
+    settled_batch_spans = []
+    for start, end, fetched_at in batch_spans:
+        settled_before = (datetime.fromtimestamp(fetched_at, timezone.utc) - CACHE_SETTLE_TIME).strftime(TIME_FORMAT)
+        if start <= settled_before:
+            settled_batch_spans.append((start, min(end, settled_before)))
+    spans = merge_spans(index["spans"] + settled_batch_spans)
+    keys = index["recent_keys"] | new_keys
+    unindexed_spans = index["unindexed_spans"]
+    if stored_keys is not None:
+        keys |= stored_keys
+        unindexed_spans = []
+    unsettled_keys = [key for key in keys if not in_spans(spans, key[0])]
+    recent_keys = {key for key in unsettled_keys if key[0] >= keep_since}
+    dropped_timestamps = [key[0] for key in unsettled_keys if key[0] < keep_since]
+    if dropped_timestamps:
+        unindexed_spans = merge_spans(unindexed_spans + [(min(dropped_timestamps), max(dropped_timestamps))])
+    return {"spans": spans, "recent_keys": recent_keys, "unindexed_spans": unindexed_spans}
+
+
+def index_filename(csv_filename):
+    """Return the path of the sidecar index for a CSV file."""
+    return f"{csv_filename}.index.json"
+
+
+def write_index(csv_filename, index):
+    """Save an index together with the CSV size it was computed for."""
+    with open(index_filename(csv_filename), mode='w', encoding='utf-8') as file:
+        json.dump({"csv_size": os.path.getsize(csv_filename), "spans": index["spans"],
+                   "recent_keys": sorted(index["recent_keys"]), "unindexed_spans": index["unindexed_spans"]}, file)
+
+
+def read_index(csv_filename):
+    """Return the index of a CSV, or one that defers to the CSV's keys if the index is missing or stale."""
+    try:
+        with open(index_filename(csv_filename), encoding='utf-8') as file:
+            index = json.load(file)
+        if index.get("csv_size") == os.path.getsize(csv_filename):
+            return {"spans": [tuple(span) for span in index["spans"]],
+                    "recent_keys": {tuple(key) for key in index["recent_keys"]},
+                    "unindexed_spans": [tuple(span) for span in index["unindexed_spans"]]}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    # Missing or stale (e.g. the CSV was edited or written by an older version): nothing is known
+    # without reading the file, so the stored keys are loaded on the first keyed write
+    return {"spans": [], "recent_keys": set(), "unindexed_spans": [("", LATEST_TIMESTAMP)]}
+
+
+def read_stored_keys(csv_filename, key_fields):
+    """Load the set of row keys already stored in a CSV."""
+    with open(csv_filename, newline='', encoding='utf-8') as file:
+        return {row_key(row, key_fields) for row in csv.DictReader(file, escapechar='\\')}
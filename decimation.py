@@ -0,0 +1,80 @@
+# filename: decimation.py
+# description: reduce long time series to a pixel-appropriate number of points before plotting
+
+import numpy as np
+
+# Roughly two points per horizontal pixel of a 12 inch wide figure at 100 dpi
+MAX_PLOT_POINTS = 2400
+
+
+def minmax_indices(y, max_points=MAX_PLOT_POINTS):
+    """Return sorted indices keeping the min and max of each of max_points/2 equal buckets.
+
+    Every local extreme survives, so peaks such as max force are never dropped.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(max_points // 2, 1)
+    bucket_size = int(np.ceil(n / n_buckets))
+    padded_length = bucket_size * int(np.ceil(n / bucket_size))
+
+    # NaNs must never be chosen as an extreme
+    low = np.full(padded_length, np.inf)
+    high = np.full(padded_length, -np.inf)
+    low[:n] = np.where(np.isnan(y), np.inf, y)
+    high[:n] = np.where(np.isnan(y), -np.inf, y)
+
+    offsets = np.arange(0, padded_length, bucket_size)
+    min_indices = offsets + low.reshape(-1, bucket_size).argmin(axis=1)
+    max_indices = offsets + high.reshape(-1, bucket_size).argmax(axis=1)
+    indices = np.unique(np.concatenate([min_indices, max_indices, [0, n - 1]]))
+    return indices[indices < n]
+
+
+def lttb_indices(x, y, max_points=MAX_PLOT_POINTS):
+    """Return sorted indices chosen by Largest-Triangle-Three-Buckets, which keeps the visual shape."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = np.nanmean(y[next_start:next_end]) if np.any(~np.isnan(y[next_start:next_end])) else 0.0
+
+        # Pick the point forming the largest triangle with the previous pick and the next bucket's mean
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.nanargmax(areas)) if np.any(~np.isnan(areas)) else start
+        indices[bucket + 1] = previous
+    return indices
+
+
+def decimation_indices(x, y, max_points=MAX_PLOT_POINTS, method="lttb"):
+    """Return the indices to plot for a series using `method` ('lttb' or 'minmax')."""
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    elif method == "lttb":
+        return lttb_indices(x, y, max_points)
+    else:
+        raise ValueError(f"Invalid decimation method: {method}")
+
+
+def stride_indices(n, max_points=MAX_PLOT_POINTS):
+    """Return evenly spaced indices (always including the last one) for tracks such as GPS fixes."""
+    if n <= max_points:
+        return np.arange(n)
+    indices = np.linspace(0, n - 1, max_points).round().astype(int)
+    return np.unique(indices)
@@ -0,0 +1,97 @@
+# filename: fleet_runner.py
+# description: process many Spotters from SPOTTER_CONFIGS concurrently with isolated outputs and a summary report
+
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from sofar_pipeline import process_and_plot_data, set_api_concurrency
+
+FLEET_OUTPUT_DIRECTORY = os.path.join('parsed_data', 'fleet')
+FLEET_SUMMARY_FILE = os.path.join(FLEET_OUTPUT_DIRECTORY, 'fleet_summary.json')
+DEFAULT_FLEET_WORKERS = 4
+DEFAULT_RENDER_WORKERS = 2
+
+
+def spotter_output_directories(spotter_id, base_directory=FLEET_OUTPUT_DIRECTORY):
+    """Return the (sensor, wave) output directories reserved for one spotter."""
+    spotter_directory = os.path.join(base_directory, spotter_id)
+    return os.path.join(spotter_directory, 'smart_mooring'), os.path.join(spotter_directory, 'spotter_wave')
+
+
+def run_spotter(config, **options):
+    """Process one spotter, capturing its failure instead of raising so the rest of the fleet continues."""
+    spotter_id = config['spotter_id']
+    sensor_directory, wave_directory = spotter_output_directories(spotter_id)
+    result = {"spotter_id": spotter_id, "status": "ok", "error": None}
+    started = time.perf_counter()
+    try:
+        # Interactive windows are never opened in fleet mode; plots are only rendered to files if requested
+        summary = process_and_plot_data(spotter_id, config['start_date'], config['end_date'],
+                                        plot=options.get("render_directory") is not None,
+                                        sensor_directory=sensor_directory, wave_directory=wave_directory,
+                                        anchor=config.get('anchor'), **options)
+        result.update(summary)
+    except Exception as e:
+        print(f"Failed to process {spotter_id}: {e}")
+        result.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def format_fleet_summary(results):
+    """Format fleet results as a plain-text table."""
+    lines = [f"{'Spotter':<16}{'Status':<8}{'Seconds':>9}{'Sensor rows':>13}{'Wave rows':>11}  Nodes / error"]
+    for result in results:
+        detail = result["error"] if result["status"] != "ok" else ", ".join(result.get("node_ids", []))
+        lines.append(
+            f"{result['spotter_id']:<16}{result['status']:<8}{result['seconds']:>9.2f}"
+            f"{result.get('sensor_rows', 0):>13}{result.get('wave_rows', 0):>11}  {detail}"
+        )
+    failed = sum(1 for result in results if result["status"] != "ok")
+    lines.append(f"{len(results) - failed} succeeded, {failed} failed")
+    return "\n".join(lines)
+
+
+def run_fleet(spotter_configs, pool_size=DEFAULT_FLEET_WORKERS, api_concurrency=None, summary_file=FLEET_SUMMARY_FILE,
+              render_directory=None, render_workers=DEFAULT_RENDER_WORKERS, **options):
+    """Process all spotters across a pool of `pool_size` workers and write a JSON summary report.
+
+    Each spotter writes to its own directory under FLEET_OUTPUT_DIRECTORY and a failing spotter does not
+    stop the others. API requests from all workers share one global cap of `api_concurrency` requests.
+    With `render_directory`, each spotter's plots are rendered to files by a pool of `render_workers`
+    processes while other spotters are still being fetched. Remaining keyword options are passed to
+    `process_and_plot_data`. Returns the per-spotter results.
+    """
+    if api_concurrency is not None:
+        set_api_concurrency(api_concurrency)
+
+    started = time.perf_counter()
+    render_executor = None
+    if render_directory:
+        from plotting import create_render_pool
+        render_executor = create_render_pool(render_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max(pool_size, 1)) as executor:
+            results = list(executor.map(
+                lambda config: run_spotter(config, render_directory=render_directory,
+                                           render_executor=render_executor, **options),
+                spotter_configs,
+            ))
+    finally:
+        if render_executor is not None:
+            render_executor.shutdown()
+
+    print(format_fleet_summary(results))
+    gps_summaries = [result["gps"] for result in results if result.get("gps")]
+    if gps_summaries:
+        from gps_analytics import format_gps_summaries
+        print(format_gps_summaries(gps_summaries))
+    print(f"Fleet refresh took {time.perf_counter() - started:.1f} s with {pool_size} workers.")
+
+    os.makedirs(os.path.dirname(summary_file), exist_ok=True)
+    with open(summary_file, mode='w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    return results
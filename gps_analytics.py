@@ -0,0 +1,205 @@
+# filename: gps_analytics.py
+# description: vectorized GPS track analytics for moored Spotters: watch circle, drift speed, outliers and anchor drag
+
+import json
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371008.8
+# A fix that implies a jump faster than this both to and from its neighbours is a GPS glitch
+MAX_FIX_SPEED_M_PER_S = 5.0
+WATCH_CIRCLE_PERCENTILES = (50, 90, 95, 99)
+# Drift speed and the recent watch circle are measured over this trailing window
+RECENT_WINDOW = timedelta(hours=24)
+MIN_REFERENCE_FIXES = 10
+# Anchor drag is suspected when the recent median radius exceeds the earlier 95th percentile radius by
+# this factor and by at least DRAG_MIN_OFFSET_M, so GPS noise on a tight mooring is not flagged
+DRAG_RADIUS_FACTOR = 1.5
+DRAG_MIN_OFFSET_M = 50.0
+GPS_SUMMARY_FILENAME = "gps_summary.json"
+
+
+def gps_track_arrays(wave_data):
+    """Return (times, elapsed_seconds, latitudes, longitudes) NumPy arrays of the GPS fixes, sorted by time.
+
+    `elapsed_seconds` is the cumulative time index (seconds since the first fix) used to select fixes by
+    timestamp with a binary search.
+    """
+    gps_entries = [entry for entry in wave_data["waves"]
+                   if entry.get("latitude") is not None and entry.get("longitude") is not None]
+    times = pd.to_datetime([entry["timestamp"] for entry in gps_entries], utc=True).tz_localize(None).to_numpy()
+    latitudes = np.fromiter((entry["latitude"] for entry in gps_entries), dtype=float, count=len(gps_entries))
+    longitudes = np.fromiter((entry["longitude"] for entry in gps_entries), dtype=float, count=len(gps_entries))
+
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    elapsed_seconds = (times - times[0]) / np.timedelta64(1, 's') if len(times) else np.empty(0)
+    return times, elapsed_seconds, latitudes[order], longitudes[order]
+
+
+def haversine_m(latitudes, longitudes, other_latitudes, other_longitudes):
+    """Return great-circle distances in metres between arrays (or scalars) of positions in degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (latitudes, longitudes, other_latitudes, other_longitudes))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def valid_fix_mask(elapsed_seconds, latitudes, longitudes, max_speed=MAX_FIX_SPEED_M_PER_S):
+    """Return a boolean mask of the fixes to keep.
+
+    Fixes with missing or out-of-range coordinates (including the 0, 0 'null island' fix) are rejected,
+    as are isolated spikes: fixes reached from the previous fix and left to the next fix faster than
+    `max_speed`. A unit that has broken free moves far slower than that, so genuine drift is kept.
+    """
+    valid = (np.isfinite(latitudes) & np.isfinite(longitudes) & (np.abs(latitudes) <= 90)
+             & (np.abs(longitudes) <= 180) & ~((latitudes == 0) & (longitudes == 0)))
+    indices = np.flatnonzero(valid)
+    if len(indices) < 3:
+        return valid
+    step_m = haversine_m(latitudes[indices[:-1]], longitudes[indices[:-1]], latitudes[indices[1:]],
+                         longitudes[indices[1:]])
+    step_s = np.maximum(np.diff(elapsed_seconds[indices]), 1.0)
+    too_fast = step_m / step_s > max_speed
+    spikes = np.zeros(len(indices), dtype=bool)
+    spikes[1:-1] = too_fast[:-1] & too_fast[1:]
+    valid[indices[spikes]] = False
+    return valid
+
+
+def drift_velocity(elapsed_seconds, east_m, north_m):
+    """Return (speed m/s, bearing degrees) of the least-squares linear drift of positions over time."""
+    if len(elapsed_seconds) < 2 or np.ptp(elapsed_seconds) == 0:
+        return 0.0, None
+    t = elapsed_seconds - elapsed_seconds.mean()
+    variance = np.dot(t, t)
+    east_speed = np.dot(t, east_m - east_m.mean()) / variance
+    north_speed = np.dot(t, north_m - north_m.mean()) / variance
+    return float(np.hypot(east_speed, north_speed)), float(np.degrees(np.arctan2(east_speed, north_speed)) % 360)
+
+
+def radius_percentiles(distances_m, prefix="radius"):
+    """Return {'<prefix>_p50_m': ..., ...} watch circle radius percentiles, or None values without fixes."""
+    if not len(distances_m):
+        return {f"{prefix}_p{percentile}_m": None for percentile in WATCH_CIRCLE_PERCENTILES}
+    values = np.percentile(distances_m, WATCH_CIRCLE_PERCENTILES)
+    return {f"{prefix}_p{percentile}_m": round(float(value), 1)
+            for percentile, value in zip(WATCH_CIRCLE_PERCENTILES, values)}
+
+
+def analyze_track(times, elapsed_seconds, latitudes, longitudes, anchor=None, recent_window=RECENT_WINDOW):
+    """Compute a compact watch circle and drift summary of one time-sorted GPS track.
+
+    Distances are measured from `anchor` (latitude, longitude) if given, otherwise from the median
+    position of the valid fixes. The recent window is compared with the fixes before it to flag a
+    suspected anchor drag; positions are projected onto a local east/north plane around the anchor to
+    fit the drift velocity.
+    """
+    valid = valid_fix_mask(elapsed_seconds, latitudes, longitudes)
+    summary = {"fixes": int(len(latitudes)), "rejected_fixes": int(len(latitudes) - valid.sum())}
+    times, elapsed_seconds = times[valid], elapsed_seconds[valid]
+    latitudes, longitudes = latitudes[valid], longitudes[valid]
+    if not len(latitudes):
+        return {**summary, "status": "no_fixes"}
+
+    if anchor is None:
+        anchor_latitude, anchor_longitude = float(np.median(latitudes)), float(np.median(longitudes))
+    else:
+        anchor_latitude, anchor_longitude = map(float, anchor)
+    distances_m = haversine_m(latitudes, longitudes, anchor_latitude, anchor_longitude)
+    east_m = np.radians(longitudes - anchor_longitude) * EARTH_RADIUS_M * np.cos(np.radians(anchor_latitude))
+    north_m = np.radians(latitudes - anchor_latitude) * EARTH_RADIUS_M
+
+    recent = elapsed_seconds >= elapsed_seconds[-1] - recent_window.total_seconds()
+    reference_distances_m = distances_m[~recent]
+    drift_speed, drift_bearing = drift_velocity(elapsed_seconds[recent], east_m[recent], north_m[recent])
+    step_m = haversine_m(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+    step_s = np.maximum(np.diff(elapsed_seconds), 1.0)
+
+    summary.update(
+        first_fix=pd.Timestamp(times[0]).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        last_fix=pd.Timestamp(times[-1]).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        anchor_latitude=round(anchor_latitude, 6),
+        anchor_longitude=round(anchor_longitude, 6),
+        anchor_source="configured" if anchor is not None else "median",
+        **radius_percentiles(distances_m),
+        radius_max_m=round(float(distances_m.max()), 1),
+        **radius_percentiles(reference_distances_m, "reference_radius"),
+        **radius_percentiles(distances_m[recent], "recent_radius"),
+        last_distance_m=round(float(distances_m[-1]), 1),
+        drift_speed_m_per_s=round(drift_speed, 4),
+        drift_bearing_deg=round(drift_bearing, 1) if drift_bearing is not None else None,
+        max_fix_speed_m_per_s=round(float((step_m / step_s).max()), 3) if len(step_m) else None,
+    )
+
+    summary["status"] = "ok"
+    if len(reference_distances_m) >= MIN_REFERENCE_FIXES:
+        reference_radius = summary["reference_radius_p95_m"]
+        drag_radius = max(reference_radius * DRAG_RADIUS_FACTOR, reference_radius + DRAG_MIN_OFFSET_M)
+        if summary["recent_radius_p50_m"] > drag_radius:
+            summary["status"] = "drag_suspected"
+    else:
+        summary["status"] = "insufficient_history"
+    return summary
+
+
+def gps_summary(spotter_id, wave_data, anchor=None):
+    """Return the compact GPS summary of a spotter from the GPS fixes in `wave_data['waves']`."""
+    times, elapsed_seconds, latitudes, longitudes = gps_track_arrays(wave_data)
+    return {"spotter_id": spotter_id, **analyze_track(times, elapsed_seconds, latitudes, longitudes, anchor)}
+
+
+class GPSTrack:
+    """Raw GPS fixes collected chunk by chunk as compact NumPy arrays, e.g. while streaming.
+
+    A fix takes 24 bytes (time, latitude, longitude), so a whole deployment fits in memory even when its
+    wave records do not. Summaries are computed from the raw fixes, not from time-bucket averages, so a
+    glitch is rejected rather than averaged into its bucket.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def add_wave_entries(self, entries):
+        """Add the GPS fixes of a list of 'waves' records."""
+        times, _, latitudes, longitudes = gps_track_arrays({"waves": entries})
+        if len(times):
+            self._chunks.append((times, latitudes, longitudes))
+
+    def arrays(self):
+        """Return (times, elapsed_seconds, latitudes, longitudes) of all fixes added, sorted by time."""
+        if not self._chunks:
+            return gps_track_arrays({"waves": []})
+        times, latitudes, longitudes = (np.concatenate(parts) for parts in zip(*self._chunks))
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        return times, (times - times[0]) / np.timedelta64(1, 's'), latitudes[order], longitudes[order]
+
+    def summary(self, spotter_id, anchor=None):
+        """Return the compact GPS summary of the fixes added, as `gps_summary` does for wave data."""
+        return {"spotter_id": spotter_id, **analyze_track(*self.arrays(), anchor)}
+
+
+def save_gps_summary(summary, directory):
+    """Write a GPS summary as <directory>/gps_summary.json and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, GPS_SUMMARY_FILENAME)
+    with open(filename, mode='w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+    return filename
+
+
+def format_gps_summaries(summaries):
+    """Format GPS summaries of several spotters as a plain-text table, suspected drags first."""
+    lines = [f"{'Spotter':<16}{'Status':<22}{'Fixes':>8}{'Rejected':>10}{'p95 m':>9}{'Recent p50 m':>14}"
+             f"{'Drift m/s':>11}"]
+    order = {"drag_suspected": 0, "ok": 1}
+    for summary in sorted(summaries, key=lambda summary: order.get(summary.get("status"), 2)):
+        lines.append(
+            f"{summary['spotter_id']:<16}{summary.get('status', ''):<22}{summary.get('fixes', 0):>8}"
+            f"{summary.get('rejected_fixes', 0):>10}{summary.get('radius_p95_m') or 0:>9.1f}"
+            f"{summary.get('recent_radius_p50_m') or 0:>14.1f}{summary.get('drift_speed_m_per_s') or 0:>11.4f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+# filename: instrumentation.py
+# description: per-stage timers and counters (fetch, decode, write, rollup, gps, plot) with JSON lines, summary table and trace export
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+STAGES = ("fetch", "cache_load", "decode", "write", "rollup", "gps", "plot")
+
+
+class MetricsRecorder:
+    """Collect timing and row/byte counters per spotter and stage from any thread.
+
+    Every measurement is folded into running totals for the summary table. If a JSON lines log is open,
+    each measurement is also written to it as one event, and with tracing enabled events are kept so they
+    can be exported in Chrome trace format (chrome://tracing or https://ui.perfetto.dev).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "bytes": 0})
+        self._log_file = None
+        self._trace_events = None
+
+    def open_log(self, path):
+        """Append every following measurement to `path` as a JSON line."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            self._log_file = open(path, mode='a', encoding='utf-8')
+
+    def enable_trace(self):
+        """Keep individual events for `export_chrome_trace`."""
+        with self._lock:
+            self._trace_events = []
+
+    def close(self):
+        """Close the JSON lines log, if open."""
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def reset(self):
+        """Forget all totals and kept events."""
+        with self._lock:
+            self._totals.clear()
+            if self._trace_events is not None:
+                self._trace_events = []
+
+    def record(self, stage, seconds, spotter_id=None, rows=0, bytes=0, started=None, **fields):
+        """Record one measurement of `stage` taking `seconds`, with optional row and byte counts."""
+        event = {"time": time.time(), "spotter_id": spotter_id, "stage": stage, "seconds": round(seconds, 6),
+                 "rows": rows, "bytes": bytes, **fields}
+        with self._lock:
+            totals = self._totals[(spotter_id, stage)]
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+            totals["rows"] += rows
+            totals["bytes"] += bytes
+            if self._log_file is not None:
+                self._log_file.write(json.dumps(event, default=str) + "\n")
+                self._log_file.flush()
+            if self._trace_events is not None:
+                start = started if started is not None else time.perf_counter() - seconds
+                self._trace_events.append({
+                    "name": stage, "cat": spotter_id or "", "ph": "X", "ts": start * 1e6, "dur": seconds * 1e6,
+                    "pid": os.getpid(), "tid": threading.get_ident(),
+                    "args": {"rows": rows, "bytes": bytes, **fields},
+                })
+
+    @contextmanager
+    def timer(self, stage, spotter_id=None, **fields):
+        """Time the body of a `with` block; the yielded dict can be updated with 'rows', 'bytes' or other fields."""
+        measurement = dict(fields)
+        started = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            self.record(stage, time.perf_counter() - started, spotter_id, started=started, **measurement)
+
+    def summary(self, spotter_id=None):
+        """Return {spotter_id: {stage: totals}} with rows per second added, optionally for one spotter only."""
+        with self._lock:
+            items = [(key, dict(totals)) for key, totals in self._totals.items()]
+        summary = defaultdict(dict)
+        for (spotter, stage), totals in items:
+            if spotter_id is not None and spotter != spotter_id:
+                continue
+            totals["seconds"] = round(totals["seconds"], 3)
+            totals["max_seconds"] = round(totals["max_seconds"], 3)
+            totals["rows_per_second"] = round(totals["rows"] / totals["seconds"], 1) if totals["seconds"] else None
+            summary[spotter][stage] = totals
+        return dict(summary)
+
+    def format_summary(self):
+        """Format the totals as a plain-text table, one row per spotter and stage."""
+        lines = [f"{'Spotter':<16}{'Stage':<12}{'Calls':>7}{'Seconds':>10}{'Max s':>8}{'Rows':>10}{'Rows/s':>11}{'MB':>9}"]
+        stage_order = {stage: index for index, stage in enumerate(STAGES)}
+        for spotter, stages in sorted(self.summary().items(), key=lambda item: str(item[0])):
+            for stage, totals in sorted(stages.items(), key=lambda item: stage_order.get(item[0], len(STAGES))):
+                rows_per_second = totals["rows_per_second"] if totals["rows_per_second"] is not None else 0
+                lines.append(
+                    f"{str(spotter):<16}{stage:<12}{totals['calls']:>7}{totals['seconds']:>10.2f}"
+                    f"{totals['max_seconds']:>8.2f}{totals['rows']:>10}{rows_per_second:>11.0f}"
+                    f"{totals['bytes'] / 1e6:>9.2f}"
+                )
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path):
+        """Write kept events as a Chrome trace JSON file; requires `enable_trace` before the run."""
+        with self._lock:
+            events = list(self._trace_events or [])
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, mode='w', encoding='utf-8') as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+# Shared recorder used by the pipeline
+metrics = MetricsRecorder()
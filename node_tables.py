@@ -0,0 +1,123 @@
+# filename: node_tables.py
+# description: one timestamp-indexed table per smart mooring node, pairing mean/std readings with an as-of join
+
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+# Mean and std messages of one reading may arrive a few seconds apart
+PAIR_TOLERANCE = timedelta(seconds=60)
+
+# Table column prefix -> (mean data type, std data type)
+SENSOR_PAIRS = {
+    "speed": ("aanderaa_abs_speed_mean_15bits", "aanderaa_abs_speed_std_15bits"),
+    "tilt": ("aanderaa_abs_tilt_mean_8bits", "aanderaa_std_tilt_mean_8bits"),
+}
+FORCE_COLUMNS = ["min_force", "max_force", "mean_force"]
+NODE_TABLE_COLUMNS = [f"{name}_{stat}" for name in SENSOR_PAIRS for stat in ("mean", "std")] + FORCE_COLUMNS
+
+
+def empty_node_table():
+    """Return a node table with no rows."""
+    return pd.DataFrame(columns=NODE_TABLE_COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="timestamp"),
+                        dtype="float64")
+
+
+def build_node_table(node_entries, tolerance=PAIR_TOLERANCE):
+    """Pivot one node's parsed entries into a table indexed by UTC timestamp with NODE_TABLE_COLUMNS.
+
+    Each std reading is paired with the nearest mean reading of the same sensor within `tolerance`, so
+    pairs whose timestamps differ slightly are kept. Force statistics are indexed by their own timestamps;
+    columns without a reading at a timestamp are NaN.
+    """
+    df = pd.DataFrame.from_records(node_entries, columns=["timestamp", "data_type_name", "value"] + FORCE_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+    df = df.dropna(subset=["timestamp"])
+    if df.empty:
+        return empty_node_table()
+
+    by_type = {data_type: rows for data_type, rows in df.groupby("data_type_name", sort=False)}
+    parts = []
+    for name, (mean_type, std_type) in SENSOR_PAIRS.items():
+        if mean_type not in by_type:
+            continue
+        pair = by_type[mean_type][["timestamp", "value"]].rename(columns={"value": f"{name}_mean"})
+        pair = pair.sort_values("timestamp", kind="stable")
+        if std_type in by_type:
+            std = by_type[std_type][["timestamp", "value"]].rename(columns={"value": f"{name}_std"})
+            pair = pd.merge_asof(pair, std.sort_values("timestamp", kind="stable"), on="timestamp",
+                                 direction="nearest", tolerance=pd.Timedelta(tolerance))
+        parts.append(pair.set_index("timestamp"))
+
+    force = df.loc[df["max_force"].notna() | df["mean_force"].notna(), ["timestamp"] + FORCE_COLUMNS]
+    if not force.empty:
+        parts.append(force.set_index("timestamp"))
+
+    if not parts:
+        return empty_node_table()
+    # Repeated timestamps within one series (re-sent messages) would make the column join ambiguous
+    parts = [part[~part.index.duplicated(keep="first")] for part in parts]
+    table = pd.concat(parts, axis=1, sort=True).reindex(columns=NODE_TABLE_COLUMNS)
+    table.index.name = "timestamp"
+    return table.astype("float64")
+
+
+def build_node_tables(grouped_data, tolerance=PAIR_TOLERANCE):
+    """Return node_id -> node table for parsed smart mooring data grouped by node."""
+    return {node_id: build_node_table(node_entries, tolerance) for node_id, node_entries in grouped_data.items()}
+
+
+class NodeTableBuilder:
+    """Build node tables chunk by chunk, carrying readings at the end of a chunk over to the next one.
+
+    A chunk or poll boundary can fall between the mean and std messages of one reading, and building each
+    chunk on its own would then give that reading a NaN std. Entries within `tolerance` of a node's newest
+    timestamp are therefore held back and built with the next chunk, so chunks must be added in time
+    order. `fetched_at` is the oldest fetch time (seconds since the epoch) of the held-back entries.
+    """
+
+    def __init__(self, tolerance=PAIR_TOLERANCE):
+        self.tolerance = pd.Timedelta(tolerance)
+        self.pending = {}  # node_id -> held-back entries
+        self.fetched_at = None
+
+    def add(self, grouped_data, fetched_at=None):
+        """Return node_id -> node table for the entries of `grouped_data` that can no longer pair with later ones."""
+        fetched_at = fetched_at or time.time()
+        tables = {}
+        held = False
+        for node_id, node_entries in grouped_data.items():
+            entries = self.pending.pop(node_id, []) + list(node_entries)
+            timestamps = pd.to_datetime([entry.get("timestamp") for entry in entries], utc=True, errors="coerce")
+            hold = (timestamps >= timestamps.max() - self.tolerance) if timestamps.notna().any() \
+                else [False] * len(entries)
+            pending = [entry for entry, keep in zip(entries, hold) if keep]
+            if pending:
+                self.pending[node_id] = pending
+                held = True
+            tables[node_id] = build_node_table([entry for entry, keep in zip(entries, hold) if not keep],
+                                               self.tolerance)
+        if not self.pending:
+            self.fetched_at = None
+        elif held:
+            self.fetched_at = min(self.fetched_at or fetched_at, fetched_at)
+        return tables
+
+    def flush(self):
+        """Return node tables of all held-back entries and forget them."""
+        tables = build_node_tables(self.pending, self.tolerance)
+        self.pending = {}
+        self.fetched_at = None
+        return tables
+
+
+def node_table_rows(table):
+    """Return a node table as CSV row dicts with API-style timestamps and empty cells for missing values."""
+    if table.empty:
+        return []
+    timestamps = table.index.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3] + "Z"
+    values = table.to_numpy(dtype=object)
+    values[pd.isna(table).to_numpy()] = None
+    return [dict(zip(["timestamp"] + NODE_TABLE_COLUMNS, (timestamp, *row)))
+            for timestamp, row in zip(timestamps, values)]
@@ -0,0 +1,105 @@
+# filename: parquet_writer.py
+# description: typed, partitioned Parquet output for parsed wave and smart mooring data (requires pyarrow)
+
+import os
+
+import pandas as pd
+
+PARQUET_BASE_DIRECTORY = os.path.join('parsed_data', 'parquet')
+
+SMART_MOORING_FLOAT_COLUMNS = ["latitude", "longitude", "min_force", "max_force", "mean_force", "value"]
+
+
+def partition_directory(base_directory, **partitions):
+    """Return a hive-style partition path such as base/spotter_id=X/node_id=Y/date=Z."""
+    return os.path.join(base_directory, *[f"{name}={value}" for name, value in partitions.items()])
+
+
+def upsert_partition(df, directory, key_columns):
+    """Merge `df` into the single Parquet file of a partition, dropping duplicate keys."""
+    os.makedirs(directory, exist_ok=True)
+    parquet_filename = os.path.join(directory, "data.parquet")
+    if os.path.exists(parquet_filename):
+        df = pd.concat([pd.read_parquet(parquet_filename), df], ignore_index=True)
+    df = df.drop_duplicates(subset=key_columns, keep="first").sort_values("timestamp", kind="stable")
+    df.to_parquet(parquet_filename, index=False)
+
+
+def write_partitioned(df, base_directory, partitions, key_columns):
+    """Split `df` by day and upsert each day into base/<partitions>/date=YYYY-MM-DD/data.parquet."""
+    if df.empty:
+        return
+    dates = df["timestamp"].dt.strftime("%Y-%m-%d")
+    for date, day_df in df.groupby(dates, sort=True):
+        upsert_partition(day_df, partition_directory(base_directory, **partitions, date=date), key_columns)
+
+
+def smart_mooring_frame(node_entries):
+    """Build a typed DataFrame from parsed smart mooring entries."""
+    df = pd.DataFrame(node_entries)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    for column in SMART_MOORING_FLOAT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    for column in ("data_type_name", "decoded_value", "unit"):
+        if column in df:
+            df[column] = df[column].astype("string")
+    return df
+
+
+def wave_frame(entries):
+    """Build a typed DataFrame from wave, wind, SST or barometer entries, converting numeric fields to floats."""
+    df = pd.DataFrame(entries)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    for column in df.columns.drop("timestamp"):
+        numeric = pd.to_numeric(df[column], errors="coerce")
+        # Only convert columns that are entirely numeric, leaving text fields such as processingSource alone
+        if numeric.notna().sum() == df[column].notna().sum():
+            df[column] = numeric.astype("float64")
+    return df
+
+
+def save_smart_mooring_parquet(spotter_id, grouped_data, base_directory=PARQUET_BASE_DIRECTORY):
+    """Write parsed smart mooring data partitioned by spotter_id/node_id/date."""
+    for node_id, node_entries in grouped_data.items():
+        if not node_entries:
+            continue
+        write_partitioned(
+            smart_mooring_frame(node_entries),
+            os.path.join(base_directory, "smart_mooring"),
+            {"spotter_id": spotter_id, "node_id": node_id},
+            key_columns=["timestamp", "data_type_name"],
+        )
+
+
+def wave_dataset_directory(stream, base_directory=PARQUET_BASE_DIRECTORY):
+    """Return the dataset root of one wave stream, e.g. parsed_data/parquet/spotter_wave/waves."""
+    return os.path.join(base_directory, "spotter_wave", stream)
+
+
+def save_wave_parquet(spotter_id, api_data_wave, base_directory=PARQUET_BASE_DIRECTORY):
+    """Write wave, wind, SST and barometer data partitioned by spotter_id/date, one dataset per stream.
+
+    The streams have different fields, so each gets its own dataset root (see `wave_dataset_directory`)
+    and a dataset never mixes schemas.
+    """
+    for stream in ("waves", "wind", "surfaceTemp", "barometerData"):
+        entries = api_data_wave["data"].get(stream)
+        if not entries:
+            continue
+        write_partitioned(
+            wave_frame(entries),
+            wave_dataset_directory(stream, base_directory),
+            {"spotter_id": spotter_id},
+            key_columns=["timestamp"],
+        )
+
+
+def load_parquet(base_directory, columns=None, filters=None):
+    """Load a partitioned dataset, reading only `columns` and the partitions/rows matching `filters`.
+
+    Example: load_parquet("parsed_data/parquet/smart_mooring", columns=["timestamp", "max_force"],
+    filters=[("node_id", "==", "abc"), ("date", ">=", "2025-01-01")]), or for wave data
+    load_parquet(wave_dataset_directory("waves"), columns=["timestamp", "significantWaveHeight"]).
+    """
+    return pd.read_parquet(base_directory, columns=columns, filters=filters)
@@ -0,0 +1,466 @@
+# filename: plotting.py
+# description: time series and GPS plots for Spotter wave and smart mooring data, interactive or rendered to files
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.widgets import Slider
+import numpy as np
+import pandas as pd
+
+from decimation import MAX_PLOT_POINTS, decimation_indices, stride_indices
+from gps_analytics import gps_track_arrays
+
+
+def plot_data(node_tables, unique_node_ids, wave_data, spotter_id, output_files=None, max_points=MAX_PLOT_POINTS):
+    """Generate time series plots for significant wave height, current speed, sensor tilt, and force.
+
+    `node_tables` maps each node ID to its timestamp-indexed table from `node_tables.build_node_tables`.
+
+    Each series is decimated to at most `max_points` points; zooming in an interactive window redraws the
+    visible range from the full-resolution data. If `output_files` is given, the figure is saved to each
+    path and closed instead of being shown.
+    """
+    marker_size = 2
+    line_alpha = 0.5
+    # Zoom-dependent re-decimation is only needed in an interactive window
+    interactive = not output_files
+    scatter_alpha = 1.0
+    plt.rcParams['font.family'] = 'Arial'  # or 'Roboto'
+
+    # Color style guide follow Sofar Dashboard
+    color_blue_bright = '#0066FF'
+    color_blue_light = '#1ca8dd'
+    color_blue_deep = '#0050A0' ##0000CD'
+    color_brown_light = '#8B4513'
+    color_brown_dark = '#A52A2A'
+    color_green_dark = '#228B22'
+
+    data_line_color = color_blue_light  # Soft cyan/blue color
+    std_fill_color = color_blue_light   # Using the same color but with alpha for transparency in fill
+
+    fig, axs = plt.subplots(4, 1, figsize=(12, 12), sharex=True)
+    fig.suptitle(f"Time Series Data for Spotter ID: {spotter_id}", fontsize=16)
+
+    # Conversion factors
+    meter_to_feet = 3.28084
+    m_per_s_to_knots = 1.94384
+    newton_to_lbf = 0.224809
+    rad_to_deg = 57.2958  # Conversion from radians to degrees
+
+    # Plot 1: Significant Wave Height with secondary y-axis in feet
+    wave_df = pd.DataFrame(wave_data["waves"])
+    wave_df["timestamp"] = pd.to_datetime(wave_df["timestamp"])
+    wave_height_m = wave_df["significantWaveHeight"]
+    # Line with a lower alpha, markers with a higher alpha
+    plot_decimated(axs[0], wave_df["timestamp"], wave_height_m, color_blue_light, "Significant Wave Height (m)",
+                   max_points=max_points, marker_size=marker_size, line_alpha=line_alpha,
+                   scatter_alpha=scatter_alpha, interactive=interactive)
+    axs[0].set_ylabel("Wave Height (m)", color='black')
+    axs[0].tick_params(axis='y', labelcolor='black')
+
+    ax_wave_feet = axs[0].twinx()
+    ax_wave_feet.set_ylabel("Wave Height (ft)", color='black')
+    ax_wave_feet.set_ylim(wave_height_m.min() * meter_to_feet, wave_height_m.max() * meter_to_feet)
+    ax_wave_feet.tick_params(axis='y', labelcolor='black')
+    axs[0].legend(loc="upper left")
+
+    for node_id in unique_node_ids:
+        node_table = node_tables[node_id]
+
+        # Plot 2: Current Speed with secondary y-axis in knots, showing standard deviation shading
+        merged_speed_data = node_table[["speed_mean", "speed_std"]].dropna().reset_index()
+        if not merged_speed_data.empty:
+            speed_mean = merged_speed_data["speed_mean"]
+            speed_std = merged_speed_data["speed_std"]
+
+            # axs[1].plot(merged_speed_data["timestamp"], speed_mean, color=color_blue_light, marker='o', linestyle='-', markersize=marker_size, label=f"{node_id} - Current Speed (m/s)", alpha=line_alpha)
+
+            plot_decimated(
+                axs[1], merged_speed_data["timestamp"], speed_mean, color_blue_light, f"{node_id} - Current Speed (m/s)",
+                max_points=max_points, marker_size=marker_size, line_alpha=line_alpha, scatter_alpha=scatter_alpha,
+                interactive=interactive, band=(speed_mean - speed_std, speed_mean + speed_std))
+            axs[1].set_ylabel("Current Speed (m/s)", color='black')
+            axs[1].tick_params(axis='y', labelcolor='black')
+
+            ax_speed_knots = axs[1].twinx()
+            ax_speed_knots.set_ylabel("Current Speed (knots)", color='black')
+            ax_speed_knots.set_ylim(axs[1].get_ylim()[0] * m_per_s_to_knots, axs[1].get_ylim()[1] * m_per_s_to_knots)
+            ax_speed_knots.tick_params(axis='y', labelcolor='black')
+            axs[1].legend(loc="upper left")
+
+        merged_tilt_data = node_table[["tilt_mean", "tilt_std"]].dropna().reset_index()
+        if not merged_tilt_data.empty:
+            tilt_mean_rad = merged_tilt_data["tilt_mean"]
+            tilt_std_rad = merged_tilt_data["tilt_std"]
+
+            # Plot the mean tilt in radians
+            plot_decimated(
+                axs[2], merged_tilt_data["timestamp"], tilt_mean_rad, color_blue_light, f"{node_id} - Sensor Tilt (radians)",
+                max_points=max_points, marker_size=marker_size, line_alpha=line_alpha, scatter_alpha=scatter_alpha,
+                interactive=interactive, band=(tilt_mean_rad - tilt_std_rad, tilt_mean_rad + tilt_std_rad))
+            axs[2].set_ylabel("Sensor Tilt (radians)", color='black')
+            axs[2].tick_params(axis='y', labelcolor='black')
+
+            # Create secondary y-axis for degrees
+            ax_tilt_deg = axs[2].twinx()
+            ax_tilt_deg.set_ylabel("Sensor Tilt (degrees)", color='black')
+            ax_tilt_deg.set_ylim(axs[2].get_ylim()[0] * rad_to_deg, axs[2].get_ylim()[1] * rad_to_deg)
+            ax_tilt_deg.tick_params(axis='y', labelcolor='black')
+            axs[2].legend(loc="upper left")
+            # Plot 3: Sensor Tilt in radians with secondary y-axis in degrees
+
+
+        # Plot 4: Force with secondary y-axis in pounds-force
+        force_data = node_table.dropna(subset=["mean_force", "max_force"]).reset_index()
+        if not force_data.empty:
+            mean_force = force_data["mean_force"]
+            max_force = force_data["max_force"]
+            plot_decimated(axs[3], force_data["timestamp"], mean_force, color_blue_light, f"{node_id} - Mean Force (N)",
+                           max_points=max_points, marker_size=marker_size, line_alpha=line_alpha,
+                           scatter_alpha=scatter_alpha, interactive=interactive)
+
+            # Min-max decimation so every force peak stays visible
+            plot_decimated(axs[3], force_data["timestamp"], max_force, color_blue_bright, f"{node_id} - Max Force (N)",
+                           max_points=max_points, method="minmax", marker_size=marker_size, line_alpha=line_alpha,
+                           scatter_alpha=scatter_alpha, interactive=interactive)
+
+
+            axs[3].set_ylabel("Force (N)", color='black')
+            axs[3].tick_params(axis='y', labelcolor='black')
+
+            ax_force_lbf = axs[3].twinx()
+            ax_force_lbf.set_ylabel("Force (lbf)", color='black')
+            ax_force_lbf.set_ylim(axs[3].get_ylim()[0] * newton_to_lbf, axs[3].get_ylim()[1] * newton_to_lbf)
+            ax_force_lbf.tick_params(axis='y', labelcolor='black')
+            axs[3].legend(loc="upper left")
+
+    # Set the x-axis label for the last plot
+    axs[3].xaxis_date()
+    axs[3].set_xlabel("Time UTC")
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    show_or_save(fig, output_files)
+
+
+def to_date_numbers(timestamps):
+    """Convert timestamps to matplotlib date numbers (UTC), the float x values used by the time series axes."""
+    times = pd.to_datetime(pd.Series(timestamps), utc=True).dt.tz_localize(None)
+    return mdates.date2num(times.to_numpy())
+
+
+def band_vertices(x, lower, upper):
+    """Return the outline of a filled band between `lower` and `upper`, as `fill_between` draws it."""
+    return np.column_stack([np.concatenate([x, x[::-1]]), np.concatenate([upper, lower[::-1]])])
+
+
+def plot_decimated(ax, timestamps, values, color, label, max_points=MAX_PLOT_POINTS, method="lttb",
+                   marker_size=2, line_alpha=0.5, scatter_alpha=1.0, interactive=True, band=None,
+                   band_label="Std Dev"):
+    """Plot a series as a line with markers, drawing at most `max_points` decimated points.
+
+    `band` is an optional (lower, upper) pair of series aligned with `values`, filled between at the same
+    decimated points, e.g. mean ± std. If `interactive`, the full-resolution series is kept by an axes
+    callback: whenever the x limits change (zoom or pan), the visible range is decimated again and the
+    line, markers and band are redrawn from it, so zoomed views show every point once few enough are in
+    view. Returns the plotted x values and the indices of `values` they were taken from.
+    """
+    x = to_date_numbers(timestamps)
+    y = np.asarray(values, dtype=float)
+    order = np.argsort(x, kind="stable")
+    x, y = x[order], y[order]
+
+    indices = decimation_indices(x, y, max_points, method)
+    line, = ax.plot(x[indices], y[indices], color=color, linestyle='-', label=label, alpha=line_alpha)
+    points = ax.scatter(x[indices], y[indices], color=color, marker='o', s=marker_size ** 2, alpha=scatter_alpha)
+    fill = None
+    if band is not None:
+        lower, upper = (np.asarray(bound, dtype=float)[order] for bound in band)
+        fill = ax.fill_between(x[indices], lower[indices], upper[indices], color=color, alpha=0.2, label=band_label)
+
+    if not interactive:
+        return x[indices], order[indices]
+
+    visible_range = (0, len(x))
+
+    def redecimate(changed_ax):
+        nonlocal visible_range
+        x_min, x_max = changed_ax.get_xlim()
+        # Keep one point either side so lines run to the edge of the view
+        start = max(np.searchsorted(x, x_min) - 1, 0)
+        end = min(np.searchsorted(x, x_max) + 1, len(x))
+        # Autoscaling changes the limits many times without changing which points are visible
+        if (start, end) == visible_range:
+            return
+        visible_range = (start, end)
+        visible = indices if (start, end) == (0, len(x)) else \
+            start + decimation_indices(x[start:end], y[start:end], max_points, method)
+        line.set_data(x[visible], y[visible])
+        points.set_offsets(np.column_stack([x[visible], y[visible]]))
+        if fill is not None:
+            fill.set_verts([band_vertices(x[visible], lower[visible], upper[visible])])
+
+    ax.callbacks.connect('xlim_changed', redecimate)
+    return x[indices], order[indices]
+
+
+def select_track_range(times, start=None, end=None):
+    """Return inclusive (start_index, end_index) of the fixes between `start` and `end`.
+
+    `start` and `end` may be fix indices (int) or timestamps (str, datetime or pandas Timestamp); a timestamp
+    selects the first fix at or after `start` and the last fix at or before `end`.
+    """
+    def to_index(value, default, side):
+        if value is None:
+            return default
+        if isinstance(value, (int, np.integer)):
+            return int(np.clip(value, 0, len(times) - 1))
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+        position = np.searchsorted(times, timestamp.to_datetime64(), side=side)
+        return int(np.clip(position if side == "left" else position - 1, 0, len(times) - 1))
+
+    start_index = to_index(start, 0, "left")
+    end_index = to_index(end, len(times) - 1, "right")
+    return start_index, max(start_index, end_index)
+
+
+def plot_gps_coordinates(wave_data, spotter_id, output_files=None, max_points=MAX_PLOT_POINTS, scrub_by="time",
+                         start=None, end=None):
+    """Plot GPS coordinates from Spotter wave data with specific formatting and dual scrubbers.
+
+    The scrubbers select the start and end of the visible track by elapsed time (`scrub_by="time"`) or by fix
+    index (`scrub_by="index"`) and redraw only the track and its end markers (blitting). At most `max_points`
+    evenly spaced fixes of the selected range are drawn. `start` and `end` set the initial selection as fix
+    indices or timestamps (see `select_track_range`). If `output_files` is given, the selected track is saved
+    to each path without the scrubbers and the figure is closed instead of being shown.
+    """
+
+    # Check if wave_data contains the expected structure
+    if "waves" not in wave_data:
+        print("Error: 'waves' key not found in wave_data.")
+        return
+    if scrub_by not in ("time", "index"):
+        raise ValueError(f"Invalid scrub_by: {scrub_by}")
+
+    # Extract time-sorted latitude, longitude and timestamp arrays
+    times, elapsed_seconds, latitudes, longitudes = gps_track_arrays(wave_data)
+
+    # Check if we have any valid GPS entries
+    if len(times) == 0:
+        print("No GPS data available in the wave data.")
+        return
+
+    start_index, end_index = select_track_range(times, start, end)
+    start_time = pd.Timestamp(times[start_index]).strftime("%Y-%m-%d %H:%M:%S")
+    end_time = pd.Timestamp(times[end_index]).strftime("%Y-%m-%d %H:%M:%S")
+
+    # Set font to Arial
+    plt.rcParams['font.family'] = 'Arial'
+
+    # Create the figure and main plot
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.set_facecolor('#0077B6')  # Set plot area background to blue to match reference
+
+    # Grid spacing adapts to the extent of the track (about 10 m on a tight watch circle, wider on long drifts)
+    ax.xaxis.set_major_locator(plt.MaxNLocator(nbins=8, steps=[1, 2, 2.5, 5, 10]))
+    ax.yaxis.set_major_locator(plt.MaxNLocator(nbins=8, steps=[1, 2, 2.5, 5, 10]))
+
+    # Initial plot of GPS points with white dotted lines between them
+    track_indices = start_index + stride_indices(end_index - start_index + 1, max_points)
+    plot, = ax.plot(longitudes[track_indices], latitudes[track_indices], color='white', linestyle=':', marker='o',
+                    markerfacecolor='#FFB000', markeredgewidth=0.5, markersize=5,
+                    label="GPS Path", alpha=0.7)
+
+    # Mark the start and end points with different colors
+    start_marker = ax.scatter(longitudes[start_index], latitudes[start_index], color="green", marker="o", s=100, label="Start")
+    end_marker = ax.scatter(longitudes[end_index], latitudes[end_index], color="red", marker="o", s=100, label="End")
+
+    # Add title and time span subtitle without overlap
+    plt.title(f"GPS Plot of Latitude and Longitude for SPOT ID: {spotter_id}", fontsize=14, color='black', pad=20)
+    plt.figtext(0.5, 0.88, f"Time Span: {start_time} to {end_time}", fontsize=10, ha='center', color='black')
+
+    # Add labels for axes with black text color
+    ax.set_xlabel("Longitude", color='black')
+    ax.set_ylabel("Latitude", color='black')
+
+    # Set axis to have equal scaling and a square aspect ratio
+    ax.set_aspect('equal', 'box')
+
+    # Show legend
+    ax.legend(loc="upper right", frameon=False, fontsize=8)
+
+    # Show grid for easier geographic reference
+    ax.grid(True, linestyle="--", color="white", alpha=0.4)
+
+    # Scrubbers are only useful in an interactive window
+    if output_files:
+        show_or_save(fig, output_files)
+        return
+
+    # Adjust layout to make space for the sliders
+    plt.subplots_adjust(bottom=0.25)
+
+    # Create sliders for controlling the start and end points of the visible GPS data
+    ax_slider_start = plt.axes([0.2, 0.1, 0.6, 0.03], facecolor="lightgrey")
+    ax_slider_end = plt.axes([0.2, 0.05, 0.6, 0.03], facecolor="lightgrey")
+
+    if scrub_by == "time":
+        # Sliders run over hours since the first fix and display the selected timestamp
+        total_hours = max(elapsed_seconds[-1] / 3600, 1e-6)
+        slider_start = Slider(ax_slider_start, "Start", 0, total_hours, valinit=elapsed_seconds[start_index] / 3600)
+        slider_end = Slider(ax_slider_end, "End", 0, total_hours, valinit=elapsed_seconds[end_index] / 3600)
+    else:
+        slider_start = Slider(ax_slider_start, "Start", 0, len(latitudes) - 1, valinit=start_index, valstep=1)
+        slider_end = Slider(ax_slider_end, "End", 0, len(latitudes) - 1, valinit=end_index, valstep=1)
+
+    # The sliders are redrawn by the blit below instead of triggering a full canvas redraw
+    slider_start.drawon = False
+    slider_end.drawon = False
+
+    def slider_indices():
+        if scrub_by == "time":
+            start_index = int(np.searchsorted(elapsed_seconds, slider_start.val * 3600, side="left"))
+            end_index = int(np.searchsorted(elapsed_seconds, slider_end.val * 3600, side="right")) - 1
+            start_index = min(start_index, len(latitudes) - 1)
+            return start_index, max(end_index, 0)
+        return int(slider_start.val), int(slider_end.val)
+
+    # Only the track and its end markers change while scrubbing; everything else comes from a cached background
+    animated_artists = (plot, start_marker, end_marker)
+    for artist in animated_artists:
+        artist.set_animated(True)
+    background = None
+
+    def draw_animated():
+        for artist in animated_artists:
+            ax.draw_artist(artist)
+        fig.draw_artist(ax_slider_start)
+        fig.draw_artist(ax_slider_end)
+
+    def on_draw(event):
+        nonlocal background
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+        draw_animated()
+
+    fig.canvas.mpl_connect('draw_event', on_draw)
+
+    # Update function for sliders
+    def update(val):
+        start_index, end_index = slider_indices()
+
+        # Ensure start_index is always less than end_index
+        if start_index >= end_index:
+            end_index = start_index + 1 if start_index + 1 < len(latitudes) else start_index
+
+        # Update the plotted data, decimating the selected range
+        selected = start_index + stride_indices(end_index - start_index + 1, max_points)
+        plot.set_data(longitudes[selected], latitudes[selected])
+        start_marker.set_offsets([[longitudes[start_index], latitudes[start_index]]])
+        end_marker.set_offsets([[longitudes[end_index], latitudes[end_index]]])
+        if scrub_by == "time":
+            slider_start.valtext.set_text(pd.Timestamp(times[start_index]).strftime("%m-%d %H:%M"))
+            slider_end.valtext.set_text(pd.Timestamp(times[end_index]).strftime("%m-%d %H:%M"))
+
+        if background is None:
+            fig.canvas.draw_idle()
+            return
+        fig.canvas.restore_region(background)
+        draw_animated()
+        fig.canvas.blit(fig.bbox)
+
+    # Link the sliders to the update function
+    slider_start.on_changed(update)
+    slider_end.on_changed(update)
+    update(None)
+
+    plt.show()
+
+
+def show_or_save(fig, output_files=None):
+    """Show a figure interactively, or save it to every path in `output_files` and close it."""
+    if not output_files:
+        plt.show()
+        return
+    for output_file in output_files:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        fig.savefig(output_file, dpi=150)
+    # Close explicitly so long batch runs do not accumulate open figures
+    plt.close(fig)
+
+
+def use_headless_backend():
+    """Switch matplotlib to the non-interactive Agg backend (used by render worker processes)."""
+    matplotlib.use("Agg", force=True)
+
+
+def render_spotter_report(spotter_id, node_tables, unique_node_ids, wave_data, output_directory, formats=("png",)):
+    """Render the time series and GPS plots for one spotter to files without a display.
+
+    Files are written as <output_directory>/<spotter_id>_timeseries.<format> and ..._gps.<format>.
+    Returns the list of files written.
+    """
+    use_headless_backend()
+    timeseries_files = [os.path.join(output_directory, f"{spotter_id}_timeseries.{fmt}") for fmt in formats]
+    gps_files = [os.path.join(output_directory, f"{spotter_id}_gps.{fmt}") for fmt in formats]
+
+    plot_data(node_tables, unique_node_ids, wave_data, spotter_id, output_files=timeseries_files)
+    written_files = list(timeseries_files)
+    if any("latitude" in entry for entry in wave_data.get("waves", [])):
+        plot_gps_coordinates(wave_data, spotter_id, output_files=gps_files)
+        written_files += gps_files
+    return written_files
+
+
+def decimate_report_data(node_tables, unique_node_ids, wave_data, max_points=MAX_PLOT_POINTS):
+    """Return (node_tables, wave_data) reduced to the rows `render_spotter_report` can draw.
+
+    Each plotted series keeps the points its decimation picks (the GPS track its evenly spaced fixes), and
+    wave records keep only the plotted fields. The plots redecimate the reduced data to the same shape, so
+    a render task sent to a worker process pickles a few thousand rows per series instead of the full data.
+    """
+    plotted_series = ((("speed_mean", "speed_std"), (("speed_mean", "lttb"),)),
+                      (("tilt_mean", "tilt_std"), (("tilt_mean", "lttb"),)),
+                      (("mean_force", "max_force"), (("mean_force", "lttb"), ("max_force", "minmax"))))
+    reduced_tables = {}
+    for node_id in unique_node_ids:
+        node_table = node_tables[node_id]
+        keep = []
+        for columns, decimated in plotted_series:
+            positions = np.flatnonzero(node_table[list(columns)].notna().all(axis=1).to_numpy())
+            if len(positions) == 0:
+                continue
+            x = to_date_numbers(node_table.index[positions])
+            keep += [positions[decimation_indices(x, node_table[column].to_numpy()[positions], max_points, method)]
+                     for column, method in decimated]
+        reduced_tables[node_id] = node_table.iloc[np.unique(np.concatenate(keep))] if keep else node_table.iloc[:0]
+
+    waves = wave_data.get("waves", [])
+    keep = [np.empty(0, dtype=int)]
+    if waves:
+        x = to_date_numbers([entry.get("timestamp") for entry in waves])
+        heights = np.array([entry.get("significantWaveHeight") for entry in waves], dtype=float)
+        order = np.argsort(x, kind="stable")
+        keep.append(order[decimation_indices(x[order], heights[order], max_points)])
+        fixes = np.array([i for i in order if waves[i].get("latitude") is not None
+                          and waves[i].get("longitude") is not None], dtype=int)
+        keep.append(fixes[stride_indices(len(fixes), max_points)])
+    plotted_fields = ("timestamp", "significantWaveHeight", "latitude", "longitude")
+    reduced_waves = [{field: waves[i].get(field) for field in plotted_fields} for i in np.unique(np.concatenate(keep))]
+    return reduced_tables, {"waves": reduced_waves}
+
+
+def create_render_pool(workers):
+    """Return a process pool for rendering reports in parallel, each worker using the Agg backend.
+
+    Submit data reduced by `decimate_report_data`, as every task is pickled to its worker.
+    """
+    # Spawned workers start a fresh interpreter: they re-import the parent's main module and this module
+    # (matplotlib, pandas) once each, but do not inherit the fetch pipeline's threads, locks or sockets
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=use_headless_backend)
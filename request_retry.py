@@ -0,0 +1,91 @@
+# filename: request_retry.py
+# description: timeouts, retry backoff with jitter, Retry-After parsing and an adaptive client-side rate limiter for API requests
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+REQUEST_TIMEOUT = (5, 60)  # (connect, read) seconds
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Client-side request rate bounds (requests per second) for the adaptive limiter
+MAX_REQUEST_RATE = 10.0
+MIN_REQUEST_RATE = 0.2
+
+
+class APIRequestError(Exception):
+    """An API request failed with a non-retryable status or ran out of retries."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def retry_delay(attempt, retry_after=None, base=BACKOFF_BASE_SECONDS, maximum=BACKOFF_MAX_SECONDS):
+    """Return the seconds to wait before retry number `attempt` (0-based).
+
+    A server-provided Retry-After delay is honoured; otherwise exponential backoff with full jitter is used,
+    so concurrent workers do not retry in lockstep.
+    """
+    if retry_after is not None:
+        return min(retry_after, maximum)
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class AdaptiveRateLimiter:
+    """Space out requests across threads, halving the rate on throttling and slowly raising it on success.
+
+    Starts at `max_rate` requests per second and never drops below `min_rate` (additive increase,
+    multiplicative decrease).
+    """
+
+    def __init__(self, max_rate=MAX_REQUEST_RATE, min_rate=MIN_REQUEST_RATE, increase=0.1):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.rate = max_rate
+        self._next_request = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request slot is available."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request)
+            self._next_request = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_success(self):
+        """Raise the rate a little after a successful request."""
+        with self._lock:
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def on_throttle(self, retry_after=None):
+        """Halve the rate after a 429 response and hold all requests until `retry_after` seconds have passed."""
+        with self._lock:
+            self.rate = max(self.rate / 2, self.min_rate)
+            if retry_after:
+                self._next_request = max(self._next_request, time.monotonic() + retry_after)
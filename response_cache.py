@@ -0,0 +1,193 @@
+# filename: response_cache.py
+# description: on-disk SQLite cache of Sofar API chunk responses so closed historical windows are not refetched
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+CACHE_FILE = os.path.join('parsed_data', 'api_cache.sqlite')
+CACHE_SETTLE_TIME = timedelta(hours=6)  # windows ending more recently than this may still receive data
+CACHE_MAX_AGE_DAYS = 90  # evict entries not read for this many days
+CACHE_MAX_BYTES = 500 * 1024 * 1024  # evict least recently used entries above this total payload size
+CHECKPOINT_MAX_AGE = timedelta(days=1)  # checkpoints older than this are not resumed from
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Prefetch threads and concurrent fleet workers share one database file
+_write_lock = threading.Lock()
+
+
+def _connect():
+    """Open the cache database, creating the table on first use."""
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    connection = sqlite3.connect(CACHE_FILE, timeout=30)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " spotter_id TEXT, data_type TEXT, window_start TEXT, window_end TEXT,"
+        " payload BLOB, size INTEGER, created_at REAL, last_accessed REAL,"
+        " PRIMARY KEY (spotter_id, data_type, window_start, window_end))"
+    )
+    # Chunks completed by a run that has not finished yet, including still-open recent windows
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS checkpoints ("
+        " spotter_id TEXT, data_type TEXT, window_start TEXT, window_end TEXT, payload BLOB, created_at REAL,"
+        " PRIMARY KEY (spotter_id, data_type, window_start, window_end))"
+    )
+    return connection
+
+
+def _to_key(value):
+    """Format a datetime as a sortable cache key string."""
+    return value.strftime(TIME_FORMAT)
+
+
+def is_closed_window(window_end):
+    """Return True if a window ended long enough ago that its data will not change."""
+    now = datetime.now(timezone.utc) if window_end.tzinfo else datetime.utcnow()
+    return window_end <= now - CACHE_SETTLE_TIME
+
+
+def get_cached_windows(spotter_id, data_type, start_datetime, end_datetime):
+    """Return sorted, non-overlapping cached (start, end) windows that lie inside the requested range."""
+    with _connect() as connection:
+        rows = connection.execute(
+            "SELECT window_start, window_end FROM responses"
+            " WHERE spotter_id = ? AND data_type = ? AND window_start >= ? AND window_end <= ?"
+            " ORDER BY window_start, window_end DESC",
+            (spotter_id, data_type, _to_key(start_datetime), _to_key(end_datetime)),
+        ).fetchall()
+
+    cached_windows = []
+    covered_until = None
+    for window_start, window_end in rows:
+        # Skip windows overlapping one we have already taken
+        if covered_until is not None and window_start < covered_until:
+            continue
+        cached_windows.append((
+            datetime.strptime(window_start, TIME_FORMAT).replace(tzinfo=start_datetime.tzinfo),
+            datetime.strptime(window_end, TIME_FORMAT).replace(tzinfo=start_datetime.tzinfo),
+        ))
+        covered_until = window_end
+    return cached_windows
+
+
+def load_window(spotter_id, data_type, window):
+    """Load the cached chunk response for one window returned by `get_cached_windows`."""
+    key = (spotter_id, data_type, _to_key(window[0]), _to_key(window[1]))
+    with _write_lock, _connect() as connection:
+        payload = connection.execute(
+            "SELECT payload FROM responses"
+            " WHERE spotter_id = ? AND data_type = ? AND window_start = ? AND window_end = ?",
+            key,
+        ).fetchone()[0]
+        connection.execute(
+            "UPDATE responses SET last_accessed = ?"
+            " WHERE spotter_id = ? AND data_type = ? AND window_start = ? AND window_end = ?",
+            (time.time(),) + key,
+        )
+    return json.loads(zlib.decompress(payload))
+
+
+def find_uncovered_windows(start_datetime, end_datetime, covered_windows):
+    """Return the (start, end) gaps of the requested range not covered by the sorted `covered_windows`."""
+    gaps = []
+    current_start = start_datetime
+    for window_start, window_end in covered_windows:
+        if window_start > current_start:
+            gaps.append((current_start, window_start))
+        current_start = max(current_start, window_end)
+    if current_start < end_datetime:
+        gaps.append((current_start, end_datetime))
+    return gaps
+
+
+def store_window(spotter_id, data_type, window, chunk_data):
+    """Store one chunk response, replacing any previous entry for the same window."""
+    payload = zlib.compress(json.dumps(chunk_data).encode('utf-8'))
+    now = time.time()
+    with _write_lock, _connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (spotter_id, data_type, _to_key(window[0]), _to_key(window[1]), payload, len(payload), now, now),
+        )
+
+
+def evict(max_age_days=CACHE_MAX_AGE_DAYS, max_bytes=CACHE_MAX_BYTES):
+    """Drop entries unused for `max_age_days`, then least recently used entries until under `max_bytes`."""
+    if not os.path.exists(CACHE_FILE):
+        return
+    with _write_lock, _connect() as connection:
+        connection.execute("DELETE FROM responses WHERE last_accessed < ?", (time.time() - max_age_days * 86400,))
+
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_bytes > max_bytes:
+            rows = connection.execute(
+                "SELECT rowid, size FROM responses ORDER BY last_accessed"
+            ).fetchall()
+            stale_rowids = []
+            for rowid, size in rows:
+                if total_bytes <= max_bytes:
+                    break
+                stale_rowids.append((rowid,))
+                total_bytes -= size
+            connection.executemany("DELETE FROM responses WHERE rowid = ?", stale_rowids)
+
+
+def store_checkpoint(spotter_id, data_type, window, chunk_data):
+    """Record a chunk fetched by the current run so a failed run can resume without refetching it."""
+    payload = zlib.compress(json.dumps(chunk_data).encode('utf-8'))
+    with _write_lock, _connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+            (spotter_id, data_type, _to_key(window[0]), _to_key(window[1]), payload, time.time()),
+        )
+
+
+def get_checkpointed_windows(spotter_id, data_type, start_datetime, end_datetime, max_age=CHECKPOINT_MAX_AGE):
+    """Return sorted, non-overlapping checkpointed windows inside the requested range that are newer than `max_age`."""
+    with _connect() as connection:
+        rows = connection.execute(
+            "SELECT window_start, window_end FROM checkpoints"
+            " WHERE spotter_id = ? AND data_type = ? AND window_start >= ? AND window_end <= ? AND created_at >= ?"
+            " ORDER BY window_start, window_end DESC",
+            (spotter_id, data_type, _to_key(start_datetime), _to_key(end_datetime),
+             time.time() - max_age.total_seconds()),
+        ).fetchall()
+
+    checkpointed_windows = []
+    covered_until = None
+    for window_start, window_end in rows:
+        if covered_until is not None and window_start < covered_until:
+            continue
+        checkpointed_windows.append((
+            datetime.strptime(window_start, TIME_FORMAT).replace(tzinfo=start_datetime.tzinfo),
+            datetime.strptime(window_end, TIME_FORMAT).replace(tzinfo=start_datetime.tzinfo),
+        ))
+        covered_until = window_end
+    return checkpointed_windows
+
+
+def load_checkpoint(spotter_id, data_type, window):
+    """Load a chunk response stored by `store_checkpoint`; returns (chunk_data, fetch time in epoch seconds)."""
+    with _connect() as connection:
+        payload, created_at = connection.execute(
+            "SELECT payload, created_at FROM checkpoints"
+            " WHERE spotter_id = ? AND data_type = ? AND window_start = ? AND window_end = ?",
+            (spotter_id, data_type, _to_key(window[0]), _to_key(window[1])),
+        ).fetchone()
+    return json.loads(zlib.decompress(payload)), created_at
+
+
+def clear_checkpoints(spotter_id, data_type, start_datetime, end_datetime):
+    """Drop the checkpoints of a range once it has been fetched completely, and any expired ones."""
+    with _write_lock, _connect() as connection:
+        connection.execute(
+            "DELETE FROM checkpoints WHERE spotter_id = ? AND data_type = ? AND window_start >= ? AND window_end <= ?",
+            (spotter_id, data_type, _to_key(start_datetime), _to_key(end_datetime)),
+        )
+        connection.execute("DELETE FROM checkpoints WHERE created_at < ?",
+                           (time.time() - CHECKPOINT_MAX_AGE.total_seconds(),))
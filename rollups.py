@@ -0,0 +1,334 @@
+# filename: rollups.py
+# description: hourly and daily rollups of force, current and wave metrics per spotter/node, updated incrementally at ingest
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from response_cache import CACHE_SETTLE_TIME
+from stream_aggregates import parse_timestamp
+
+ROLLUP_FILE = os.path.join('parsed_data', 'rollups.sqlite')
+ROLLUP_TIERS = {"hourly": timedelta(hours=1), "daily": timedelta(days=1)}
+
+# Plots of spans up to RAW_MAX_SPAN use raw rows, up to HOURLY_MAX_SPAN the hourly tier, longer spans daily
+RAW_MAX_SPAN = timedelta(days=31)
+HOURLY_MAX_SPAN = timedelta(days=366)
+
+# max_force readings above each threshold (N) are counted per bucket
+PEAK_FORCE_THRESHOLDS = (500.0, 1000.0, 2000.0)
+
+# Sensor data_type_name -> rollup metric
+SENSOR_ROLLUP_METRICS = {
+    "aanderaa_abs_speed_mean_15bits": "speed_mean",
+    "aanderaa_abs_speed_std_15bits": "speed_std",
+    "aanderaa_abs_tilt_mean_8bits": "tilt_mean",
+    "aanderaa_std_tilt_mean_8bits": "tilt_std",
+}
+FORCE_METRICS = ("min_force", "max_force", "mean_force")
+
+# Wave stream -> {API field: rollup metric}; directions are left out as their arithmetic mean is meaningless
+WAVE_ROLLUP_FIELDS = {
+    "waves": {"significantWaveHeight": "hs", "peakPeriod": "peak_period", "latitude": "latitude",
+              "longitude": "longitude"},
+    "wind": {"speed": "wind_speed"},
+    "surfaceTemp": {"degrees": "sst"},
+    "barometerData": {"value": "pressure"},
+}
+WAVE_SERIES = "wave"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Concurrent fleet workers share one database file
+_write_lock = threading.Lock()
+
+
+def _connect(path=ROLLUP_FILE):
+    """Open the rollup database, creating its tables on first use."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS rollups ("
+        " spotter_id TEXT, series TEXT, metric TEXT, tier TEXT, bucket_start INTEGER,"
+        " count INTEGER, min REAL, max REAL, mean REAL, m2 REAL, exceedances TEXT,"
+        " PRIMARY KEY (spotter_id, series, metric, tier, bucket_start))"
+    )
+    # Readings already folded into the rollups, so re-ingesting a chunk does not count them twice: the
+    # timestamps (epoch microseconds) of unsettled readings, and the spans every ingested batch covered
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS rolled_up_keys ("
+        " spotter_id TEXT, series TEXT, source TEXT, timestamp_us INTEGER,"
+        " PRIMARY KEY (spotter_id, series, source, timestamp_us)) WITHOUT ROWID"
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS rolled_up_spans ("
+        " spotter_id TEXT, series TEXT, source TEXT, start_us INTEGER, end_us INTEGER,"
+        " PRIMARY KEY (spotter_id, series, source, start_us)) WITHOUT ROWID"
+    )
+    return connection
+
+
+def new_stats():
+    """Return empty running statistics."""
+    return {"count": 0, "min": None, "max": None, "mean": 0.0, "m2": 0.0, "exceedances": None}
+
+
+def add_value(stats, value, thresholds=()):
+    """Fold one value into running statistics (Welford's update), counting threshold exceedances."""
+    stats["count"] += 1
+    delta = value - stats["mean"]
+    stats["mean"] += delta / stats["count"]
+    stats["m2"] += delta * (value - stats["mean"])
+    stats["min"] = value if stats["min"] is None else min(stats["min"], value)
+    stats["max"] = value if stats["max"] is None else max(stats["max"], value)
+    if thresholds:
+        exceedances = stats["exceedances"] = stats["exceedances"] or {}
+        for threshold in thresholds:
+            key = f"{threshold:g}"
+            exceedances[key] = exceedances.get(key, 0) + (value > threshold)
+
+
+def merge_stats(stats, other):
+    """Return the statistics of two disjoint sets of values combined (Chan et al. parallel update)."""
+    if not other["count"]:
+        return stats
+    if not stats["count"]:
+        return other
+    count = stats["count"] + other["count"]
+    delta = other["mean"] - stats["mean"]
+    exceedances = None
+    if stats["exceedances"] is not None or other["exceedances"] is not None:
+        exceedances = dict(stats["exceedances"] or {})
+        for key, exceeded in (other["exceedances"] or {}).items():
+            exceedances[key] = exceedances.get(key, 0) + exceeded
+    return {
+        "count": count,
+        "min": min(stats["min"], other["min"]),
+        "max": max(stats["max"], other["max"]),
+        "mean": stats["mean"] + delta * other["count"] / count,
+        "m2": stats["m2"] + other["m2"] + delta ** 2 * stats["count"] * other["count"] / count,
+        "exceedances": exceedances,
+    }
+
+
+def sensor_rollup_records(grouped_data):
+    """Yield (series, source, timestamp, {metric: value}) for parsed smart mooring entries grouped by node."""
+    for node_id, node_entries in grouped_data.items():
+        for entry in node_entries:
+            if not entry["timestamp"]:
+                continue
+            metric = SENSOR_ROLLUP_METRICS.get(entry["data_type_name"])
+            if metric is not None and entry["value"] is not None:
+                yield node_id, entry["data_type_name"], entry["timestamp"], {metric: entry["value"]}
+            forces = {name: entry[name] for name in FORCE_METRICS if entry[name] is not None}
+            if forces:
+                yield node_id, "force", entry["timestamp"], forces
+
+
+def wave_rollup_records(api_data_wave):
+    """Yield (series, source, timestamp, {metric: value}) for the numeric fields of wave data streams."""
+    for stream, fields in WAVE_ROLLUP_FIELDS.items():
+        for entry in api_data_wave["data"].get(stream) or []:
+            if not entry.get("timestamp"):
+                continue
+            values = {}
+            for field, metric in fields.items():
+                try:
+                    values[metric] = float(entry[field])
+                except (KeyError, TypeError, ValueError):
+                    continue
+            if values:
+                yield WAVE_SERIES, stream, entry["timestamp"], values
+
+
+def in_spans(spans, value):
+    """Return True if `value` lies inside one of the sorted, non-overlapping (start, end) `spans`."""
+    position = bisect.bisect_right(spans, (value, float("inf"))) - 1
+    return position >= 0 and spans[position][0] <= value <= spans[position][1]
+
+
+def update_rollups(spotter_id, records, path=ROLLUP_FILE, thresholds=PEAK_FORCE_THRESHOLDS):
+    """Fold new (series, source, timestamp, {metric: value}) records into every rollup tier.
+
+    Records already rolled up are skipped, so overlapping chunks, cache re-reads and watch mode polls
+    never count a reading twice. The time span each batch covers is recorded per source. Readings newer
+    than the settle horizon (see `response_cache.CACHE_SETTLE_TIME`) are also recorded by timestamp, as
+    late data may still arrive around them. Their keys are pruned once they pass the horizon, after which
+    the spans alone identify them. Only the buckets touched by new records are read and rewritten, in
+    one transaction. Returns the number of records added.
+    """
+    by_source = defaultdict(dict)
+    epochs = {}  # readings of one message share a timestamp, so each string is parsed once
+    for series, source, timestamp, values in records:
+        epoch = epochs.get(timestamp)
+        if epoch is None:
+            epoch = epochs[timestamp] = (parse_timestamp(timestamp) - EPOCH) // MICROSECOND
+        by_source[(series, source)].setdefault(epoch, values)
+    if not by_source:
+        return 0
+
+    settled_before = (datetime.now(timezone.utc) - CACHE_SETTLE_TIME - EPOCH) // MICROSECOND
+    with _write_lock, _connect(path) as connection:
+        buckets = defaultdict(new_stats)
+        added = 0
+        for (series, source), values_by_epoch in by_source.items():
+            source_key = (spotter_id, series, source)
+            first, last = min(values_by_epoch), max(values_by_epoch)
+            spans = connection.execute(
+                "SELECT start_us, end_us FROM rolled_up_spans WHERE spotter_id = ? AND series = ? AND source = ?"
+                " AND end_us >= ? AND start_us <= ? ORDER BY start_us", (*source_key, first, last)).fetchall()
+            stored = {row[0] for row in connection.execute(
+                "SELECT timestamp_us FROM rolled_up_keys WHERE spotter_id = ? AND series = ? AND source = ?"
+                " AND timestamp_us BETWEEN ? AND ?", (*source_key, first, last))}
+            new_epochs = [epoch for epoch in values_by_epoch
+                          if epoch not in stored and not (epoch < settled_before and in_spans(spans, epoch))]
+            connection.executemany(
+                "INSERT INTO rolled_up_keys (spotter_id, series, source, timestamp_us) VALUES (?, ?, ?, ?)",
+                [(*source_key, epoch) for epoch in new_epochs if epoch >= settled_before])
+            connection.execute(
+                "DELETE FROM rolled_up_keys WHERE spotter_id = ? AND series = ? AND source = ? AND timestamp_us < ?",
+                (*source_key, settled_before))
+            # The batch holds every reading of its span, so it is merged with the spans it overlaps
+            connection.execute(
+                "DELETE FROM rolled_up_spans WHERE spotter_id = ? AND series = ? AND source = ?"
+                " AND end_us >= ? AND start_us <= ?", (*source_key, first, last))
+            connection.execute(
+                "INSERT INTO rolled_up_spans (spotter_id, series, source, start_us, end_us) VALUES (?, ?, ?, ?, ?)",
+                (*source_key, min([first] + [span[0] for span in spans]), max([last] + [span[1] for span in spans])))
+            added += len(new_epochs)
+            for tier, interval in ROLLUP_TIERS.items():
+                seconds = int(interval.total_seconds())
+                for epoch in new_epochs:
+                    epoch_seconds = epoch // 1000000
+                    for metric, value in values_by_epoch[epoch].items():
+                        add_value(buckets[(series, metric, tier, epoch_seconds - epoch_seconds % seconds)], value,
+                                  thresholds if metric == "max_force" else ())
+
+        rows = []
+        for (series, metric, tier, bucket_start), stats in buckets.items():
+            row = connection.execute(
+                "SELECT count, min, max, mean, m2, exceedances FROM rollups"
+                " WHERE spotter_id = ? AND series = ? AND metric = ? AND tier = ? AND bucket_start = ?",
+                (spotter_id, series, metric, tier, bucket_start)).fetchone()
+            if row is not None:
+                stored_stats = dict(zip(("count", "min", "max", "mean", "m2"), row[:5]),
+                                    exceedances=json.loads(row[5]) if row[5] else None)
+                stats = merge_stats(stored_stats, stats)
+            rows.append((spotter_id, series, metric, tier, bucket_start, stats["count"], stats["min"], stats["max"],
+                         stats["mean"], stats["m2"],
+                         json.dumps(stats["exceedances"]) if stats["exceedances"] is not None else None))
+        connection.executemany(
+            "INSERT OR REPLACE INTO rollups (spotter_id, series, metric, tier, bucket_start, count, min, max, mean,"
+            " m2, exceedances) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return added
+
+
+def update_sensor_rollups(spotter_id, grouped_data, path=ROLLUP_FILE):
+    """Fold parsed smart mooring entries (node_id -> list of entries) into the rollups."""
+    return update_rollups(spotter_id, sensor_rollup_records(grouped_data), path)
+
+
+def update_wave_rollups(spotter_id, api_data_wave, path=ROLLUP_FILE):
+    """Fold wave, wind, SST and barometer records of a wave-data response into the rollups."""
+    return update_rollups(spotter_id, wave_rollup_records(api_data_wave), path)
+
+
+def select_rollup_tier(start_date, end_date):
+    """Return the rollup tier to plot the span between `start_date` and `end_date`, or None for raw rows."""
+    span = end_date - start_date
+    if span <= RAW_MAX_SPAN:
+        return None
+    return "hourly" if span <= HOURLY_MAX_SPAN else "daily"
+
+
+def _to_epoch(value):
+    """Return a naive-UTC or aware datetime as epoch seconds."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def load_rollups(spotter_id, tier, start_date=None, end_date=None, series=None, path=ROLLUP_FILE):
+    """Return the rollup rows of one tier as a DataFrame, optionally for one series (node ID or 'wave').
+
+    Columns are series, metric, count, min, max, mean and std (population), indexed by the bucket start
+    time in UTC, plus one 'exceed_<threshold>' column per peak force threshold for max_force rows.
+    """
+    import pandas as pd
+
+    query = ("SELECT bucket_start, series, metric, count, min, max, mean, m2, exceedances FROM rollups"
+             " WHERE spotter_id = ? AND tier = ?")
+    parameters = [spotter_id, tier]
+    if start_date is not None:
+        query += " AND bucket_start >= ?"
+        parameters.append(_to_epoch(start_date) - int(ROLLUP_TIERS[tier].total_seconds()) + 1)
+    if end_date is not None:
+        query += " AND bucket_start < ?"
+        parameters.append(_to_epoch(end_date))
+    if series is not None:
+        query += " AND series = ?"
+        parameters.append(series)
+    if not os.path.exists(path):
+        rows = []
+    else:
+        with _connect(path) as connection:
+            rows = connection.execute(query + " ORDER BY bucket_start", parameters).fetchall()
+
+    df = pd.DataFrame(rows, columns=["bucket_start", "series", "metric", "count", "min", "max", "mean", "m2",
+                                     "exceedances"])
+    df["std"] = (df["m2"].astype("float64") / df["count"].clip(lower=1)) ** 0.5
+    exceedances = pd.DataFrame([json.loads(row[-1]) if row[-1] else {} for row in rows], index=df.index)
+    for column in exceedances.columns:
+        df[f"exceed_{column}"] = exceedances[column]
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("bucket_start"), unit="s", utc=True), name="bucket_start")
+    return df.drop(columns=["m2", "exceedances"])
+
+
+def rollup_plot_data(spotter_id, tier, start_date=None, end_date=None, path=ROLLUP_FILE):
+    """Return (node_tables, wave_data) built from one rollup tier, in the shapes `plot_data` expects.
+
+    Each node table has one row per bucket: speed and tilt means with their total spread (within-bucket
+    variance of the means plus the mean variance reported by the sensor), the bucket's min of min force,
+    max of max force and mean of mean force. Wave entries carry the bucket's mean wave height and position.
+    """
+    import pandas as pd
+    from node_tables import NODE_TABLE_COLUMNS
+
+    rollups = load_rollups(spotter_id, tier, start_date, end_date, path=path)
+    node_tables = {}
+    for node_id, node_rollups in rollups[rollups["series"] != WAVE_SERIES].groupby("series"):
+        by_metric = {metric: frame for metric, frame in node_rollups.groupby("metric")}
+        table = pd.DataFrame(index=node_rollups.index.unique().sort_values(), columns=NODE_TABLE_COLUMNS,
+                             dtype="float64")
+        table.index.name = "timestamp"
+        for name in ("speed", "tilt"):
+            if f"{name}_mean" not in by_metric:
+                continue
+            means = by_metric[f"{name}_mean"]
+            table[f"{name}_mean"] = means["mean"]
+            variance = means["std"] ** 2
+            if f"{name}_std" in by_metric:
+                stds = by_metric[f"{name}_std"]
+                variance = variance.add(stds["std"] ** 2 + stds["mean"] ** 2, fill_value=0)
+            table[f"{name}_std"] = variance ** 0.5
+        for metric, statistic in (("min_force", "min"), ("max_force", "max"), ("mean_force", "mean")):
+            if metric in by_metric:
+                table[metric] = by_metric[metric][statistic]
+        node_tables[node_id] = table
+
+    wave_rollups = rollups[rollups["series"] == WAVE_SERIES]
+    wave_means = wave_rollups.pivot_table(index=wave_rollups.index, columns="metric", values="mean")
+    fields = {"hs": "significantWaveHeight", "latitude": "latitude", "longitude": "longitude"}
+    wave_means = wave_means.reindex(columns=list(fields)).rename(columns=fields)
+    waves = [
+        {"timestamp": timestamp.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+         **{field: value for field, value in row.items() if pd.notna(value)}}
+        for timestamp, row in zip(wave_means.index, wave_means.to_dict("records"))
+        if pd.notna(row["significantWaveHeight"])
+    ]
+    return node_tables, {"waves": waves}
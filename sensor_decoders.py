@@ -0,0 +1,65 @@
+# filename: sensor_decoders.py
+# description: registry mapping Bristlemouth data_type_name values to decoders that emit typed values and units
+
+import re
+
+# Single precompiled pattern matching "min force: x", "max force: x" and "mean force: x"
+FORCE_PATTERN = re.compile(r"(min|max|mean) force:\s*(-?\d+\.\d+)")
+
+# data_type_name -> {"unit": str, "scale": float, "decode": callable(decoded_value) -> dict of typed fields}
+SENSOR_DECODERS = {}
+
+
+def extract_force_values(message):
+    """Extract min, max, and mean force values from a message string."""
+    forces = {}
+    for kind, value in FORCE_PATTERN.findall(message):
+        # Keep the first occurrence of each kind, like re.search
+        forces.setdefault(kind, float(value))
+    return forces.get("min"), forces.get("max"), forces.get("mean")
+
+
+def numeric_decoder(scale=1.0):
+    """Return a decoder converting a numeric string to a scaled float in the 'value' field."""
+    def decode(decoded_value):
+        try:
+            return {"value": float(decoded_value) * scale}
+        except (TypeError, ValueError):
+            return {}
+    return decode
+
+
+def decode_force_message(decoded_value):
+    """Decode a load cell message into min/max/mean force fields."""
+    if not isinstance(decoded_value, str) or "force" not in decoded_value:
+        return {}
+    min_force, max_force, mean_force = extract_force_values(decoded_value)
+    return {"min_force": min_force, "max_force": max_force, "mean_force": mean_force}
+
+
+def register_decoder(data_type_name, unit, scale=1.0, decode=None):
+    """Register how a data_type_name is decoded; numeric values are scaled by `scale` unless `decode` is given."""
+    SENSOR_DECODERS[data_type_name] = {
+        "unit": unit,
+        "scale": scale,
+        "decode": decode or numeric_decoder(scale),
+    }
+
+
+def decode_sensor_value(data_type_name, decoded_value):
+    """Return (typed fields, unit) for one entry, or ({}, None) if the type is unknown or undecodable."""
+    decoder = SENSOR_DECODERS.get(data_type_name)
+    if decoder is None:
+        return {}, None
+    fields = decoder["decode"](decoded_value)
+    return fields, decoder["unit"] if fields else None
+
+
+# Load cell messages, e.g. "min force: 1.23, max force: 4.56, mean force: 2.34" in newtons
+register_decoder("binary_hex_encoded", "N", decode=decode_force_message)
+
+# Aanderaa current meter: speeds are reported in cm/s, tilt in radians
+register_decoder("aanderaa_abs_speed_mean_15bits", "m/s", scale=0.01)
+register_decoder("aanderaa_abs_speed_std_15bits", "m/s", scale=0.01)
+register_decoder("aanderaa_abs_tilt_mean_8bits", "rad")
+register_decoder("aanderaa_std_tilt_mean_8bits", "rad")
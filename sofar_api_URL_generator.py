@@ -19,45 +19,48 @@ start_date = "2024-12-06T00:00:00Z"
 end_date = "2024-12-08T00:00:00Z"
 
 
-# =======================
-# For Spotter Wave data
-# =======================
-
-# URL for "latest" data
-api_url_latest = f"https://api.sofarocean.com/api/latest-data?spotterId={spotterId}&token={token}"
-print("Spotter wave URL for latest data")
-print(api_url_latest)
-
-# URL for "latest" data with extras
-api_url_latest_extras = f"https://api.sofarocean.com/api/latest-data?spotterId={spotterId}&token={token}&includeWindData=true&includeSurfaceTempData=true&includeBarometerData=true"
-print("Spotter wave URL for latest data with extras")
-print(api_url_latest_extras)
-
-# URL with end dates
-api_url_with_dates = f"https://api.sofarocean.com/api/wave-data?spotterId={spotterId}&startDate={start_date}&endDate={end_date}&token={token}&includeWindData=true&includeSurfaceTempData=true&includeBarometerData=true"
-print("Spotter wave URL with dates")
-print(api_url_with_dates)
-
-# URL with
-api_url = f"https://api.sofarocean.com/api/wave-data?spotterId={spotterId}&limit=100&startDate={start_date}&endDate={end_date}&token={token}"
-print("Spotter wave URL simple")
-print(api_url)
-
-# URL with
-api_url = f"https://api.sofarocean.com/api/wave-data?spotterId={spotterId}&limit=100&token={token}"
-print("Spotter wave no start or end URL simple")
-print(api_url)
-
-# =======================
-# For Smart Mooring data
-# =======================
-
-# URL with end dates
-api_url_with_dates = f"https://api.sofarocean.com/api/sensor-data?spotterId={spotterId}&startDate={start_date}&endDate={end_date}&token={token}"
-print("Smart mooring URL with dates")
-print(api_url_with_dates)
-
-# URL with
-api_url = f"https://api.sofarocean.com/api/sensor-data?spotterId={spotterId}&startDate={start_date}&endDate={end_date}&token={token}"
-print("Smart mooring URL simple")
-print(api_url)
+def generate_api_urls(spotterId=spotterId, token=token, start_date=start_date, end_date=end_date):
+    """Return a list of (description, URL) pairs for the wave-data and sensor-data endpoints."""
+    return [
+        # =======================
+        # For Spotter Wave data
+        # =======================
+
+        # URL for "latest" data
+        ("Spotter wave URL for latest data",
+         f"https://api.sofarocean.com/api/latest-data?spotterId={spotterId}&token={token}"),
+
+        # URL for "latest" data with extras
+        ("Spotter wave URL for latest data with extras",
+         f"https://api.sofarocean.com/api/latest-data?spotterId={spotterId}&token={token}&includeWindData=true&includeSurfaceTempData=true&includeBarometerData=true"),
+
+        # URL with end dates
+        ("Spotter wave URL with dates",
+         f"https://api.sofarocean.com/api/wave-data?spotterId={spotterId}&startDate={start_date}&endDate={end_date}&token={token}&includeWindData=true&includeSurfaceTempData=true&includeBarometerData=true"),
+
+        # URL with
+        ("Spotter wave URL simple",
+         f"https://api.sofarocean.com/api/wave-data?spotterId={spotterId}&limit=100&startDate={start_date}&endDate={end_date}&token={token}"),
+
+        # URL with
+        ("Spotter wave no start or end URL simple",
+         f"https://api.sofarocean.com/api/wave-data?spotterId={spotterId}&limit=100&token={token}"),
+
+        # =======================
+        # For Smart Mooring data
+        # =======================
+
+        # URL with end dates
+        ("Smart mooring URL with dates",
+         f"https://api.sofarocean.com/api/sensor-data?spotterId={spotterId}&startDate={start_date}&endDate={end_date}&token={token}"),
+
+        # URL with
+        ("Smart mooring URL simple",
+         f"https://api.sofarocean.com/api/sensor-data?spotterId={spotterId}&startDate={start_date}&endDate={end_date}&token={token}"),
+    ]
+
+
+if __name__ == "__main__":
+    for description, url in generate_api_urls():
+        print(description)
+        print(url)
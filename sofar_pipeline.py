@@ -0,0 +1,775 @@
+# filename: sofar_pipeline.py
+# description: library to fetch, decode, save and plot wave and sensor data for a unit with load cell and current meter
+# TODO
+# add sensor position to JSON parsing for managed sensors (data types and units are decoded via sensor_decoders.py)
+# Importing this module has no side effects; pandas, matplotlib and pyarrow are only loaded by the functions that use them.
+
+import os
+import json
+import math
+import re
+import threading
+import time
+import requests
+import requests.adapters
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from config import API_TOKEN
+import response_cache
+from instrumentation import metrics
+from request_retry import (MAX_RETRIES, REQUEST_TIMEOUT, RETRY_STATUS_CODES, AdaptiveRateLimiter, APIRequestError,
+                           parse_retry_after, retry_delay)
+from csv_writer import writer_pool
+from sensor_decoders import decode_sensor_value
+from stream_aggregates import TimeBucketAggregator, PLOT_AGGREGATE_INTERVAL
+
+# Default output directories for parsed smart mooring (per node) and wave data (per spotter)
+SENSOR_OUTPUT_DIRECTORY = 'BM_messages_parsing/parsed_data'
+WAVE_OUTPUT_DIRECTORY = 'parsed_data/spotter_wave'
+
+# Shared HTTP session so chunk requests reuse keep-alive connections
+_http_session = None
+
+# Maximum number of chunk requests in flight at once per fetch (1 = sequential)
+MAX_IN_FLIGHT_REQUESTS = 4
+
+# Global cap on concurrent API requests across all fetches and spotters
+MAX_CONCURRENT_API_REQUESTS = 8
+_api_concurrency = MAX_CONCURRENT_API_REQUESTS
+_api_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_API_REQUESTS)
+_rate_limiter = AdaptiveRateLimiter()
+_chunk_size_lock = threading.Lock()
+
+# Pagination settings: the API returns at most PAGE_LIMIT records per request
+PAGE_LIMIT = 500
+MIN_SPLIT_WINDOW = timedelta(minutes=1)  # stop splitting full pages below this window length
+TARGET_PAGE_FILL = 0.8  # aim for pages ~80% full when learning chunk sizes
+DEFAULT_CHUNK_SIZE_DAYS = 5
+# Records per day assumed before a chunk size has been learned: wave streams every 30 minutes, and two
+# smart mooring nodes each sending four Aanderaa messages and one load cell message every 10 minutes
+EXPECTED_RECORDS_PER_DAY = {"wave": 48, "sensor": 1440}
+MIN_CHUNK_SIZE_DAYS = 0.05
+MAX_CHUNK_SIZE_DAYS = 30
+CHUNK_SIZE_STATE_FILE = os.path.join('parsed_data', 'chunk_sizes.json')
+
+# Output backends for parsed data: row-oriented CSV, typed partitioned Parquet, or both
+OUTPUT_FORMATS = ("csv", "parquet", "both")
+
+
+def set_api_concurrency(limit):
+    """Set the global cap on concurrent API requests; call before any fetch starts."""
+    global _api_concurrency, _api_semaphore, _http_session
+    _api_concurrency = max(limit, 1)
+    _api_semaphore = threading.BoundedSemaphore(_api_concurrency)
+    # Recreate the session on next use so its connection pool matches the new cap
+    _http_session = None
+
+
+def get_http_session(pool_size=None):
+    """Return a shared requests session with a connection pool sized for concurrent chunk fetches.
+
+    The pool holds `pool_size` connections, by default the cap set by `set_api_concurrency`, so every
+    request allowed in flight can keep its connection alive.
+    """
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size or _api_concurrency, 1))
+        _http_session.mount("https://", adapter)
+    return _http_session
+
+
+def redact_token(text):
+    """Return `text` (a URL or a message quoting one) with the API token replaced by '***'."""
+    return re.sub(r"(token=)[^&\s]*", r"\1***", text)
+
+
+def api_login(api_url, session=None, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES, stats=None):
+    """Fetch data from the Sofar API, retrying timeouts, connection errors and 429/5xx responses.
+
+    Retries back off exponentially with jitter, or wait as long as the server's Retry-After header asks.
+    All requests pass through a shared adaptive rate limiter that slows down when the API throttles.
+    Raises APIRequestError on other error statuses or once `max_retries` retries are used up; its
+    status_code is that of the last attempt, or None if that attempt got no response. If a `stats` dict
+    is given, the response size and number of attempts are stored in it. The API token is redacted from
+    everything printed.
+    """
+    if session is None:
+        session = get_http_session()
+    for attempt in range(max_retries + 1):
+        _rate_limiter.acquire()
+        retry_after = None
+        status_code = None
+        try:
+            with _api_semaphore:
+                response = session.get(api_url, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Connection errors quote the request URL, token included
+            error = redact_token(f"{type(e).__name__}: {e}")
+        else:
+            status_code = response.status_code
+            if response.status_code == 200:
+                _rate_limiter.on_success()
+                print(f"Successfully fetched data from API: {redact_token(api_url)}")
+                if stats is not None:
+                    stats.update(bytes=len(response.content), attempts=attempt + 1)
+                return response.json()
+            error = f"Status code: {response.status_code}"
+            if response.status_code not in RETRY_STATUS_CODES:
+                print(f"Failed to fetch data. {error}")
+                raise APIRequestError(f"API request failed. {error}", response.status_code)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429:
+                _rate_limiter.on_throttle(retry_after)
+
+        if attempt == max_retries:
+            break
+        delay = retry_delay(attempt, retry_after)
+        print(f"Failed to fetch data ({error}), retrying in {delay:.1f} s ({attempt + 1}/{max_retries})...")
+        time.sleep(delay)
+
+    print(f"Failed to fetch data after {max_retries} retries. {error}")
+    raise APIRequestError(f"API request failed. {error}", status_code)
+
+
+def build_chunk_windows(start_datetime, end_datetime, chunk_size_days=5):
+    """Split a date range into consecutive (start, end) windows of at most `chunk_size_days` days."""
+    windows = []
+    current_start = start_datetime
+    while current_start < end_datetime:
+        current_end = current_start + timedelta(days=chunk_size_days)
+        if current_end > end_datetime:
+            current_end = end_datetime
+        windows.append((current_start, current_end))
+        current_start = current_end
+    return windows
+
+
+def build_api_url(spotter_id, chunk_start, chunk_end, data_type="wave", limit=PAGE_LIMIT):
+    """Construct the wave-data or sensor-data API URL for a single chunk."""
+    if data_type == "wave":
+        return (
+            f"https://api.sofarocean.com/api/wave-data?spotterId={spotter_id}&startDate={chunk_start}"
+            f"&endDate={chunk_end}&token={API_TOKEN}&includeWindData=true&includeSurfaceTempData=true"
+            f"&includeBarometerData=true&limit={limit}&processingSources=all"
+        )
+    elif data_type == "sensor":
+        return (
+            f"https://api.sofarocean.com/api/sensor-data?spotterId={spotter_id}&startDate={chunk_start}"
+            f"&endDate={chunk_end}&token={API_TOKEN}&limit={limit}"
+        )
+    else:
+        raise ValueError(f"Invalid data_type: {data_type}")
+
+
+def build_latest_data_url(spotter_id):
+    """Construct the latest-data API URL for a spotter, including wind, SST and barometer data."""
+    return (
+        f"https://api.sofarocean.com/api/latest-data?spotterId={spotter_id}&token={API_TOKEN}"
+        f"&includeWindData=true&includeSurfaceTempData=true&includeBarometerData=true"
+    )
+
+
+def fetch_latest_data(spotter_id, session=None):
+    """Fetch the most recent wave, wind, SST and barometer records of a spotter from the latest-data endpoint."""
+    with metrics.timer("fetch", spotter_id, data_type="latest") as measurement:
+        latest_data = api_login(build_latest_data_url(spotter_id), session=session, stats=measurement)
+        measurement["rows"] = page_record_count(latest_data, "wave")
+    return latest_data
+
+
+def empty_combined_data(data_type="wave"):
+    """Return an empty combined data structure for the given data type."""
+    if data_type == "wave":
+        return {"data": {"waves": [], "wind": [], "surfaceTemp": [], "barometerData": []}}
+    elif data_type == "sensor":
+        return {"data": []}  # Flat structure for sensor data
+    else:
+        raise ValueError(f"Invalid data_type: {data_type}")
+
+
+def merge_chunk_data(combined_data, chunk_data, data_type="wave"):
+    """Append a single chunk response into the combined data structure."""
+    if data_type == "wave":
+        # Combine wave data by appending to corresponding lists
+        for key in combined_data["data"]:
+            if key in chunk_data["data"]:
+                combined_data["data"][key].extend(chunk_data["data"][key])
+    elif data_type == "sensor":
+        # Combine sensor data by appending to the flat list
+        combined_data["data"].extend(chunk_data["data"])
+
+
+def page_record_count(chunk_data, data_type="wave"):
+    """Return the number of records in a response page (largest sub-stream for wave data)."""
+    if "data" not in chunk_data:
+        return 0
+    if data_type == "wave":
+        return max((len(value) for value in chunk_data["data"].values() if isinstance(value, list)), default=0)
+    return len(chunk_data["data"])
+
+
+def load_chunk_sizes():
+    """Load learned chunk sizes (in days) keyed by '<spotter_id>/<data_type>'."""
+    if not os.path.exists(CHUNK_SIZE_STATE_FILE):
+        return {}
+    try:
+        with open(CHUNK_SIZE_STATE_FILE, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def chunk_size_for_rate(records_per_day, limit=PAGE_LIMIT):
+    """Return the chunk size in days at which `records_per_day` fill about TARGET_PAGE_FILL of a page."""
+    chunk_size_days = (limit * TARGET_PAGE_FILL) / records_per_day
+    return min(max(chunk_size_days, MIN_CHUNK_SIZE_DAYS), MAX_CHUNK_SIZE_DAYS)
+
+
+def get_chunk_size_days(spotter_id, data_type="wave"):
+    """Return the learned chunk size for a spotter/data type.
+
+    Before anything has been learned, the size is seeded from EXPECTED_RECORDS_PER_DAY, so the first run
+    does not request windows many pages long and split them (DEFAULT_CHUNK_SIZE_DAYS for unknown types).
+    """
+    learned = load_chunk_sizes().get(f"{spotter_id}/{data_type}")
+    if learned is not None:
+        return learned
+    if data_type in EXPECTED_RECORDS_PER_DAY:
+        return round(chunk_size_for_rate(EXPECTED_RECORDS_PER_DAY[data_type]), 3)
+    return DEFAULT_CHUNK_SIZE_DAYS
+
+
+def learn_chunk_size_days(spotter_id, data_type, record_count, span, limit=PAGE_LIMIT):
+    """Update the stored chunk size so a typical window fills about TARGET_PAGE_FILL of a page."""
+    span_days = span.total_seconds() / 86400
+    if record_count == 0 or span_days <= 0:
+        return
+    chunk_size_days = chunk_size_for_rate(record_count / span_days, limit)
+
+    # Concurrent fetches for other spotters update the same file
+    with _chunk_size_lock:
+        chunk_sizes = load_chunk_sizes()
+        chunk_sizes[f"{spotter_id}/{data_type}"] = round(chunk_size_days, 3)
+        os.makedirs(os.path.dirname(CHUNK_SIZE_STATE_FILE), exist_ok=True)
+        with open(CHUNK_SIZE_STATE_FILE, mode='w', encoding='utf-8') as file:
+            json.dump(chunk_sizes, file, indent=2, sort_keys=True)
+    print(f"Learned chunk size for {spotter_id} {data_type} data: {chunk_size_days:.2f} days")
+
+
+def fetch_chunk(spotter_id, window, data_type="wave", session=None, limit=PAGE_LIMIT):
+    """Fetch a single (start, end) window from the API, splitting it while pages come back full."""
+    chunk_start = window[0].strftime("%Y-%m-%dT%H:%M:%SZ")
+    chunk_end = window[1].strftime("%Y-%m-%dT%H:%M:%SZ")
+    api_url = build_api_url(spotter_id, chunk_start, chunk_end, data_type=data_type, limit=limit)
+
+    print(f"Fetching {data_type} data for {chunk_start} to {chunk_end}...")
+    with metrics.timer("fetch", spotter_id, data_type=data_type, window_start=chunk_start) as measurement:
+        chunk_data = api_login(api_url, session=session, stats=measurement)
+        measurement["rows"] = page_record_count(chunk_data, data_type)
+
+    if page_record_count(chunk_data, data_type) < limit:
+        return chunk_data
+
+    window_start, window_end = window
+    if window_end - window_start <= MIN_SPLIT_WINDOW:
+        print(f"Warning: page limit of {limit} reached for {chunk_start} to {chunk_end}; some records may be missing.")
+        return chunk_data
+
+    # A full page means the window was truncated, so split it in half and fetch both sides
+    print(f"Page limit of {limit} reached for {chunk_start} to {chunk_end}, splitting window...")
+    window_mid = window_start + (window_end - window_start) / 2
+    combined_data = empty_combined_data(data_type)
+    for sub_window in ((window_start, window_mid), (window_mid, window_end)):
+        sub_data = fetch_chunk(spotter_id, sub_window, data_type, session, limit)
+        if "data" in sub_data:
+            merge_chunk_data(combined_data, sub_data, data_type)
+    return combined_data
+
+
+def fetch_chunk_and_notify(spotter_id, window, data_type="wave", session=None, on_fetched=None):
+    """Fetch one window with `fetch_chunk` and pass the result to `on_fetched(window, chunk_data)` if given."""
+    chunk_data = fetch_chunk(spotter_id, window, data_type, session)
+    if on_fetched is not None:
+        on_fetched(window, chunk_data)
+    return chunk_data
+
+
+def iter_fetched_chunks(spotter_id, windows, data_type="wave", session=None, max_in_flight=MAX_IN_FLIGHT_REQUESTS,
+                        on_fetched=None):
+    """Yield (window, chunk_data) in window order, keeping at most `max_in_flight` requests running ahead.
+
+    `on_fetched(window, chunk_data)` is called as soon as each window arrives, in the fetching thread.
+    """
+    if max_in_flight <= 1 or len(windows) <= 1:
+        for window in windows:
+            yield window, fetch_chunk_and_notify(spotter_id, window, data_type, session, on_fetched)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        remaining_windows = iter(windows)
+        pending = deque()
+        for window in islice(remaining_windows, max_in_flight):
+            pending.append((window, executor.submit(fetch_chunk_and_notify, spotter_id, window, data_type, session,
+                                                    on_fetched)))
+        while pending:
+            # Waiting on the oldest request first keeps the output in time order
+            window, future = pending.popleft()
+            chunk_data = future.result()
+            next_window = next(remaining_windows, None)
+            if next_window is not None:
+                pending.append((next_window, executor.submit(fetch_chunk_and_notify, spotter_id, next_window,
+                                                             data_type, session, on_fetched)))
+            yield window, chunk_data
+
+
+def iter_data_chunks(start_datetime, end_datetime, spotter_id, chunk_size_days=None, data_type="wave",
+                     max_in_flight=MAX_IN_FLIGHT_REQUESTS, use_cache=True, refresh_cache=False):
+    """Yield (window, chunk_data) for the requested range in time order, one chunk at a time.
+
+    Up to `max_in_flight` chunks are requested concurrently over a shared session, but only that many
+    responses are held at once, so memory does not grow with the length of the range. Chunks that fill a
+    whole page are split until complete. If `chunk_size_days` is None, the size learned from previous runs
+    of this spotter and data type is used, and the learned size is updated once all chunks are consumed.
+
+    Closed historical windows are served from the on-disk response cache, so only the uncovered part of
+    the range (normally just the most recent tail) is fetched. `refresh_cache` ignores cached responses
+    but still stores new ones; `use_cache=False` bypasses the cache entirely.
+
+    Every fetched chunk is also checkpointed as soon as it arrives. If a run fails part way, the next run
+    of the same range within CHECKPOINT_MAX_AGE reuses the checkpointed chunks and only fetches the rest;
+    checkpoints are cleared once the whole range has been fetched. A resumed chunk carries the time it was
+    fetched as 'fetched_at' (epoch seconds), as its window may still have been open then.
+    """
+    learn_chunk_size = chunk_size_days is None
+    if learn_chunk_size:
+        chunk_size_days = get_chunk_size_days(spotter_id, data_type)
+
+    cached_windows = []
+    if use_cache and not refresh_cache:
+        cached_windows = response_cache.get_cached_windows(spotter_id, data_type, start_datetime, end_datetime)
+        if cached_windows:
+            print(f"Using {len(cached_windows)} cached {data_type} chunks for {spotter_id}.")
+
+    # Resume from chunks completed by an earlier failed run, skipping any that overlap the cache
+    checkpointed_windows = []
+    if use_cache and not refresh_cache:
+        cached_gaps = response_cache.find_uncovered_windows(start_datetime, end_datetime, cached_windows)
+        checkpointed_windows = [
+            window for window in response_cache.get_checkpointed_windows(spotter_id, data_type, start_datetime,
+                                                                         end_datetime)
+            if any(gap[0] <= window[0] and window[1] <= gap[1] for gap in cached_gaps)
+        ]
+        if checkpointed_windows:
+            print(f"Resuming from {len(checkpointed_windows)} checkpointed {data_type} chunks for {spotter_id}.")
+
+    # Only the gaps between cached and checkpointed windows go over the network
+    covered_windows = sorted(cached_windows + checkpointed_windows)
+    gaps = response_cache.find_uncovered_windows(start_datetime, end_datetime, covered_windows)
+    windows = [window for gap in gaps for window in build_chunk_windows(gap[0], gap[1], chunk_size_days)]
+    store_checkpoint = None
+    if use_cache:
+        def store_checkpoint(window, chunk_data):
+            response_cache.store_checkpoint(spotter_id, data_type, window, chunk_data)
+    fetched_chunks = iter_fetched_chunks(spotter_id, windows, data_type, get_http_session(), max_in_flight,
+                                         on_fetched=store_checkpoint)
+
+    # Interleave cached, checkpointed and fetched chunks in time order
+    cached_window_set = set(cached_windows)
+    checkpointed_window_set = set(checkpointed_windows)
+    record_count = 0
+    for window in sorted(covered_windows + windows):
+        if window in cached_window_set:
+            with metrics.timer("cache_load", spotter_id, data_type=data_type) as measurement:
+                chunk_data = response_cache.load_window(spotter_id, data_type, window)
+                measurement["rows"] = page_record_count(chunk_data, data_type)
+        elif window in checkpointed_window_set:
+            # Not cached permanently: the window may still have been open when the checkpoint was fetched
+            with metrics.timer("cache_load", spotter_id, data_type=data_type, checkpoint=True) as measurement:
+                chunk_data, fetched_at = response_cache.load_checkpoint(spotter_id, data_type, window)
+                chunk_data["fetched_at"] = fetched_at
+                measurement["rows"] = page_record_count(chunk_data, data_type)
+        else:
+            _, chunk_data = next(fetched_chunks)
+            if use_cache and response_cache.is_closed_window(window[1]):
+                response_cache.store_window(spotter_id, data_type, window, chunk_data)
+
+        if "data" not in chunk_data:
+            print(f"No {data_type} data returned for {window[0]:%Y-%m-%dT%H:%M:%SZ} to {window[1]:%Y-%m-%dT%H:%M:%SZ}.")
+        record_count += page_record_count(chunk_data, data_type)
+        yield window, chunk_data
+
+    if use_cache:
+        response_cache.clear_checkpoints(spotter_id, data_type, start_datetime, end_datetime)
+        response_cache.evict()
+    if learn_chunk_size:
+        learn_chunk_size_days(spotter_id, data_type, record_count, end_datetime - start_datetime)
+
+
+def fetch_data_in_chunks(start_datetime, end_datetime, spotter_id, chunk_size_days=None, data_type="wave",
+                         max_in_flight=MAX_IN_FLIGHT_REQUESTS, use_cache=True, refresh_cache=False):
+    """Fetch data from the API in chunks of `chunk_size_days` days and combine into a single JSON object.
+
+    See `iter_data_chunks` for concurrency, pagination, chunk size learning and caching; chunks are merged
+    in time order so the result is identical to a sequential fetch. If any chunk was resumed from a
+    checkpoint, the result carries the earliest fetch time as 'fetched_at'.
+    """
+    # Initialize combined data structure
+    combined_data = empty_combined_data(data_type)
+    for _, chunk_data in iter_data_chunks(start_datetime, end_datetime, spotter_id, chunk_size_days, data_type,
+                                          max_in_flight, use_cache, refresh_cache):
+        if "data" in chunk_data:
+            merge_chunk_data(combined_data, chunk_data, data_type)
+        if "fetched_at" in chunk_data:
+            combined_data["fetched_at"] = min(chunk_data["fetched_at"], combined_data.get("fetched_at", math.inf))
+    return combined_data
+
+
+def decode_hex_to_ascii(hex_string):
+    """Decode a hex string to ASCII format, handling non-printable characters."""
+    try:
+        # Convert hex string to bytes
+        byte_value = bytes.fromhex(hex_string)
+        # Decode bytes to string, ignoring errors
+        decoded_str = byte_value.decode('utf-8', errors='ignore')
+        # Remove any trailing non-printable characters or whitespace
+        return decoded_str.strip()
+    except ValueError:
+        return "Invalid hex data"
+
+# Columns of each parsed smart mooring entry, in CSV order
+SMART_MOORING_COLUMNS = ["timestamp", "data_type_name", "latitude", "longitude", "decoded_value",
+                         "min_force", "max_force", "mean_force"]
+
+# Parsed entries also carry the typed, scaled value and its unit from the sensor decoder registry
+PARSED_SENSOR_COLUMNS = SMART_MOORING_COLUMNS + ["value", "unit"]
+
+
+def decode_sensor_columns(entries):
+    """Decode a list of 'sensor-data' entries in one batch into parsed columns plus a node ID column."""
+    node_ids = [entry.get('bristlemouth_node_id', 'Unknown_ID') for entry in entries]
+    data_types = [entry.get("data_type_name", "") for entry in entries]
+    values = [entry.get("value", "") for entry in entries]
+    unit_types = [entry.get("unit_type") for entry in entries]
+
+    # Hex-decode only the binary rows and convert each value with the decoder registered for its data type,
+    # once per distinct (data type, raw value) in the batch: readings and re-sent messages repeat a lot
+    parsed = {}
+    decoded_values, typed = [], []
+    for data_type, value, unit_type in zip(data_types, values, unit_types):
+        key = (data_type, value, unit_type == "binary")
+        result = parsed.get(key)
+        if result is None:
+            decoded = decode_hex_to_ascii(value) if unit_type == "binary" else value
+            result = parsed[key] = (decoded, decode_sensor_value(data_type, decoded))
+        decoded_values.append(result[0])
+        typed.append(result[1])
+
+    return {
+        "node_id": node_ids,
+        "timestamp": [entry.get("timestamp") for entry in entries],
+        "data_type_name": data_types,
+        "latitude": [entry.get("latitude") for entry in entries],
+        "longitude": [entry.get("longitude") for entry in entries],
+        "decoded_value": decoded_values,
+        "min_force": [fields.get("min_force") for fields, _ in typed],
+        "max_force": [fields.get("max_force") for fields, _ in typed],
+        "mean_force": [fields.get("mean_force") for fields, _ in typed],
+        "value": [fields.get("value") for fields, _ in typed],
+        "unit": [unit for _, unit in typed],
+    }
+
+def process_smart_mooring_data(spotter_id, json_data, output_format="csv", output_directory=SENSOR_OUTPUT_DIRECTORY,
+                               csv_pool=None):
+    """Process 'sensor-data' JSON and save parsed data by Node ID as CSV and/or Parquet.
+
+    Returns (grouped_data, unique_node_ids); see `process_node_tables` for the per-node aligned tables.
+    New readings are also folded into the spotter's hourly and daily rollups (see rollups.py).
+    CSV rows go through `csv_pool` (a csv_writer.CSVWriterPool the caller flushes and closes) if given,
+    so that a long-running caller keeps its files and indexes open; otherwise through a pool of its own.
+    """
+    import rollups
+
+    # Chunks resumed from a checkpoint may have been fetched while their window was still open
+    fetched_at = json_data.get("fetched_at")
+    with metrics.timer("decode", spotter_id, data_type="sensor", rows=len(json_data['data'])):
+        grouped_data = defaultdict(list)
+        columns = decode_sensor_columns(json_data['data'])
+        rows = zip(*(columns[name] for name in PARSED_SENSOR_COLUMNS))
+        for node_id, row in zip(columns["node_id"], rows):
+            grouped_data[node_id].append(dict(zip(PARSED_SENSOR_COLUMNS, row)))
+        unique_node_ids = set(grouped_data)
+
+    with metrics.timer("rollup", spotter_id, data_type="sensor") as measurement:
+        measurement["rows"] = rollups.update_sensor_rollups(spotter_id, grouped_data)
+
+    if output_format in ("csv", "both"):
+        # Save each node's data to a CSV in a subfolder, one bulk write per node
+        with metrics.timer("write", spotter_id, data_type="sensor", output_format="csv") as measurement, \
+                writer_pool(csv_pool) as writer:
+            measurement["rows"] = 0
+            for node_id, node_entries in grouped_data.items():
+                node_directory = os.path.join(output_directory, node_id)
+                csv_filename = os.path.join(node_directory, f"{node_id}_smart_mooring.csv")
+                measurement["rows"] += writer.write_rows(csv_filename, node_entries,
+                                                         key_fields=("timestamp", "data_type_name"),
+                                                         fieldnames=SMART_MOORING_COLUMNS, fetched_at=fetched_at)
+
+    if output_format in ("parquet", "both"):
+        import parquet_writer
+        with metrics.timer("write", spotter_id, data_type="sensor", output_format="parquet",
+                           rows=len(json_data['data'])):
+            parquet_writer.save_smart_mooring_parquet(spotter_id, grouped_data)
+
+    # Print the unique node IDs found
+    print("Unique Node IDs found:", unique_node_ids)
+    return grouped_data, unique_node_ids
+
+def process_node_tables(spotter_id, grouped_data, output_format="csv", output_directory=SENSOR_OUTPUT_DIRECTORY,
+                        fetched_at=None, builder=None, csv_pool=None):
+    """Build each node's timestamp-indexed table from parsed smart mooring data and save it as CSV.
+
+    `grouped_data` is the first value returned by `process_smart_mooring_data`. Each table pairs the
+    mean/std readings and force statistics of one node (see node_tables.py) and is exported as
+    `<node_id>_aligned.csv` next to the node's raw CSV. Returns node_id -> table.
+    When data arrives chunk by chunk, pass the same `builder` (a node_tables.NodeTableBuilder) for every
+    chunk so that mean/std pairs split by a chunk boundary stay paired, then call once more with
+    `grouped_data=None` to write the readings it still holds back. `csv_pool` is used as in
+    `process_smart_mooring_data`.
+    """
+    from node_tables import NODE_TABLE_COLUMNS, build_node_tables, node_table_rows
+
+    with metrics.timer("decode", spotter_id, data_type="node_table"):
+        if builder is None:
+            node_tables = build_node_tables(grouped_data)
+        else:
+            # Held-back readings are written with this batch, so settle them against their own fetch time
+            carried_fetched_at = builder.fetched_at
+            node_tables = builder.flush() if grouped_data is None else builder.add(grouped_data, fetched_at)
+            if carried_fetched_at is not None:
+                fetched_at = min(carried_fetched_at, fetched_at or time.time())
+
+    if output_format in ("csv", "both"):
+        # Time-aligned export with one row per timestamp
+        with metrics.timer("write", spotter_id, data_type="node_table", output_format="csv") as measurement, \
+                writer_pool(csv_pool) as writer:
+            measurement["rows"] = 0
+            for node_id, node_table in node_tables.items():
+                aligned_filename = os.path.join(output_directory, node_id, f"{node_id}_aligned.csv")
+                measurement["rows"] += writer.write_rows(aligned_filename, node_table_rows(node_table),
+                                                         key_fields=("timestamp",),
+                                                         fieldnames=["timestamp"] + NODE_TABLE_COLUMNS,
+                                                         fetched_at=fetched_at)
+    return node_tables
+
+def wave_output_directory(spotter_id):
+    """Return the default wave output directory of a spotter, as wave records do not carry the spotter ID."""
+    return os.path.join(WAVE_OUTPUT_DIRECTORY, spotter_id)
+
+def process_wave_data(spotter_id, api_data_wave, output_format="csv", output_directory=None, csv_pool=None):
+    """Process wave data, including wave, wind, sea surface temperature, and barometer data.
+
+    CSV files are written to `output_directory` (default: `wave_output_directory(spotter_id)`), through
+    `csv_pool` if given (see `process_smart_mooring_data`).
+    New records are also folded into the spotter's hourly and daily rollups (see rollups.py).
+    """
+    import rollups
+    with metrics.timer("rollup", spotter_id, data_type="wave") as measurement:
+        measurement["rows"] = rollups.update_wave_rollups(spotter_id, api_data_wave)
+
+    if output_format in ("parquet", "both"):
+        import parquet_writer
+        wave_rows = sum(len(entries) for entries in api_data_wave["data"].values() if isinstance(entries, list))
+        with metrics.timer("write", spotter_id, data_type="wave", output_format="parquet", rows=wave_rows):
+            parquet_writer.save_wave_parquet(spotter_id, api_data_wave)
+        if output_format == "parquet":
+            print("Wave data processing complete. Parquet files saved.")
+            return
+
+    output_directory = output_directory or wave_output_directory(spotter_id)
+    fetched_at = api_data_wave.get("fetched_at")
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    wave_csv = os.path.join(output_directory, "waves.csv")
+    wind_csv = os.path.join(output_directory, "wind.csv")
+    temp_csv = os.path.join(output_directory, "sea_surface_temp.csv")
+    baro_csv = os.path.join(output_directory, "barometer.csv")
+
+    try:
+        with metrics.timer("write", spotter_id, data_type="wave", output_format="csv") as measurement, \
+                writer_pool(csv_pool) as writer:
+            measurement["rows"] = 0
+            if "waves" in api_data_wave["data"]:
+                measurement["rows"] += writer.write_rows(wave_csv, api_data_wave["data"]["waves"],
+                                                         key_fields=("timestamp",), fetched_at=fetched_at)
+
+            if "wind" in api_data_wave["data"]:
+                measurement["rows"] += writer.write_rows(wind_csv, api_data_wave["data"]["wind"],
+                                                         key_fields=("timestamp",), fetched_at=fetched_at)
+
+            if "surfaceTemp" in api_data_wave["data"]:
+                measurement["rows"] += writer.write_rows(temp_csv, api_data_wave["data"]["surfaceTemp"],
+                                                         key_fields=("timestamp",), fetched_at=fetched_at)
+
+            if "barometerData" in api_data_wave["data"]:
+                measurement["rows"] += writer.write_rows(baro_csv, api_data_wave["data"]["barometerData"],
+                                                         key_fields=("timestamp",), fetched_at=fetched_at)
+
+    except KeyError as e:
+        print(f"Error: Data type {e} not found in wave data response.")
+
+    print("Wave data processing complete. CSV files saved.")
+
+def stream_process_data(spotter_id, start_date, end_date, use_cache=True, refresh_cache=False, output_format="csv",
+                        plot_interval=PLOT_AGGREGATE_INTERVAL, sensor_directory=SENSOR_OUTPUT_DIRECTORY,
+                        wave_directory=None, gps_track=None):
+    """Fetch, decode and save data one chunk at a time, keeping only time-bucket aggregates for plotting.
+
+    Each chunk is written to disk and released before the next one is processed, so peak memory does not
+    depend on the length of the date range. The spotter's aligned table is saved to `wave_directory`
+    (default: `wave_output_directory(spotter_id)`). The raw GPS fixes of each chunk are added to
+    `gps_track` (a gps_analytics.GPSTrack) if given, as the aggregates only hold averaged positions.
+    Returns the TimeBucketAggregator holding the plot data.
+    """
+    from aligned_dataset import build_aligned_table, combine_aligned_tables, save_aligned_table
+    from node_tables import NodeTableBuilder
+
+    wave_directory = wave_directory or wave_output_directory(spotter_id)
+    aggregator = TimeBucketAggregator(plot_interval)
+    aligned_tables = []
+    node_table_builder = NodeTableBuilder()
+
+    for _, chunk_data in iter_data_chunks(start_date, end_date, spotter_id, data_type="sensor",
+                                          use_cache=use_cache, refresh_cache=refresh_cache):
+        if "data" in chunk_data:
+            grouped_data, _ = process_smart_mooring_data(spotter_id, chunk_data, output_format, sensor_directory)
+            node_tables = process_node_tables(spotter_id, grouped_data, output_format, sensor_directory,
+                                              chunk_data.get("fetched_at"), builder=node_table_builder)
+            aggregator.add_sensor_entries(grouped_data)
+            aligned_tables.append(build_aligned_table({}, node_tables, reading_times=True))
+    node_tables = process_node_tables(spotter_id, None, output_format, sensor_directory, builder=node_table_builder)
+    aligned_tables.append(build_aligned_table({}, node_tables, reading_times=True))
+
+    for _, chunk_data in iter_data_chunks(start_date, end_date, spotter_id, data_type="wave",
+                                          use_cache=use_cache, refresh_cache=refresh_cache):
+        if "data" in chunk_data:
+            process_wave_data(spotter_id, chunk_data, output_format, wave_directory)
+            aggregator.add_wave_entries(chunk_data["data"].get("waves", []))
+            if gps_track is not None:
+                gps_track.add_wave_entries(chunk_data["data"].get("waves", []))
+            aligned_tables.append(build_aligned_table(chunk_data["data"], {}, reading_times=True))
+
+    # Per-chunk aligned tables are already on the grid, so they stay small however long the range is
+    save_aligned_table(combine_aligned_tables(aligned_tables), wave_directory, output_format=output_format)
+    return aggregator
+
+
+def process_and_plot_data(spotter_id, start_date, end_date, use_cache=True, refresh_cache=False, output_format="csv",
+                          streaming=False, plot=True, sensor_directory=SENSOR_OUTPUT_DIRECTORY,
+                          wave_directory=None, render_directory=None, render_formats=("png",),
+                          render_executor=None, anchor=None):
+    """Fetch, process, and plot data for a given SPOT ID.
+
+    With `streaming`, data is processed chunk by chunk and the plots are drawn from 30-minute aggregates.
+    Ranges longer than `rollups.RAW_MAX_SPAN` are plotted from the hourly or daily rollups instead.
+    A GPS watch circle and drift summary is saved to `wave_directory` (see gps_analytics.py); distances
+    are measured from `anchor` (latitude, longitude) if given, otherwise from the median position.
+    With `render_directory`, plots are rendered headlessly to files in `render_formats` instead of being
+    shown, in `render_executor` (a process pool from `plotting.create_render_pool`) if given.
+    Returns a summary dict with the node IDs found, the number of sensor and wave records processed, the
+    GPS summary, any figure files written and the stage metrics recorded so far for this spotter.
+    """
+    from aligned_dataset import build_aligned_table, save_aligned_table
+    from node_tables import build_node_tables
+    from gps_analytics import GPSTrack, gps_summary, save_gps_summary
+    from rollups import rollup_plot_data, select_rollup_tier
+
+    wave_directory = wave_directory or wave_output_directory(spotter_id)
+    print(f"Processing data for SPOT ID: {spotter_id}")
+
+    print("Start date:", start_date.strftime("%m/%d/%Y"))
+    print("End date:", end_date.strftime("%m/%d"))
+    print("Number of days between the start and end date:", end_date - start_date)
+
+    gps_track = None
+    if streaming:
+        gps_track = GPSTrack()
+        aggregator = stream_process_data(spotter_id, start_date, end_date, use_cache, refresh_cache, output_format,
+                                         sensor_directory=sensor_directory, wave_directory=wave_directory,
+                                         gps_track=gps_track)
+        smart_mooring_data, unique_node_ids = aggregator.sensor_data()
+        node_tables = build_node_tables(smart_mooring_data)
+        wave_data = aggregator.wave_data()
+        sensor_rows, wave_rows = aggregator.sensor_rows, aggregator.wave_rows
+    else:
+        # Fetch wave data and smart mooring data as combined JSON objects
+        api_data_waves = fetch_data_in_chunks(start_date, end_date, spotter_id, data_type="wave",
+                                              use_cache=use_cache, refresh_cache=refresh_cache)
+        api_data_smart_mooring = fetch_data_in_chunks(start_date, end_date, spotter_id, data_type="sensor",
+                                                      use_cache=use_cache, refresh_cache=refresh_cache)
+
+        # Process the smart mooring data and wave data
+        smart_mooring_data, unique_node_ids = process_smart_mooring_data(spotter_id, api_data_smart_mooring,
+                                                                         output_format, sensor_directory)
+        node_tables = process_node_tables(spotter_id, smart_mooring_data, output_format, sensor_directory,
+                                          api_data_smart_mooring.get("fetched_at"))
+        process_wave_data(spotter_id, api_data_waves, output_format, wave_directory)
+        save_aligned_table(build_aligned_table(api_data_waves["data"], node_tables), wave_directory,
+                           output_format=output_format)
+        wave_data = api_data_waves["data"]
+        sensor_rows, wave_rows = len(api_data_smart_mooring["data"]), len(wave_data["waves"])
+
+    with metrics.timer("gps", spotter_id) as measurement:
+        if gps_track is not None:
+            # Streamed wave data only holds bucket averages, so use the raw fixes kept while streaming
+            gps = gps_track.summary(spotter_id, anchor)
+        else:
+            gps = gps_summary(spotter_id, wave_data, anchor)
+        save_gps_summary(gps, wave_directory)
+        measurement["rows"] = gps["fixes"]
+    if gps["status"] == "drag_suspected":
+        print(f"Warning: {spotter_id} may be dragging anchor: median distance {gps['recent_radius_p50_m']} m "
+              f"over the last day, 95% of earlier fixes within {gps['reference_radius_p95_m']} m.")
+
+    # Long spans are plotted from the rollup tier matching the span instead of every raw row
+    rollup_tier = select_rollup_tier(start_date, end_date)
+    if plot and rollup_tier is not None:
+        rollup_node_tables, rollup_wave_data = rollup_plot_data(spotter_id, rollup_tier, start_date, end_date)
+        if rollup_wave_data["waves"]:
+            print(f"Plotting {rollup_tier} rollups for the {end_date - start_date} range.")
+            node_tables, wave_data = rollup_node_tables, rollup_wave_data
+            unique_node_ids = set(unique_node_ids) & set(node_tables)
+
+    figures = []
+    if plot and render_directory:
+        from plotting import decimate_report_data, render_spotter_report
+        # Interactive plots are not timed, as the windows stay open until closed by the user
+        with metrics.timer("plot", spotter_id) as measurement:
+            if render_executor is not None:
+                # Only the points that get drawn are pickled to the worker process
+                report_tables, report_waves = decimate_report_data(node_tables, unique_node_ids, wave_data)
+                figures = render_executor.submit(render_spotter_report, spotter_id, report_tables, unique_node_ids,
+                                                 report_waves, render_directory, render_formats).result()
+            else:
+                figures = render_spotter_report(spotter_id, node_tables, unique_node_ids, wave_data,
+                                                render_directory, render_formats)
+            measurement["files"] = len(figures)
+    elif plot:
+        from plotting import plot_data, plot_gps_coordinates
+
+        # Plot data for all unique Node IDs found
+        plot_data(node_tables, unique_node_ids, wave_data, spotter_id)
+
+        # Plot the GPS coordiantes from wave data
+        plot_gps_coordinates(wave_data, spotter_id)
+
+    print("Data fetching, processing, and plotting complete.")
+    print("Start date:", start_date.strftime("%m/%d/%Y"))
+    print("End date:", end_date.strftime("%m/%d"))
+    print("Number of days between the start and end date:", end_date - start_date)
+
+    return {"node_ids": sorted(unique_node_ids), "sensor_rows": sensor_rows, "wave_rows": wave_rows,
+            "gps": gps, "figures": figures, "metrics": metrics.summary(spotter_id).get(spotter_id, {})}
@@ -0,0 +1,119 @@
+# filename: stream_aggregates.py
+# description: running time-bucket aggregates so streamed data can be plotted without keeping every row in memory
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+PLOT_AGGREGATE_INTERVAL = timedelta(minutes=30)
+
+
+def parse_timestamp(timestamp):
+    """Parse an API timestamp such as '2025-01-01T00:00:00.000Z' into an aware UTC datetime."""
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+class TimeBucketAggregator:
+    """Accumulate per-bucket count/mean/min/max of sensor and wave data as chunks stream through.
+
+    Memory grows with the number of time buckets (span / interval), not with the number of rows, and the
+    aggregated output has the same shape as `process_smart_mooring_data` and the wave data, so it can be
+    passed straight to `plot_data` and `plot_gps_coordinates`.
+    """
+
+    def __init__(self, interval=PLOT_AGGREGATE_INTERVAL):
+        self.interval_seconds = interval.total_seconds()
+        # (node_id, data_type_name, bucket) -> running sums
+        self._sensor_buckets = {}
+        self._sensor_units = {}
+        # bucket -> running sums of wave height and position
+        self._wave_buckets = {}
+        self.sensor_rows = 0
+        self.wave_rows = 0
+
+    def _bucket(self, timestamp):
+        epoch = parse_timestamp(timestamp).timestamp()
+        return epoch - epoch % self.interval_seconds
+
+    def add_sensor_entries(self, grouped_data):
+        """Fold parsed smart mooring entries (node_id -> list of entries) into the buckets."""
+        for node_id, node_entries in grouped_data.items():
+            self.sensor_rows += len(node_entries)
+            for entry in node_entries:
+                if not entry["timestamp"]:
+                    continue
+                key = (node_id, entry["data_type_name"], self._bucket(entry["timestamp"]))
+                bucket = self._sensor_buckets.get(key)
+                if bucket is None:
+                    bucket = self._sensor_buckets[key] = {
+                        "value_sum": 0.0, "value_count": 0, "mean_force_sum": 0.0, "force_count": 0,
+                        "min_force": None, "max_force": None,
+                    }
+                if entry["value"] is not None:
+                    bucket["value_sum"] += entry["value"]
+                    bucket["value_count"] += 1
+                if entry["mean_force"] is not None:
+                    bucket["mean_force_sum"] += entry["mean_force"]
+                    bucket["force_count"] += 1
+                if entry["min_force"] is not None:
+                    bucket["min_force"] = entry["min_force"] if bucket["min_force"] is None \
+                        else min(bucket["min_force"], entry["min_force"])
+                if entry["max_force"] is not None:
+                    bucket["max_force"] = entry["max_force"] if bucket["max_force"] is None \
+                        else max(bucket["max_force"], entry["max_force"])
+                if entry["unit"]:
+                    self._sensor_units[entry["data_type_name"]] = entry["unit"]
+
+    def add_wave_entries(self, waves):
+        """Fold wave records into the buckets."""
+        self.wave_rows += len(waves)
+        for entry in waves:
+            if not entry.get("timestamp"):
+                continue
+            bucket_key = self._bucket(entry["timestamp"])
+            bucket = self._wave_buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self._wave_buckets[bucket_key] = {
+                    "height_sum": 0.0, "height_count": 0, "latitude_sum": 0.0, "longitude_sum": 0.0, "gps_count": 0,
+                }
+            if entry.get("significantWaveHeight") is not None:
+                bucket["height_sum"] += entry["significantWaveHeight"]
+                bucket["height_count"] += 1
+            if entry.get("latitude") is not None and entry.get("longitude") is not None:
+                bucket["latitude_sum"] += entry["latitude"]
+                bucket["longitude_sum"] += entry["longitude"]
+                bucket["gps_count"] += 1
+
+    @staticmethod
+    def _format_bucket(bucket):
+        return datetime.fromtimestamp(bucket, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def sensor_data(self):
+        """Return (grouped_data, unique_node_ids) of bucket averages, min force and max force."""
+        grouped_data = defaultdict(list)
+        for (node_id, data_type, bucket_key), bucket in sorted(self._sensor_buckets.items(), key=lambda item: item[0][2]):
+            grouped_data[node_id].append({
+                "timestamp": self._format_bucket(bucket_key),
+                "data_type_name": data_type,
+                "latitude": None,
+                "longitude": None,
+                "decoded_value": None,
+                "min_force": bucket["min_force"],
+                "max_force": bucket["max_force"],
+                "mean_force": bucket["mean_force_sum"] / bucket["force_count"] if bucket["force_count"] else None,
+                "value": bucket["value_sum"] / bucket["value_count"] if bucket["value_count"] else None,
+                "unit": self._sensor_units.get(data_type),
+            })
+        return grouped_data, set(grouped_data)
+
+    def wave_data(self):
+        """Return wave data ({'waves': [...]}) of bucket-averaged wave height and position."""
+        waves = []
+        for bucket_key, bucket in sorted(self._wave_buckets.items()):
+            entry = {"timestamp": self._format_bucket(bucket_key)}
+            if bucket["height_count"]:
+                entry["significantWaveHeight"] = bucket["height_sum"] / bucket["height_count"]
+            if bucket["gps_count"]:
+                entry["latitude"] = bucket["latitude_sum"] / bucket["gps_count"]
+                entry["longitude"] = bucket["longitude_sum"] / bucket["gps_count"]
+            waves.append(entry)
+        return {"waves": waves}
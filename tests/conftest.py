@@ -0,0 +1,40 @@
+# filename: conftest.py
+# description: shared pytest fixtures: an isolated working directory and the offline mock Sofar API transport
+
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The API token is never used offline, so tests run without a local config.py
+try:
+    import config  # noqa: F401
+except ImportError:
+    sys.modules["config"] = types.ModuleType("config")
+    sys.modules["config"].API_TOKEN = "offline-tests"
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test in an empty directory, so caches and parsed output never touch the checkout."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Return a factory that routes the pipeline's HTTP session to a `benchmark.MockSofarSession`."""
+    import sofar_pipeline
+    from benchmark import MockSofarSession
+    from request_retry import AdaptiveRateLimiter
+
+    def install(start, end, **kwargs):
+        session = MockSofarSession(start, end, **kwargs)
+        monkeypatch.setattr(sofar_pipeline, "_http_session", session)
+        monkeypatch.setattr(sofar_pipeline, "_rate_limiter", AdaptiveRateLimiter(max_rate=1000))
+        return session
+
+    return install
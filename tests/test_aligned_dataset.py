@@ -0,0 +1,77 @@
+# filename: test_aligned_dataset.py
+# description: tests for merging force aggregates and nearest readings of the aligned table across chunks and runs
+
+import pandas as pd
+import pytest
+
+from aligned_dataset import build_aligned_table, combine_aligned_tables, load_aligned_table, save_aligned_table
+from node_tables import NODE_TABLE_COLUMNS
+
+
+def force_table(readings):
+    """Return a node table with one (timestamp, min, max, mean) force reading per row."""
+    index = pd.DatetimeIndex([pd.Timestamp(timestamp, tz="UTC") for timestamp, *_ in readings], name="timestamp")
+    table = pd.DataFrame(index=index, columns=NODE_TABLE_COLUMNS, dtype="float64")
+    table[["min_force", "max_force", "mean_force"]] = [forces for _, *forces in readings]
+    return table
+
+
+def test_bucket_spanning_chunks_keeps_peak_and_weighted_mean():
+    # Both readings fall in the 12:00 bucket but were fetched in different chunks
+    first = build_aligned_table({}, {"node": force_table([("2025-01-01T11:50", 5, 10, 8),
+                                                          ("2025-01-01T11:55", 5, 10, 8)])})
+    second = build_aligned_table({}, {"node": force_table([("2025-01-01T12:05", 50, 999, 20)])})
+
+    bucket = combine_aligned_tables([first, second]).loc[pd.Timestamp("2025-01-01T12:00", tz="UTC")]
+    assert bucket["node_min_force"] == 5
+    assert bucket["node_max_force"] == 999
+    assert bucket["node_mean_force"] == pytest.approx(12)
+    assert bucket["node_force_count"] == 3
+
+
+def test_partial_edge_bucket_does_not_replace_stored_bucket(tmp_path):
+    readings = [("2025-01-01T11:50", 5, 10, 8), ("2025-01-01T12:00", 5, 999, 20), ("2025-01-01T12:10", 5, 10, 8)]
+    save_aligned_table(build_aligned_table({}, {"node": force_table(readings)}), tmp_path)
+    # A later run starting mid-bucket only sees the last reading
+    save_aligned_table(build_aligned_table({}, {"node": force_table(readings[-1:])}), tmp_path)
+
+    bucket = load_aligned_table(str(tmp_path / "aligned_30min.csv")).loc[pd.Timestamp("2025-01-01T12:00", tz="UTC")]
+    assert bucket["node_max_force"] == 999
+    assert bucket["node_mean_force"] == pytest.approx(12)
+    assert bucket["node_force_count"] == 3
+
+
+def test_force_counts_are_saved_as_integers(tmp_path):
+    readings = [("2025-01-01T11:50", 5, 10, 8), ("2025-01-01T12:00", 5, 999, 20), ("2025-01-01T13:00", 5, 10, 8)]
+    # The 12:30 grid point between the chunks' readings has no force reading
+    first = build_aligned_table({}, {"node": force_table(readings)})
+    second = build_aligned_table({}, {"node": force_table([("2025-01-01T12:10", 5, 10, 8)])})
+    save_aligned_table(combine_aligned_tables([first, second]), tmp_path)
+
+    lines = (tmp_path / "aligned_30min.csv").read_text().splitlines()
+    header = lines[0].split(",")
+    counts = [line.split(",")[header.index("node_force_count")] for line in lines[1:]]
+    assert counts == ["3", "", "1"]
+    assert str(load_aligned_table(str(tmp_path / "aligned_30min.csv"))["node_force_count"].dtype) == "Int64"
+
+
+def test_bucket_spanning_chunks_takes_the_nearest_reading():
+    def waves(timestamp, height):
+        return {"waves": [{"timestamp": timestamp, "significantWaveHeight": height}]}
+
+    def speed_table(timestamp, mean):
+        table = pd.DataFrame(index=pd.DatetimeIndex([pd.Timestamp(timestamp, tz="UTC")], name="timestamp"),
+                             columns=NODE_TABLE_COLUMNS, dtype="float64")
+        table[["speed_mean", "speed_std"]] = [[mean, mean / 10]]
+        return table
+
+    # The 12:00 grid point covers 11:45 to 12:15, split between two chunks at 12:00
+    chunks = [({}, {"node": speed_table("2025-01-01T11:46", 0.1)}), (waves("2025-01-01T11:50:00Z", 1.0), {}),
+              ({}, {"node": speed_table("2025-01-01T12:01", 0.3)}), (waves("2025-01-01T12:02:00Z", 2.0), {})]
+    combined = combine_aligned_tables([build_aligned_table(wave_streams, node_tables, reading_times=True)
+                                       for wave_streams, node_tables in chunks])
+
+    bucket = combined.loc[pd.Timestamp("2025-01-01T12:00", tz="UTC")]
+    assert bucket["hs"] == 2.0
+    assert (bucket["node_speed_mean"], bucket["node_speed_std"]) == (0.3, pytest.approx(0.03))
+    assert not any(column.endswith("_reading_time") for column in combined.columns)
@@ -0,0 +1,56 @@
+# filename: test_chunk_sizes.py
+# description: tests for splitting full pages and for the seeded and learned chunk sizes of fetches
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import sofar_pipeline
+from benchmark import BENCHMARK_SPOTTER_ID
+
+START = datetime(2025, 1, 1)
+END = START + timedelta(days=2)
+
+
+def fetch_sensor(chunk_size_days=None):
+    return sofar_pipeline.fetch_data_in_chunks(START, END, BENCHMARK_SPOTTER_ID, chunk_size_days=chunk_size_days,
+                                               data_type="sensor", max_in_flight=1, use_cache=False)
+
+
+def test_full_pages_are_split_until_complete(mock_api):
+    # Two nodes every 10 minutes: 2880 records in one two-day window
+    session = mock_api(START, END, node_count=2, sensor_interval=timedelta(minutes=10))
+    records = fetch_sensor(chunk_size_days=2)["data"]
+
+    assert len(records) == 2880
+    assert records == [json.loads(record) for record in session._sensor_records]
+    # Halved three times until the quarter-day windows of 360 records fit a page
+    assert session.requests == 1 + 2 + 4 + 8
+
+
+def test_first_run_is_seeded_from_the_expected_record_rate(mock_api):
+    session = mock_api(START, END, node_count=2, sensor_interval=timedelta(minutes=10))
+    chunk_size_days = sofar_pipeline.get_chunk_size_days(BENCHMARK_SPOTTER_ID, "sensor")
+    records_per_window = chunk_size_days * sofar_pipeline.EXPECTED_RECORDS_PER_DAY["sensor"]
+    assert records_per_window == pytest.approx(sofar_pipeline.PAGE_LIMIT * sofar_pipeline.TARGET_PAGE_FILL, rel=0.01)
+
+    assert len(fetch_sensor()["data"]) == 2880
+    # One request per window: no page came back full
+    assert session.requests == len(sofar_pipeline.build_chunk_windows(START, END, chunk_size_days))
+
+
+def test_learned_chunk_size_is_used_by_the_next_run(mock_api):
+    # One node: half the expected rate, so the learned windows are twice as long as the seeded ones
+    session = mock_api(START, END, node_count=1, sensor_interval=timedelta(minutes=10))
+    seeded_size = sofar_pipeline.get_chunk_size_days(BENCHMARK_SPOTTER_ID, "sensor")
+    fetch_sensor()
+    first_run_requests = session.requests
+
+    learned_size = sofar_pipeline.load_chunk_sizes()[f"{BENCHMARK_SPOTTER_ID}/sensor"]
+    assert learned_size == round(2 * seeded_size, 3)
+    assert sofar_pipeline.get_chunk_size_days(BENCHMARK_SPOTTER_ID, "sensor") == learned_size
+
+    assert len(fetch_sensor()["data"]) == 1440
+    assert session.requests - first_run_requests == len(sofar_pipeline.build_chunk_windows(START, END, learned_size))
+    assert session.requests - first_run_requests < first_run_requests
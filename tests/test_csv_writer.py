@@ -0,0 +1,114 @@
+# filename: test_csv_writer.py
+# description: tests for idempotent CSV writes and the sidecar index that avoids rescanning stored files
+
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import csv_writer
+import response_cache
+from benchmark import BENCHMARK_SPOTTER_ID
+from csv_writer import CSVWriterPool
+from sofar_pipeline import fetch_data_in_chunks, process_smart_mooring_data, process_wave_data
+
+
+def rows_between(start, count, step=timedelta(minutes=30)):
+    return [{"timestamp": (start + step * i).strftime("%Y-%m-%dT%H:%M:%S.000Z"), "value": i} for i in range(count)]
+
+
+def write(csv_filename, rows):
+    with CSVWriterPool() as writer:
+        return writer.write_rows(csv_filename, rows, key_fields=("timestamp",))
+
+
+def stored_timestamps(csv_filename):
+    with open(csv_filename, newline='', encoding='utf-8') as file:
+        return [row["timestamp"] for row in csv.DictReader(file)]
+
+
+@pytest.fixture
+def no_csv_scans(monkeypatch):
+    def fail(*args):
+        raise AssertionError("stored keys were read from the CSV")
+    monkeypatch.setattr(csv_writer, "read_stored_keys", fail)
+
+
+def test_rerun_of_settled_range_skips_without_reading_csv(no_csv_scans):
+    rows = rows_between(datetime(2025, 1, 1), 96)
+    assert write("waves.csv", rows) == 96
+
+    # Same range again, then an overlapping one
+    assert write("waves.csv", rows) == 0
+    assert write("waves.csv", rows_between(datetime(2025, 1, 2), 96)) == 48
+    assert len(stored_timestamps("waves.csv")) == 144
+
+
+def test_recent_rows_are_deduplicated_from_index(no_csv_scans):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=3)
+    rows = rows_between(start, 6)
+    write("waves.csv", rows[::2])
+
+    # Late data for the still unsettled range is appended, rows already stored are not
+    assert write("waves.csv", rows) == 3
+    assert sorted(stored_timestamps("waves.csv")) == [row["timestamp"] for row in rows]
+
+
+def test_aged_out_recent_keys_fall_back_to_stored_keys(monkeypatch):
+    monkeypatch.setattr(csv_writer, "RECENT_KEYS_MAX_AGE", timedelta(0))
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=3)
+    rows = rows_between(start, 6)
+    write("waves.csv", rows[:4])
+
+    assert write("waves.csv", rows) == 2
+    assert sorted(stored_timestamps("waves.csv")) == [row["timestamp"] for row in rows]
+
+
+def test_rows_in_gap_between_runs_are_appended(no_csv_scans):
+    write("waves.csv", rows_between(datetime(2025, 1, 1), 48))
+    write("waves.csv", rows_between(datetime(2025, 1, 3), 48))
+    assert write("waves.csv", rows_between(datetime(2025, 1, 1), 144)) == 48
+    assert len(set(stored_timestamps("waves.csv"))) == 144
+
+
+def test_stale_index_falls_back_to_stored_keys():
+    rows = rows_between(datetime(2025, 1, 1), 10)
+    write("waves.csv", rows[:5])
+    with open("waves.csv", mode='a', newline='', encoding='utf-8') as file:
+        file.write(f"{rows[5]['timestamp']},5\n")  # edited outside the writer
+
+    assert write("waves.csv", rows) == 4
+    assert sorted(stored_timestamps("waves.csv")) == [row["timestamp"] for row in rows]
+
+
+def test_spotters_sharing_timestamps_keep_their_own_wave_rows():
+    records = rows_between(datetime(2025, 1, 1), 48)
+    for spotter_id in ("SPOT-1", "SPOT-2"):
+        process_wave_data(spotter_id, {"data": {"waves": [{**record, "significantWaveHeight": 1.0}
+                                                          for record in records]}})
+
+    for spotter_id in ("SPOT-1", "SPOT-2"):
+        assert len(stored_timestamps(os.path.join("parsed_data", "spotter_wave", spotter_id, "waves.csv"))) == 48
+
+
+def test_resumed_open_checkpoint_does_not_settle_its_rows(mock_api):
+    # A run 7 h ago fetched half of a window that was still open, then failed; the rerun resumes it
+    end = datetime.utcnow().replace(microsecond=0)
+    window = (end - timedelta(hours=8), end - timedelta(hours=7))
+    mock_api(end - timedelta(hours=8), end, node_count=1, sensor_interval=timedelta(minutes=2))
+    partial = fetch_data_in_chunks(*window, BENCHMARK_SPOTTER_ID, chunk_size_days=1, data_type="sensor",
+                                   use_cache=False)
+    partial["data"] = partial["data"][:len(partial["data"]) // 2]
+    response_cache.store_checkpoint(BENCHMARK_SPOTTER_ID, "sensor", window, partial)
+    with response_cache._connect() as connection:
+        connection.execute("UPDATE checkpoints SET created_at = ?", (time.time() - 7 * 3600,))
+
+    for _ in range(2):  # resumed from the checkpoint, then fetched in full
+        data = fetch_data_in_chunks(*window, BENCHMARK_SPOTTER_ID, chunk_size_days=1, data_type="sensor")
+        process_smart_mooring_data(BENCHMARK_SPOTTER_ID, data)
+
+    csv_filenames = [os.path.join(directory, name) for directory, _, names in os.walk("BM_messages_parsing")
+                     for name in names if name.endswith("_smart_mooring.csv")]
+    assert sum(len(stored_timestamps(name)) for name in csv_filenames) == len(data["data"])
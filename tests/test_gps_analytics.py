@@ -0,0 +1,45 @@
+# filename: test_gps_analytics.py
+# description: tests for GPS watch circle summaries, fix rejection and the streamed GPS track
+
+from datetime import datetime, timedelta
+
+from benchmark import BENCHMARK_SPOTTER_ID
+from gps_analytics import GPSTrack, gps_summary
+from sofar_pipeline import process_and_plot_data
+
+
+def wave_records(count, glitch_at=None):
+    start = datetime(2025, 1, 1)
+    records = []
+    for i in range(count):
+        latitude, longitude = 37.5 + (i % 3) * 1e-5, -122.5
+        if i == glitch_at:
+            latitude += 0.1  # an 11 km jump and back
+        records.append({"timestamp": (start + timedelta(minutes=30 * i)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                        "latitude": latitude, "longitude": longitude})
+    return records
+
+
+def test_track_built_from_chunks_matches_whole_track():
+    records = wave_records(200, glitch_at=120)
+    track = GPSTrack()
+    for chunk_start in range(0, len(records), 70):
+        track.add_wave_entries(records[chunk_start:chunk_start + 70])
+
+    summary = track.summary("SPOT-1")
+    assert summary == gps_summary("SPOT-1", {"waves": records})
+    assert summary["rejected_fixes"] == 1
+    assert summary["radius_max_m"] < 5
+
+
+def test_empty_track_has_no_fixes():
+    assert GPSTrack().summary("SPOT-1")["status"] == "no_fixes"
+
+
+def test_streamed_summary_uses_raw_fixes(mock_api):
+    start = datetime(2025, 1, 1)
+    end = start + timedelta(days=3)
+    mock_api(start, end, node_count=1, wave_interval=timedelta(minutes=10))
+
+    result = process_and_plot_data(BENCHMARK_SPOTTER_ID, start, end, streaming=True, plot=False)
+    assert result["gps"]["fixes"] == 3 * 24 * 6
@@ -0,0 +1,58 @@
+# filename: test_instrumentation.py
+# description: tests for the per-stage metrics recorded by a pipeline run, their JSON lines log and trace export
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import sofar_pipeline
+from benchmark import BENCHMARK_SPOTTER_ID
+from instrumentation import MetricsRecorder
+
+START = datetime(2025, 1, 1)
+END = START + timedelta(days=1)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = MetricsRecorder()
+    monkeypatch.setattr(sofar_pipeline, "metrics", recorder)
+    yield recorder
+    recorder.close()
+
+
+def test_run_records_each_stage(mock_api, recorder, workdir):
+    # One node every 10 minutes: 720 sensor records a day, so half-day windows never fill a page
+    session = mock_api(START, END, node_count=1, sensor_interval=timedelta(minutes=10),
+                       wave_interval=timedelta(minutes=30))
+    recorder.open_log(str(workdir / "metrics.jsonl"))
+    recorder.enable_trace()
+
+    sensor_data = sofar_pipeline.fetch_data_in_chunks(START, END, BENCHMARK_SPOTTER_ID, chunk_size_days=0.5,
+                                                      data_type="sensor", use_cache=False)
+    wave_data = sofar_pipeline.fetch_data_in_chunks(START, END, BENCHMARK_SPOTTER_ID, chunk_size_days=0.5,
+                                                    use_cache=False)
+    sofar_pipeline.process_smart_mooring_data(BENCHMARK_SPOTTER_ID, sensor_data)
+    sofar_pipeline.process_wave_data(BENCHMARK_SPOTTER_ID, wave_data)
+
+    stages = recorder.summary(BENCHMARK_SPOTTER_ID)[BENCHMARK_SPOTTER_ID]
+    assert {"fetch", "decode", "write", "rollup"} <= set(stages)
+    sensor_rows, wave_rows = len(sensor_data["data"]), len(wave_data["data"]["waves"])
+    assert stages["fetch"]["calls"] == session.requests == 4
+    assert stages["fetch"]["rows"] == sensor_rows + wave_rows
+    assert stages["fetch"]["bytes"] == session.bytes_served
+    assert stages["decode"]["rows"] == sensor_rows
+    assert stages["rollup"]["rows"] == sensor_rows + 4 * wave_rows
+
+    # The same measurements, one JSON line and one trace event each
+    recorder.close()
+    events = [json.loads(line) for line in (workdir / "metrics.jsonl").read_text().splitlines()]
+    assert len(events) == sum(totals["calls"] for totals in stages.values())
+    assert sum(event["bytes"] for event in events if event["stage"] == "fetch") == session.bytes_served
+    assert {event["window_start"] for event in events if event["stage"] == "fetch"} == {
+        "2025-01-01T00:00:00Z", "2025-01-01T12:00:00Z"}
+    recorder.export_chrome_trace(str(workdir / "trace.json"))
+    trace = json.loads((workdir / "trace.json").read_text())["traceEvents"]
+    assert [event["name"] for event in trace] == [event["stage"] for event in events]
+    assert "fetch" in recorder.format_summary()
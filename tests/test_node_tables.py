@@ -0,0 +1,54 @@
+# filename: test_node_tables.py
+# description: tests for pairing mean/std readings into node tables, within one chunk and across chunks
+
+import pandas as pd
+import pytest
+
+from node_tables import NodeTableBuilder, build_node_table, build_node_tables
+from sofar_pipeline import process_node_tables
+
+SPEED_MEAN, SPEED_STD = "aanderaa_abs_speed_mean_15bits", "aanderaa_abs_speed_std_15bits"
+
+
+def speed_entries(readings):
+    """Return parsed entries for (timestamp, mean, std) speed readings, the std two seconds after the mean."""
+    entries = []
+    for timestamp, mean, std in readings:
+        moment = pd.Timestamp(timestamp, tz="UTC")
+        entries.append({"timestamp": f"{moment:%Y-%m-%dT%H:%M:%S}.000Z", "data_type_name": SPEED_MEAN,
+                        "value": mean})
+        entries.append({"timestamp": f"{moment + pd.Timedelta(seconds=2):%Y-%m-%dT%H:%M:%S}.000Z",
+                        "data_type_name": SPEED_STD, "value": std})
+    return entries
+
+
+def test_mean_and_std_seconds_apart_share_a_row():
+    table = build_node_table(speed_entries([("2025-01-01T00:00", 30, 4), ("2025-01-01T00:10", 32, 5)]))
+
+    assert list(table["speed_mean"]) == [30, 32]
+    assert list(table["speed_std"]) == [4, 5]
+    assert table["max_force"].isna().all()
+
+
+def test_pair_split_by_chunk_boundary_stays_paired():
+    entries = speed_entries([("2025-01-01T00:00", 30, 4), ("2025-01-01T00:10", 32, 5), ("2025-01-01T00:20", 31, 6)])
+    # The boundary falls between the mean and std messages of the last reading
+    builder = NodeTableBuilder()
+    chunks = [builder.add({"node": entries[:5]}), builder.add({"node": entries[5:]}), builder.flush()]
+
+    table = pd.concat([tables["node"] for tables in chunks if "node" in tables]).sort_index()
+    assert not table.index.duplicated().any()
+    pd.testing.assert_frame_equal(table, build_node_tables({"node": entries})["node"])
+    assert table["speed_std"].notna().all()
+
+
+def test_aligned_csv_built_chunk_by_chunk_has_no_missing_std(tmp_path):
+    entries = speed_entries([(f"2025-01-01T00:{minute:02d}", 30 + minute, 4) for minute in range(0, 60, 10)])
+    builder = NodeTableBuilder()
+    for chunk in (entries[:3], entries[3:9], entries[9:]):
+        process_node_tables("SPOT-TEST", {"node": chunk}, output_directory=str(tmp_path), builder=builder)
+    process_node_tables("SPOT-TEST", None, output_directory=str(tmp_path), builder=builder)
+
+    aligned = pd.read_csv(tmp_path / "node" / "node_aligned.csv")
+    assert len(aligned) == 6
+    assert aligned["speed_std"].tolist() == pytest.approx([4] * 6)
@@ -0,0 +1,25 @@
+# filename: test_parquet_writer.py
+# description: tests for column and partition selective reads of the partitioned Parquet output
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from parquet_writer import load_parquet, save_wave_parquet, wave_dataset_directory
+
+
+def test_wave_stream_columns_can_be_read_alone():
+    position = {"latitude": 37.5, "longitude": -122.5}
+    for spotter_id, day in (("SPOT-1", "01"), ("SPOT-2", "02")):
+        timestamp = f"2025-01-{day}T00:00:00.000Z"
+        save_wave_parquet(spotter_id, {"data": {
+            "waves": [{"timestamp": timestamp, "significantWaveHeight": 1.5, "peakPeriod": 10.0, **position}],
+            "wind": [{"timestamp": timestamp, "speed": 6.0, "direction": 270.0, **position}],
+            "surfaceTemp": [{"timestamp": timestamp, "degrees": 13.0, **position}],
+        }})
+
+    waves = load_parquet(wave_dataset_directory("waves"), columns=["timestamp", "significantWaveHeight"],
+                         filters=[("spotter_id", "==", "SPOT-2"), ("date", ">=", "2025-01-02")])
+    assert waves["significantWaveHeight"].tolist() == [1.5]
+    wind = load_parquet(wave_dataset_directory("wind"), columns=["speed"])
+    assert wind["speed"].tolist() == [6.0, 6.0]
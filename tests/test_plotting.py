@@ -0,0 +1,114 @@
+# filename: test_plotting.py
+# description: tests for the plot data sent to render worker processes, redrawing decimated plots on zoom and GPS scrubbing
+
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import BENCHMARK_SPOTTER_ID
+from node_tables import build_node_tables
+from sofar_pipeline import fetch_data_in_chunks, process_smart_mooring_data
+
+plotting = pytest.importorskip("plotting")
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def report_data(mock_api):
+    mock_api(START, START + timedelta(days=3), node_count=2, sensor_interval=timedelta(minutes=5),
+             wave_interval=timedelta(minutes=10))
+    sensor_data = fetch_data_in_chunks(START, START + timedelta(days=3), BENCHMARK_SPOTTER_ID, data_type="sensor",
+                                       use_cache=False)
+    wave_data = fetch_data_in_chunks(START, START + timedelta(days=3), BENCHMARK_SPOTTER_ID, use_cache=False)
+    grouped_data, unique_node_ids = process_smart_mooring_data(BENCHMARK_SPOTTER_ID, sensor_data)
+    return build_node_tables(grouped_data), unique_node_ids, wave_data["data"]
+
+
+def test_render_task_only_carries_plotted_points(report_data):
+    node_tables, unique_node_ids, wave_data = report_data
+    max_points = 100
+    reduced_tables, reduced_waves = plotting.decimate_report_data(node_tables, unique_node_ids, wave_data,
+                                                                  max_points)
+
+    for node_id in unique_node_ids:
+        table, reduced = node_tables[node_id], reduced_tables[node_id]
+        # Four decimated series of at most max_points each, out of 3 days of 5-minute readings
+        assert len(reduced) <= 4 * max_points < len(table)
+        assert reduced["max_force"].max() == table["max_force"].max()
+        assert reduced.index.is_monotonic_increasing
+    assert len(reduced_waves["waves"]) <= 2 * max_points < len(wave_data["waves"])
+    assert reduced_waves["waves"][0]["timestamp"] == wave_data["waves"][0]["timestamp"]
+    assert reduced_waves["waves"][-1]["timestamp"] == wave_data["waves"][-1]["timestamp"]
+    assert len(pickle.dumps((reduced_tables, reduced_waves))) < len(pickle.dumps((node_tables, wave_data))) / 5
+
+
+def test_reduced_report_renders(report_data, tmp_path):
+    node_tables, unique_node_ids, wave_data = report_data
+    reduced_tables, reduced_waves = plotting.decimate_report_data(node_tables, unique_node_ids, wave_data)
+
+    files = plotting.render_spotter_report(BENCHMARK_SPOTTER_ID, reduced_tables, unique_node_ids, reduced_waves,
+                                           str(tmp_path))
+    assert [path.rsplit("_", 1)[-1] for path in files] == ["timeseries.png", "gps.png"]
+
+
+def test_std_band_is_redecimated_on_zoom():
+    plotting.use_headless_backend()
+    timestamps = pd.date_range("2025-01-01", periods=1000, freq="10min", tz="UTC")
+    mean = np.sin(np.arange(1000) / 20)
+    fig, ax = plotting.plt.subplots()
+    x, _ = plotting.plot_decimated(ax, timestamps, mean, "blue", "speed", max_points=50, band=(mean - 0.1, mean + 0.1))
+    band = ax.collections[-1]
+
+    def band_times():
+        return np.unique(band.get_paths()[0].vertices[:, 0])
+
+    np.testing.assert_array_equal(band_times(), x)
+    # Zoomed in far enough, the band is drawn from every reading in view, like the line
+    all_times = plotting.to_date_numbers(timestamps)
+    ax.set_xlim(all_times[100], all_times[130])
+    np.testing.assert_array_equal(band_times(), all_times[99:131])
+    np.testing.assert_array_equal(ax.lines[0].get_xdata(), all_times[99:131])
+    plotting.plt.close(fig)
+
+
+def test_gps_scrubbers_select_fixes_by_time(report_data, monkeypatch):
+    _, _, wave_data = report_data
+    sliders = []
+
+    class RecordingSlider(plotting.Slider):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            sliders.append(self)
+
+    plotting.use_headless_backend()
+    monkeypatch.setattr(plotting, "Slider", RecordingSlider)
+    monkeypatch.setattr(plotting.plt, "show", lambda: None)
+    # Fixes arrive out of order; the track is sorted by time before selecting
+    shuffled = {"waves": wave_data["waves"][::-1]}
+    plotting.plot_gps_coordinates(shuffled, BENCHMARK_SPOTTER_ID, max_points=50, start="2025-01-01T12:00:00Z",
+                                  end=datetime(2025, 1, 2, 12, 5))
+    fig = plotting.plt.gcf()
+    track, start_marker, end_marker = fig.axes[0].lines[0], *fig.axes[0].collections[:2]
+    fixes = wave_data["waves"]
+
+    def selected(first, last):
+        return [fix["longitude"] for fix in fixes[first:last + 1]]
+
+    # Fixes every 10 minutes: noon on the first day is fix 72, noon on the second (the last at or before 12:05) is 216
+    x = track.get_xdata()
+    assert (x[0], x[-1]) == (fixes[72]["longitude"], fixes[216]["longitude"])
+    assert len(x) == 50
+    start_slider, end_slider = sliders
+    assert start_slider.val == 12 and end_slider.val == 36
+
+    # Scrubbing by hours since the first fix moves the track and both end markers
+    start_slider.set_val(1)
+    end_slider.set_val(2.5)
+    np.testing.assert_array_equal(track.get_xdata(), selected(6, 15))
+    assert start_marker.get_offsets()[0][0] == fixes[6]["longitude"]
+    assert end_marker.get_offsets()[0][0] == fixes[15]["longitude"]
+    assert (start_slider.valtext.get_text(), end_slider.valtext.get_text()) == ("01-01 01:00", "01-01 02:30")
+    plotting.plt.close(fig)
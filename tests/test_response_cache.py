@@ -0,0 +1,97 @@
+# filename: test_response_cache.py
+# description: tests for the closed-window response cache and the checkpoints a failed run resumes from
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import response_cache
+import sofar_pipeline
+from benchmark import BENCHMARK_SPOTTER_ID
+
+
+def recent_range(hours):
+    """Return a (start, end) range of naive UTC datetimes ending now, on whole seconds."""
+    end = datetime.utcnow().replace(microsecond=0)
+    return end - timedelta(hours=hours), end
+
+
+def fetch_records(start, end, data_type="sensor", use_cache=True):
+    return sofar_pipeline.fetch_data_in_chunks(start, end, BENCHMARK_SPOTTER_ID, chunk_size_days=0.5,
+                                               data_type=data_type, max_in_flight=1, use_cache=use_cache)
+
+
+def test_closed_windows_are_served_from_cache(mock_api):
+    start, end = recent_range(48)
+    session = mock_api(start, end, node_count=1, sensor_interval=timedelta(minutes=30))
+    first = fetch_records(start, end - timedelta(hours=12))
+    requests_made = session.requests
+
+    second = fetch_records(start, end - timedelta(hours=12))
+    assert second == first
+    assert session.requests == requests_made
+
+
+def test_open_windows_are_not_cached(mock_api):
+    start, end = recent_range(4)
+    session = mock_api(start, end, node_count=1, sensor_interval=timedelta(minutes=30))
+    fetch_records(start, end)
+    assert response_cache.get_cached_windows(BENCHMARK_SPOTTER_ID, "sensor", start, end) == []
+
+    fetch_records(start, end)
+    assert session.requests == 2
+
+
+def test_resumed_checkpoint_of_open_window_is_not_cached(mock_api):
+    # A run 7 h ago checkpointed its last, then still open, window and failed before finishing
+    start, end = recent_range(8)
+    window = (end - timedelta(hours=8), end - timedelta(hours=7))
+    session = mock_api(start, end, node_count=1, sensor_interval=timedelta(minutes=30))
+    partial = fetch_records(*window, use_cache=False)
+    partial["data"] = partial["data"][:len(partial["data"]) // 2]
+    response_cache.store_checkpoint(BENCHMARK_SPOTTER_ID, "sensor", window, partial)
+    with response_cache._connect() as connection:
+        connection.execute("UPDATE checkpoints SET created_at = ?", (time.time() - 7 * 3600,))
+    session.requests = 0
+
+    # The rerun resumes from the checkpoint without refetching it...
+    resumed = fetch_records(*window)
+    assert resumed["data"] == partial["data"]
+    assert resumed["fetched_at"] < time.time() - 6 * 3600
+    assert session.requests == 0
+    # ...but must not keep the possibly incomplete window in the permanent cache
+    assert response_cache.get_cached_windows(BENCHMARK_SPOTTER_ID, "sensor", *window) == []
+
+    # Once the checkpoints are cleared, the complete window is fetched and cached
+    complete = fetch_records(*window)
+    assert len(complete["data"]) > len(partial["data"])
+    assert response_cache.get_cached_windows(BENCHMARK_SPOTTER_ID, "sensor", *window) == [window]
+
+
+def test_expired_checkpoints_are_not_resumed(mock_api):
+    start, end = recent_range(48)
+    window = (start, start + timedelta(hours=12))
+    session = mock_api(start, end, node_count=1, sensor_interval=timedelta(minutes=30))
+    response_cache.store_checkpoint(BENCHMARK_SPOTTER_ID, "sensor", window, {"data": []})
+    with response_cache._connect() as connection:
+        connection.execute("UPDATE checkpoints SET created_at = ?",
+                           (time.time() - response_cache.CHECKPOINT_MAX_AGE.total_seconds() - 60,))
+
+    assert fetch_records(*window)["data"]
+    assert session.requests == 1
+
+
+def test_concurrent_writers_share_the_cache():
+    start = datetime(2025, 1, 1)
+    windows = [(start + timedelta(hours=hour), start + timedelta(hours=hour + 1)) for hour in range(64)]
+
+    def store(window):
+        response_cache.store_window(BENCHMARK_SPOTTER_ID, "sensor", window, {"data": [window[0].isoformat()]})
+        response_cache.store_checkpoint(BENCHMARK_SPOTTER_ID, "sensor", window, {"data": []})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(store, windows))
+
+    assert response_cache.get_cached_windows(BENCHMARK_SPOTTER_ID, "sensor", start, windows[-1][1]) == windows
+    assert len(response_cache.get_checkpointed_windows(BENCHMARK_SPOTTER_ID, "sensor", start,
+                                                       windows[-1][1])) == len(windows)
@@ -0,0 +1,114 @@
+# filename: test_rollups.py
+# description: tests for folding readings into the hourly and daily rollups and for picking the tier to plot
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+import rollups
+from benchmark import BENCHMARK_SPOTTER_ID
+from sensor_decoders import decode_sensor_value
+from sofar_pipeline import fetch_data_in_chunks, process_smart_mooring_data, process_wave_data
+
+START = datetime(2025, 1, 1)
+END = START + timedelta(days=2)
+SPEED_MEAN = "aanderaa_abs_speed_mean_15bits"
+
+
+@pytest.fixture
+def api_data(mock_api):
+    mock_api(START, END, node_count=2, sensor_interval=timedelta(minutes=10), wave_interval=timedelta(minutes=30))
+    sensor_data = fetch_data_in_chunks(START, END, BENCHMARK_SPOTTER_ID, data_type="sensor", use_cache=False)
+    wave_data = fetch_data_in_chunks(START, END, BENCHMARK_SPOTTER_ID, use_cache=False)
+    return sensor_data, wave_data
+
+
+def speed_rollups(tier):
+    speeds = rollups.load_rollups(BENCHMARK_SPOTTER_ID, tier)
+    return speeds[speeds["metric"] == "speed_mean"].sort_values("series", kind="stable")
+
+
+def speed_entry(timestamp, value):
+    return {"timestamp": timestamp, "data_type_name": SPEED_MEAN, "value": value, "min_force": None,
+            "max_force": None, "mean_force": None}
+
+
+def stored_keys():
+    with sqlite3.connect(rollups.ROLLUP_FILE) as connection:
+        return [row[0] for row in connection.execute("SELECT timestamp_us FROM rolled_up_keys ORDER BY timestamp_us")]
+
+
+def test_overlapping_chunks_roll_up_each_reading_once(api_data):
+    sensor_data, wave_data = api_data
+    records = sensor_data["data"]
+    # Two overlapping chunks, then the whole range again as a cache re-read would
+    for chunk in (records[:2000], records[1000:], records):
+        process_smart_mooring_data(BENCHMARK_SPOTTER_ID, {"data": chunk})
+    process_wave_data(BENCHMARK_SPOTTER_ID, wave_data)
+    process_wave_data(BENCHMARK_SPOTTER_ID, wave_data)
+
+    raw = pd.DataFrame([record for record in records if record["data_type_name"] == SPEED_MEAN])
+    raw["value"] = [decode_sensor_value(SPEED_MEAN, value)[0]["value"] for value in raw["value"]]
+    raw.index = pd.to_datetime(raw.pop("timestamp"), utc=True)
+    for tier, frequency in (("hourly", "h"), ("daily", "D")):
+        expected = raw.groupby("bristlemouth_node_id").resample(frequency)["value"].agg(["count", "mean", "std"])
+        loaded = speed_rollups(tier)
+        assert loaded["count"].tolist() == expected["count"].tolist()
+        assert loaded["mean"].tolist() == pytest.approx(expected["mean"].tolist())
+        # Rollups hold the population std
+        counts = expected["count"]
+        assert loaded["std"].tolist() == pytest.approx((expected["std"] * ((counts - 1) / counts) ** 0.5).tolist())
+
+    waves = rollups.load_rollups(BENCHMARK_SPOTTER_ID, "daily", series=rollups.WAVE_SERIES)
+    assert waves[waves["metric"] == "hs"]["count"].tolist() == [48, 48]
+
+
+def test_rollup_plot_data_follows_the_tier(api_data):
+    sensor_data, wave_data = api_data
+    process_smart_mooring_data(BENCHMARK_SPOTTER_ID, sensor_data)
+    process_wave_data(BENCHMARK_SPOTTER_ID, wave_data)
+
+    node_tables, rollup_waves = rollups.rollup_plot_data(BENCHMARK_SPOTTER_ID, "hourly", START, END)
+    assert len(node_tables) == 2
+    for table in node_tables.values():
+        assert len(table) == 48
+        assert table["speed_mean"].notna().all() and table["max_force"].notna().all()
+    assert len(rollup_waves["waves"]) == 48
+    # Only the buckets overlapping the requested range are loaded
+    node_tables, rollup_waves = rollups.rollup_plot_data(BENCHMARK_SPOTTER_ID, "daily", START + timedelta(hours=30),
+                                                         END)
+    assert [len(table) for table in node_tables.values()] == [1, 1]
+    assert rollup_waves["waves"][0]["timestamp"] == "2025-01-02T00:00:00.000Z"
+
+
+@pytest.mark.parametrize("days, tier", [(7, None), (31, None), (32, "hourly"), (366, "hourly"), (367, "daily")])
+def test_select_rollup_tier(days, tier):
+    assert rollups.select_rollup_tier(START, START + timedelta(days=days)) == tier
+
+
+def test_readings_within_one_second_are_kept_apart():
+    entries = [speed_entry("2025-01-01T00:00:00.250Z", 10.0), speed_entry("2025-01-01T00:00:00.750Z", 20.0)]
+    assert rollups.update_sensor_rollups(BENCHMARK_SPOTTER_ID, {"node": entries}) == 2
+    assert rollups.update_sensor_rollups(BENCHMARK_SPOTTER_ID, {"node": entries}) == 0
+
+    hourly = speed_rollups("hourly")
+    assert (hourly["count"].tolist(), hourly["mean"].tolist()) == ([2], [15.0])
+
+
+def test_settled_keys_are_pruned_without_double_counting():
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    moments = [now - rollups.CACHE_SETTLE_TIME - timedelta(minutes=75) + timedelta(minutes=30 * step)
+               for step in range(5)]
+    entries = [speed_entry(f"{moment:%Y-%m-%dT%H:%M:%S}.000Z", 1.0) for moment in moments]
+    assert rollups.update_sensor_rollups(BENCHMARK_SPOTTER_ID, {"node": entries}) == 5
+
+    # Only the readings that may still see late data around them keep a key
+    horizon = now - rollups.CACHE_SETTLE_TIME
+    assert stored_keys() == [(moment - rollups.EPOCH) // rollups.MICROSECOND for moment in moments
+                             if moment >= horizon]
+    # Settled readings are recognized from the span of the batch they arrived in
+    assert rollups.update_sensor_rollups(BENCHMARK_SPOTTER_ID, {"node": entries[:3]}) == 0
+    assert rollups.update_sensor_rollups(BENCHMARK_SPOTTER_ID, {"node": entries}) == 0
+    assert speed_rollups("daily")["count"].sum() == 5
@@ -0,0 +1,47 @@
+# filename: test_sensor_decoders.py
+# description: tests for decoding fetched sensor entries into typed values and units through the decoder registry
+
+import json
+from datetime import datetime, timedelta
+
+import sensor_decoders
+from benchmark import BENCHMARK_SPOTTER_ID
+from sofar_pipeline import fetch_data_in_chunks, process_smart_mooring_data
+
+START = datetime(2025, 1, 1)
+
+
+def test_fetched_entries_carry_typed_values_and_units(mock_api):
+    session = mock_api(START, START + timedelta(hours=1), node_count=1, sensor_interval=timedelta(minutes=30))
+    sensor_data = fetch_data_in_chunks(START, START + timedelta(hours=1), BENCHMARK_SPOTTER_ID, data_type="sensor",
+                                       use_cache=False)
+    grouped_data, unique_node_ids = process_smart_mooring_data(BENCHMARK_SPOTTER_ID, sensor_data)
+
+    assert unique_node_ids == set(session.node_ids)
+    raw_values = {(record["data_type_name"], record["timestamp"]): record["value"]
+                  for record in map(json.loads, session._sensor_records)}
+    for entry in grouped_data[session.node_ids[0]]:
+        raw_value = raw_values[(entry["data_type_name"], entry["timestamp"])]
+        if entry["data_type_name"] == "binary_hex_encoded":
+            assert entry["decoded_value"] == bytes.fromhex(raw_value).decode()
+            assert f"max force: {entry['max_force']:.2f}" in entry["decoded_value"]
+            assert isinstance(entry["mean_force"], float) and entry["value"] is None
+            assert entry["unit"] == "N"
+        elif "speed" in entry["data_type_name"]:
+            # Speeds are reported in cm/s and stored in m/s
+            assert (entry["value"], entry["unit"]) == (float(raw_value) * 0.01, "m/s")
+        else:
+            assert (entry["value"], entry["unit"]) == (float(raw_value), "rad")
+
+
+def test_registered_decoder_applies_at_ingest(monkeypatch):
+    monkeypatch.setitem(sensor_decoders.SENSOR_DECODERS, "bm_temperature_mdeg", {})
+    sensor_decoders.register_decoder("bm_temperature_mdeg", "degC", scale=0.001)
+    entries = [{"bristlemouth_node_id": "node", "timestamp": "2025-01-01T00:00:00.000Z",
+                "data_type_name": data_type_name, "unit_type": "float", "value": value}
+               for data_type_name, value in (("bm_temperature_mdeg", "12500"), ("bm_temperature_mdeg", "n/a"),
+                                             ("unregistered_type", "7"))]
+
+    grouped_data, _ = process_smart_mooring_data(BENCHMARK_SPOTTER_ID, {"data": entries})
+    assert [(entry["value"], entry["unit"]) for entry in grouped_data["node"]] == [(12.5, "degC"), (None, None),
+                                                                                    (None, None)]
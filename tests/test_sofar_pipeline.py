@@ -0,0 +1,97 @@
+# filename: test_sofar_pipeline.py
+# description: tests for the pipeline's HTTP session and request handling, concurrency settings and sensor decoding
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import sofar_pipeline
+from benchmark import BENCHMARK_SPOTTER_ID, MockResponse
+from request_retry import AdaptiveRateLimiter, APIRequestError
+
+
+def test_session_pool_matches_api_concurrency(monkeypatch):
+    for name in ("_api_concurrency", "_api_semaphore", "_http_session"):
+        monkeypatch.setattr(sofar_pipeline, name, getattr(sofar_pipeline, name))
+
+    sofar_pipeline.set_api_concurrency(16)
+    adapter = sofar_pipeline.get_http_session().get_adapter("https://api.sofarocean.com")
+    assert adapter._pool_maxsize == 16
+    assert sofar_pipeline.get_http_session() is sofar_pipeline.get_http_session()
+
+
+def test_repeated_sensor_values_are_decoded_once(monkeypatch):
+    message = "min force: 1.50, max force: 9.25, mean force: 4.00".encode().hex()
+    entries = [{"bristlemouth_node_id": "node", "timestamp": f"2025-01-01T00:0{minute}:00.000Z",
+                "data_type_name": "binary_hex_encoded", "unit_type": "binary", "value": message}
+               for minute in range(3)]
+    entries.append({"bristlemouth_node_id": "node", "timestamp": "2025-01-01T00:03:00.000Z",
+                    "data_type_name": "aanderaa_abs_speed_mean_15bits", "unit_type": "float", "value": "42"})
+    decoded_hex = []
+    decode_hex_to_ascii = sofar_pipeline.decode_hex_to_ascii
+    monkeypatch.setattr(sofar_pipeline, "decode_hex_to_ascii",
+                        lambda value: decoded_hex.append(value) or decode_hex_to_ascii(value))
+
+    columns = sofar_pipeline.decode_sensor_columns(entries)
+    assert decoded_hex == [message]
+    assert columns["max_force"] == [9.25, 9.25, 9.25, None]
+    assert columns["value"] == [None, None, None, 0.42]
+    assert columns["unit"] == ["N", "N", "N", "m/s"]
+
+
+def test_failed_request_reports_last_error_without_token(monkeypatch, capsys):
+    class FlakySession:
+        """Answers 503 once, then fails to connect, quoting the URL like requests does."""
+
+        def __init__(self):
+            self.calls = 0
+
+        def get(self, url, timeout=None):
+            self.calls += 1
+            if self.calls == 1:
+                return MockResponse(b"{}", status_code=503)
+            raise requests.exceptions.ConnectionError(f"Max retries exceeded with url: {url}")
+
+    monkeypatch.setattr(sofar_pipeline, "_rate_limiter", AdaptiveRateLimiter(max_rate=1000))
+    monkeypatch.setattr(sofar_pipeline, "retry_delay", lambda attempt, retry_after=None: 0)
+    url = sofar_pipeline.build_latest_data_url("SPOT-TEST").replace(sofar_pipeline.API_TOKEN, "s3cret")
+
+    with pytest.raises(APIRequestError) as failure:
+        sofar_pipeline.api_login(url, session=FlakySession(), max_retries=1)
+    assert failure.value.status_code is None
+    assert "ConnectionError" in str(failure.value)
+    assert "s3cret" not in str(failure.value) + capsys.readouterr().out
+
+
+def test_concurrent_fetch_matches_sequential_fetch(mock_api):
+    start, end = datetime(2025, 1, 1), datetime(2025, 1, 11)
+    session = mock_api(start, end, node_count=1, latency=0.02)
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    get = session.get
+
+    def counting_get(url, timeout=None):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return get(url, timeout=timeout)
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+
+    session.get = counting_get
+
+    def fetch(data_type, max_in_flight):
+        return sofar_pipeline.fetch_data_in_chunks(start, end, BENCHMARK_SPOTTER_ID, chunk_size_days=1,
+                                                   data_type=data_type, max_in_flight=max_in_flight, use_cache=False)
+
+    for data_type in ("wave", "sensor"):
+        sequential = fetch(data_type, max_in_flight=1)
+        assert in_flight["max"] == 1
+        # Chunks arrive out of order but are merged in time order, into the same shape
+        assert fetch(data_type, max_in_flight=4) == sequential
+        assert 1 < in_flight["max"] <= 4
+        in_flight["max"] = 0
@@ -0,0 +1,64 @@
+# filename: test_watch_mode.py
+# description: tests for polling a spotter in watch mode against the mock API
+
+import csv
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import csv_writer
+from watch_mode import SpotterWatcher
+
+START = datetime(2025, 1, 1)
+
+
+def read_rows(csv_filename):
+    with open(csv_filename, newline='', encoding='utf-8') as file:
+        return list(csv.DictReader(file, escapechar='\\'))
+
+
+@pytest.fixture
+def watcher(mock_api, workdir):
+    session = mock_api(START, START + timedelta(days=1), node_count=1, sensor_interval=timedelta(minutes=5),
+                       wave_interval=timedelta(minutes=30))
+    spotter_watcher = SpotterWatcher("SPOT-TEST", sensor_directory=str(workdir / "sensor"),
+                                     wave_directory=str(workdir / "wave"))
+    return spotter_watcher, session
+
+
+def poll_at(spotter_watcher, session, moment):
+    session.now = moment
+    return spotter_watcher.poll(now=moment, session=session)
+
+
+def test_poll_appends_only_new_rows_without_rereading_indexes(watcher, monkeypatch, workdir):
+    spotter_watcher, session = watcher
+    # Readings at 45, 50 and 55 minutes of five sensor records each; wave records of four streams at 0, 30
+    # and 60 minutes
+    first = poll_at(spotter_watcher, session, START + timedelta(hours=1))
+    assert (first["sensor_rows"], first["wave_rows"]) == (15, 12)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the index was reread from disk")
+
+    # The next poll overlaps the first one but finds its keys in the pool's in-memory indexes
+    monkeypatch.setattr(csv_writer, "read_index", fail)
+    monkeypatch.setattr(csv_writer, "read_stored_keys", fail)
+    second = poll_at(spotter_watcher, session, START + timedelta(minutes=90))
+    assert (second["sensor_rows"], second["wave_rows"]) == (30, 4)
+
+    node_id = session.node_ids[0]
+    sensor_csv = workdir / "sensor" / node_id / f"{node_id}_smart_mooring.csv"
+    sensor_rows = read_rows(sensor_csv)
+    assert len(sensor_rows) == 45
+    assert len({(row["timestamp"], row["data_type_name"]) for row in sensor_rows}) == 45
+    waves = read_rows(workdir / "wave" / "waves.csv")
+    assert [row["timestamp"] for row in waves] == [
+        f"{START + timedelta(minutes=minutes):%Y-%m-%dT%H:%M:%S}.000Z" for minutes in (0, 30, 60, 90)]
+    # Indexes are kept in memory while watching and saved once the watcher is closed
+    assert not os.path.exists(csv_writer.index_filename(str(sensor_csv)))
+
+    spotter_watcher.close()
+    monkeypatch.undo()
+    assert csv_writer.read_index(str(sensor_csv))["unindexed_spans"] == []
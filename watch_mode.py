@@ -0,0 +1,241 @@
+# filename: watch_mode.py
+# description: long-running near-real-time polling of a fleet, keeping per-node ring buffers and appending only new records
+
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from csv_writer import CSVWriterPool
+from fleet_runner import spotter_output_directories
+from sofar_pipeline import (fetch_chunk, fetch_latest_data, get_http_session, process_node_tables,
+                            process_smart_mooring_data, process_wave_data, set_api_concurrency)
+from stream_aggregates import parse_timestamp
+
+DEFAULT_POLL_INTERVAL = timedelta(minutes=1)
+# Each sensor-data poll re-reads this much history, so readings that reach the API late are still picked up
+DEFAULT_SENSOR_WINDOW = timedelta(minutes=15)
+# After missed polls (outage, restart) the window is widened to cover the gap, but never beyond this
+MAX_CATCH_UP_WINDOW = timedelta(days=1)
+# Parsed readings kept in memory per node (one day of per-minute readings)
+DEFAULT_RING_BUFFER_SIZE = 1440
+# Keys of records this much older than the newest one seen are forgotten; older records are dropped as stale
+SEEN_KEY_HORIZON = timedelta(days=1)
+
+WAVE_STREAMS = ("waves", "wind", "surfaceTemp", "barometerData")
+
+
+class SeenKeys:
+    """Remember record keys within `horizon` of the newest timestamp seen, to filter out repeated records.
+
+    Keys end with the record's API timestamp. Records older than the horizon are treated as already seen,
+    so memory is bounded by the number of records per horizon rather than by the length of the run. Before
+    the first record is seen nothing is dropped; the CSV writers' own dedupe then catches records stored by
+    earlier runs.
+    """
+
+    def __init__(self, horizon=SEEN_KEY_HORIZON):
+        self.horizon = horizon
+        self._keys = {}  # key -> parsed timestamp
+        self.newest = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def filter_new(self, records, key_function):
+        """Return {key: record} for `records` whose key has not been seen and is not older than the horizon.
+
+        Repeated keys within `records` are kept once. The keys are only remembered by `add`, so records
+        whose processing fails are picked up again by the next poll.
+        """
+        cutoff = self.newest - self.horizon if self.newest is not None else None
+        new_records = {}
+        for record in records:
+            key = key_function(record)
+            if not key[-1] or key in self._keys or key in new_records:
+                continue
+            if cutoff is not None and parse_timestamp(key[-1]) < cutoff:
+                continue
+            new_records[key] = record
+        return new_records
+
+    def add(self, keys):
+        """Remember `keys`, whose last element is the record's API timestamp."""
+        for key in keys:
+            moment = parse_timestamp(key[-1])
+            self._keys[key] = moment
+            if self.newest is None or moment > self.newest:
+                self.newest = moment
+
+    def prune(self):
+        """Forget keys that have fallen behind the horizon."""
+        if self.newest is None:
+            return
+        cutoff = self.newest - self.horizon
+        self._keys = {key: moment for key, moment in self._keys.items() if moment >= cutoff}
+
+
+class SpotterWatcher:
+    """Poll one spotter for new data and append only records not seen before.
+
+    Each poll fetches the latest-data endpoint (waves, wind, SST, barometer) and a short trailing
+    sensor-data window, drops records already seen, writes the remaining deltas with the usual
+    processing functions and keeps the newest `buffer_size` parsed readings of each node (and each wave
+    stream) in fixed-size ring buffers. The work per poll depends on the window length and the amount
+    of new data, not on how long the spotter has been watched. The CSV files and their dedupe indexes
+    stay open in memory between polls, so the indexes are not reread and rewritten every poll; `close`
+    saves them.
+    """
+
+    def __init__(self, spotter_id, buffer_size=DEFAULT_RING_BUFFER_SIZE, sensor_window=DEFAULT_SENSOR_WINDOW,
+                 output_format="csv", sensor_directory=None, wave_directory=None):
+        from node_tables import NodeTableBuilder
+        self.spotter_id = spotter_id
+        self.buffer_size = buffer_size
+        self.sensor_window = sensor_window
+        self.output_format = output_format
+        default_sensor_directory, default_wave_directory = spotter_output_directories(spotter_id)
+        self.sensor_directory = sensor_directory or default_sensor_directory
+        self.wave_directory = wave_directory or default_wave_directory
+        self.node_buffers = {}
+        self.wave_buffers = {stream: deque(maxlen=buffer_size) for stream in WAVE_STREAMS}
+        self._seen_sensor_keys = SeenKeys()
+        self._seen_wave_keys = SeenKeys()
+        # Carries readings at the end of a poll over to the next one, so split mean/std pairs stay paired
+        self._node_table_builder = NodeTableBuilder()
+        self._csv_pool = CSVWriterPool()
+        self._last_polled = None
+
+    def sensor_poll_window(self, now):
+        """Return the (start, end) sensor-data window for a poll at `now`, widened to cover missed polls."""
+        start = now - self.sensor_window
+        if self._last_polled is not None:
+            start = min(start, self._last_polled - self.sensor_window)
+        return max(start, now - MAX_CATCH_UP_WINDOW), now
+
+    def new_sensor_entries(self, entries):
+        """Return {key: entry} for the sensor-data entries not seen before."""
+        return self._seen_sensor_keys.filter_new(
+            entries,
+            lambda entry: (entry.get('bristlemouth_node_id'), entry.get("data_type_name"), entry.get("timestamp")))
+
+    def new_wave_records(self, latest_data):
+        """Return {stream: {key: record}} for the latest-data records not seen before."""
+        data = latest_data.get("data", {})
+        return {stream: self._seen_wave_keys.filter_new(data.get(stream) or [],
+                                                         lambda entry, stream=stream: (stream, entry.get("timestamp")))
+                for stream in WAVE_STREAMS}
+
+    def poll(self, now=None, session=None):
+        """Fetch, dedupe, store and buffer new data once; return counts of the new records."""
+        now = now or datetime.utcnow().replace(microsecond=0)
+        session = session or get_http_session()
+
+        sensor_data = fetch_chunk(self.spotter_id, self.sensor_poll_window(now), data_type="sensor",
+                                  session=session)
+        new_entries = self.new_sensor_entries(sensor_data.get("data") or [])
+        if new_entries:
+            grouped_data, _ = process_smart_mooring_data(self.spotter_id, {"data": list(new_entries.values())},
+                                                         self.output_format, self.sensor_directory,
+                                                         csv_pool=self._csv_pool)
+            process_node_tables(self.spotter_id, grouped_data, self.output_format, self.sensor_directory,
+                                builder=self._node_table_builder, csv_pool=self._csv_pool)
+            self._seen_sensor_keys.add(new_entries)
+            for node_id, node_entries in grouped_data.items():
+                node_buffer = self.node_buffers.setdefault(node_id, deque(maxlen=self.buffer_size))
+                node_buffer.extend(sorted(node_entries, key=lambda entry: entry["timestamp"]))
+
+        new_records = self.new_wave_records(fetch_latest_data(self.spotter_id, session=session))
+        wave_rows = sum(len(records) for records in new_records.values())
+        if wave_rows:
+            wave_data = {"data": {stream: list(records.values()) for stream, records in new_records.items()}}
+            process_wave_data(self.spotter_id, wave_data, self.output_format, self.wave_directory,
+                              csv_pool=self._csv_pool)
+            for stream, records in new_records.items():
+                self._seen_wave_keys.add(records)
+                self.wave_buffers[stream].extend(sorted(records.values(), key=lambda entry: entry["timestamp"]))
+
+        self._csv_pool.flush()
+        self._last_polled = now
+        self._seen_sensor_keys.prune()
+        self._seen_wave_keys.prune()
+        return {"sensor_rows": len(new_entries), "wave_rows": wave_rows,
+                "buffered_rows": sum(len(node_buffer) for node_buffer in self.node_buffers.values())}
+
+    def close(self):
+        """Close the CSV files and save their dedupe indexes."""
+        self._csv_pool.close()
+
+    def node_tables(self):
+        """Return node tables (see node_tables.py) built from the ring buffers, e.g. for `plot_data`."""
+        from node_tables import build_node_tables
+        return build_node_tables({node_id: list(node_buffer) for node_id, node_buffer in self.node_buffers.items()})
+
+    def wave_data(self):
+        """Return the buffered wave streams in the shape of a wave-data response, e.g. for plotting."""
+        return {stream: list(wave_buffer) for stream, wave_buffer in self.wave_buffers.items()}
+
+
+def poll_watcher(watcher):
+    """Poll one watcher, capturing its failure instead of raising so the rest of the fleet keeps polling."""
+    result = {"spotter_id": watcher.spotter_id, "status": "ok", "error": None}
+    started = time.perf_counter()
+    try:
+        result.update(watcher.poll())
+    except Exception as e:
+        print(f"Failed to poll {watcher.spotter_id}: {e}")
+        result.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def format_watch_cycle(cycle, results):
+    """Format one polling cycle as a plain-text table."""
+    lines = [f"Cycle {cycle} at {datetime.utcnow():%Y-%m-%d %H:%M:%S} UTC",
+             f"{'Spotter':<16}{'Status':<8}{'Seconds':>9}{'New sensor':>12}{'New wave':>10}{'Buffered':>10}"]
+    for result in results:
+        lines.append(
+            f"{result['spotter_id']:<16}{result['status']:<8}{result['seconds']:>9.2f}"
+            f"{result.get('sensor_rows', 0):>12}{result.get('wave_rows', 0):>10}{result.get('buffered_rows', 0):>10}"
+            + (f"  {result['error']}" if result["error"] else "")
+        )
+    return "\n".join(lines)
+
+
+def run_watch(spotter_ids, poll_interval=DEFAULT_POLL_INTERVAL, cycles=None, pool_size=4, api_concurrency=None,
+              **options):
+    """Poll every spotter in `spotter_ids` once per `poll_interval` until interrupted or `cycles` have run.
+
+    Spotters are polled concurrently by `pool_size` workers; a failing spotter is reported and retried on
+    the next cycle. Cycles start on a fixed schedule; if a cycle overruns, missed ticks are skipped rather
+    than run back to back. Remaining keyword options are passed to `SpotterWatcher`. Returns the watchers,
+    whose ring buffers hold the most recent data.
+    """
+    if api_concurrency is not None:
+        set_api_concurrency(api_concurrency)
+
+    watchers = [SpotterWatcher(spotter_id, **options) for spotter_id in spotter_ids]
+    interval_seconds = poll_interval.total_seconds()
+    next_cycle = time.monotonic()
+    cycle = 0
+    print(f"Watching {len(watchers)} spotters every {interval_seconds:g} s; press Ctrl+C to stop.")
+    try:
+        with ThreadPoolExecutor(max_workers=max(min(pool_size, len(watchers)), 1)) as executor:
+            while cycles is None or cycle < cycles:
+                cycle += 1
+                print(format_watch_cycle(cycle, list(executor.map(poll_watcher, watchers))))
+                if cycles is not None and cycle >= cycles:
+                    break
+                next_cycle += interval_seconds
+                delay = next_cycle - time.monotonic()
+                if delay < 0:
+                    next_cycle = time.monotonic()
+                    delay = 0
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        print(f"Stopped watching after {cycle} cycles.")
+    finally:
+        for watcher in watchers:
+            watcher.close()
+    return watchers